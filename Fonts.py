@@ -7,3 +7,26 @@ class Fonts:
         self.fonts_path = fonts_path
         self.fonts_size = fonts_size
         self.fonts_chars_limit = fonts_chars_limit
+
+
+# The standard font set (file in sources/fonts, font size, max characters per line)
+DEFAULT_FONTS = [
+    ('CoffeeJellyUmai.ttf', 95, 34),
+    ('CourierprimecodeRegular.ttf', 70, 25),
+    ('FlowersSunday.otf', 65, 30),
+    ('GreenTeaJelly.ttf', 85, 45),
+    ('HeyMarch.ttf', 75, 33),
+    ('LetsCoffee.otf', 50, 34),
+    ('LikeSlim.ttf', 75, 35),
+    ('SunnySpellsBasicRegular.ttf', 87, 32),
+    ('TakeCoffee.ttf', 50, 35),
+    ('WantCoffee.ttf', 65, 35),
+]
+
+
+def default_fonts(fonts_dir="sources/fonts"):
+    """Fonts object for the standard font set found in fonts_dir"""
+    fonts_dir = str(fonts_dir).replace("\\", "/")
+    return Fonts([f"{fonts_dir}/{name}" for name, _, _ in DEFAULT_FONTS],
+                 [size for _, size, _ in DEFAULT_FONTS],
+                 [chars for _, _, chars in DEFAULT_FONTS])
@@ -1,6 +1,6 @@
 import os
-import shutil
 import sys
+import threading
 from pathlib import Path
 import tkinter as tk
 from tkinter import filedialog, messagebox
@@ -8,6 +8,10 @@ from tkinter import filedialog, messagebox
 # VLC playback
 import vlc   # pip install python-vlc
 
+from utils.audio_features import CategorySuggester, FeatureAnalyzer, library_examples, submit_library
+from utils.copy_queue import CopyQueue
+from utils.duplicates import DuplicateChecker, describe
+
 # ------------ CONFIG ------------
 LIBRARY_ROOT = Path("library") / "audio"   # matches your folder naming
 CATEGORIES = [
@@ -19,6 +23,7 @@ CATEGORIES = [
     ("📦 Generic", "generic"),
 ]
 EXTS = (".mp3", ".wav", ".m4a", ".flac", ".ogg")
+JOURNAL_FILE = LIBRARY_ROOT / ".sort_journal.jsonl"   # undo history of the copy queue
 # --------------------------------
 
 class AudioSorter(tk.Tk):
@@ -35,8 +40,19 @@ class AudioSorter(tk.Tk):
         self.files = []
         self.idx = 0
         self.copied_log = set()  # track originals we've copied (for cleanup)
+        self.duplicates = None   # DuplicateChecker, started with the first folder
+        self.analyzer = None     # FeatureAnalyzer (process pool), started with the first folder
+        self.suggester = CategorySuggester()
+        self.suggestion = None   # category pre-selected for the current file
+        self._suggest_job = None
+        self._learned = threading.Event()  # set once the suggester learned from the library
+        self._next_media = None  # (path, vlc.Media) parsed ahead of time
+        # Copies run in the background; the UI only queues them
+        self.copies = CopyQueue(JOURNAL_FILE, on_done=self._filed)
+        self._unchecked = []     # (job, duplicate check future) of copies queued before their check was done
 
         self._build_ui()
+        self._poll_copies()
 
     # ---------- UI ----------
     def _build_ui(self):
@@ -49,6 +65,9 @@ class AudioSorter(tk.Tk):
         self.progress_var = tk.StringVar(value="0/0 (0%)")
         tk.Label(top, textvariable=self.progress_var, fg="#888").pack(side="right")
 
+        self.pending_var = tk.StringVar(value="")
+        tk.Label(top, textvariable=self.pending_var, fg="#c80").pack(side="right", padx=8)
+
         middle = tk.Frame(self, padx=10, pady=4)
         middle.pack(fill="x")
 
@@ -58,11 +77,15 @@ class AudioSorter(tk.Tk):
         self.status_var = tk.StringVar(value="Pick a folder to start.")
         tk.Label(middle, textvariable=self.status_var, fg="#2a8").pack(anchor="w")
 
+        self.suggest_var = tk.StringVar(value="")
+        tk.Label(middle, textvariable=self.suggest_var, fg="#58f").pack(anchor="w")
+
         controls = tk.Frame(self, padx=10, pady=6)
         controls.pack(fill="x")
 
         tk.Button(controls, text="▶ Play/Pause", width=14, command=self.toggle_play).pack(side="left")
         tk.Button(controls, text="⏭ Skip", width=10, command=self.skip_file).pack(side="left", padx=6)
+        tk.Button(controls, text="↩ Undo", width=10, command=self.undo_last).pack(side="left")
         tk.Button(controls, text="🗑 Cleanup originals (copied only)", command=self.cleanup_copied).pack(side="right")
 
         # Categories
@@ -70,6 +93,7 @@ class AudioSorter(tk.Tk):
         grid.pack(fill="both", expand=True)
 
         # 2 columns
+        self.category_buttons = {}
         for r, pair in enumerate(CATEGORIES):
             if r % 2 == 0:
                 row = tk.Frame(grid)
@@ -79,6 +103,8 @@ class AudioSorter(tk.Tk):
                             width=36, height=2,
                             command=lambda f=folder: self.copy_to_category(f))
             btn.pack(side="left", padx=6)
+            self.category_buttons[folder] = btn
+        self._button_bg = btn.cget("background")
 
         # Hotkeys (1..6)
         self.bind("1", lambda e: self.copy_to_category(CATEGORIES[0][1]))
@@ -87,7 +113,10 @@ class AudioSorter(tk.Tk):
         self.bind("4", lambda e: self.copy_to_category(CATEGORIES[3][1]))
         self.bind("5", lambda e: self.copy_to_category(CATEGORIES[4][1]))
         self.bind("6", lambda e: self.copy_to_category(CATEGORIES[5][1]))
+        self.bind("<Return>", lambda e: self.accept_suggestion())
         self.bind("<space>", lambda e: self.toggle_play())
+        self.bind("<Control-z>", lambda e: self.undo_last())
+        self.bind("<BackSpace>", lambda e: self.undo_last())
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     # ---------- Core flow ----------
@@ -102,8 +131,26 @@ class AudioSorter(tk.Tk):
             messagebox.showwarning("No Files", "No audio files found in that folder.")
             return
         self._ensure_category_folders()
+        if self.duplicates is None:
+            self.duplicates = DuplicateChecker(LIBRARY_ROOT)
+        if self.analyzer is None:
+            self.analyzer = FeatureAnalyzer()
+            # What is already sorted teaches the suggester what each category sounds like;
+            # those tracks are queued first so learning isn't stuck behind the new folder
+            library = submit_library(LIBRARY_ROOT, self.analyzer)
+            threading.Thread(target=self._learn_categories, args=(library,), daemon=True).start()
+        for f in self.files:
+            self.analyzer.submit(f)  # analyzed in order, ahead of the operator
         self.load_current()
 
+    def _learn_categories(self, library):
+        try:
+            self.suggester.learn(library_examples(LIBRARY_ROOT, self.analyzer, library))
+        except Exception as e:
+            print(f"⚠️ Could not learn categories from {LIBRARY_ROOT}: {e}")
+        finally:
+            self._learned.set()
+
     def _ensure_category_folders(self):
         for _, slug in CATEGORIES:
             (LIBRARY_ROOT / slug).mkdir(parents=True, exist_ok=True)
@@ -114,6 +161,8 @@ class AudioSorter(tk.Tk):
             self.file_label.config(text="No more files.")
             self.progress_var.set(f"{len(self.files)}/{len(self.files)} (100%)")
             self.stop_playback()
+            self._show_suggestion(None)
+            self.suggest_var.set("")
             return
 
         f = self.files[self.idx]
@@ -123,11 +172,68 @@ class AudioSorter(tk.Tk):
 
         # Start VLC on the ORIGINAL file (VLC plays without blocking our copy)
         self.stop_playback()
-        media = self.instance.media_new(str(f))
+        if self._next_media is not None and self._next_media[0] == f:
+            media = self._next_media[1]  # already parsed while the previous file played
+        else:
+            media = self.instance.media_new(str(f))
         self.player.set_media(media)
         self.player.play()
+        self._next_media = None
+        if self.idx + 1 < len(self.files):
+            self._preparse(self.files[self.idx + 1])
         self.status_var.set("▶ Playing. Use 1..6 hotkeys or click a category.")
 
+        # Fingerprint this file and the next one while it plays
+        for path in self.files[self.idx:self.idx + 2]:
+            self.duplicates.check_async(path)
+        self._show_suggestion(None)
+        self._poll_suggestion()
+
+    # ---------- Suggestions ----------
+    def _poll_suggestion(self):
+        """Show the current file's suggested category as soon as its analysis is done"""
+        self._suggest_job = None
+        if self.idx >= len(self.files):
+            return
+        future = self.analyzer.submit(self.files[self.idx])
+        if not future.done():
+            self.suggest_var.set("🔎 Analyzing…")
+            self._suggest_job = self.after(250, self._poll_suggestion)
+            return
+        if future.cancelled() or future.exception() is not None:
+            self.suggest_var.set("")
+            return
+        learned = self._learned.is_set()
+        features = future.result()
+        category, _ = self.suggester.suggest(features)
+        self._show_suggestion(category)
+        self.suggest_var.set(f"💡 Suggested: {category} ({features['tempo_bpm']:.0f} BPM, "
+                             f"{features['rms_db']:.0f} dBFS) — Enter to confirm")
+        if not learned:
+            # Built-in profiles for now: suggest again once the library has been learned
+            self._suggest_job = self.after(500, self._poll_suggestion)
+
+    def _show_suggestion(self, category):
+        if self._suggest_job is not None:
+            self.after_cancel(self._suggest_job)
+            self._suggest_job = None
+        self.suggestion = category
+        for slug, btn in self.category_buttons.items():
+            btn.config(background="#cde" if slug == category else self._button_bg)
+
+    def accept_suggestion(self):
+        if self.suggestion:
+            self.copy_to_category(self.suggestion)
+
+    def _preparse(self, path):
+        """Create and parse the next file's media now, so advancing starts it instantly"""
+        media = self.instance.media_new(str(path))
+        try:
+            media.parse_with_options(vlc.MediaParseFlag.local, 0)
+        except AttributeError:
+            media.parse_async()  # python-vlc < 3
+        self._next_media = (path, media)
+
     # ---------- Actions ----------
     def toggle_play(self):
         if self.player.is_playing():
@@ -148,28 +254,81 @@ class AudioSorter(tk.Tk):
         if self.idx >= len(self.files):
             return
         src = self.files[self.idx]
-        dest_folder = LIBRARY_ROOT / category_slug
-        dest = dest_folder / src.name
-
-        # collision handling
-        if dest.exists():
-            stem, suf = src.stem, src.suffix
-            i = 1
-            while (dest_folder / f"{stem}_{i}{suf}").exists():
-                i += 1
-            dest = dest_folder / f"{stem}_{i}{suf}"
-
-        try:
-            shutil.copy2(src, dest)  # COPY (not move) => zero lock issues
-            self.copied_log.add(src.resolve())
-            self.status_var.set(f"✅ Copied to {category_slug}.")
-        except Exception as e:
-            messagebox.showerror("Copy failed", str(e))
+        check = self.duplicates.check_async(src)
+        checked = check.done()
+        if checked and not self._confirm_not_duplicate(src, check):
             return
+        # Queued, not copied here: the copy (into the store, category file = link) runs in the
+        # background and name collisions are resolved then. The original stays untouched
+        job = self.copies.put(src, LIBRARY_ROOT / category_slug, category_slug)
+        if not checked:
+            # Never wait for the check (on a first run it needs the whole library): it is
+            # looked at by _poll_copies and the copy is undone if the operator says so
+            self._unchecked.append((job, check))
+        self._update_pending()
 
         # advance to next
         self.idx += 1
         self.load_current()
+        self.status_var.set(f"📥 {src.name} → {category_slug} (Ctrl+Z to undo)")
+
+    def _filed(self, job):
+        """Runs on the copy thread after each successful copy"""
+        if self.duplicates is not None:
+            self.duplicates.filed(job["src"], job["dest"])
+
+    def _confirm_not_duplicate(self, src, check, queued=False):
+        """False if src's finished duplicate check found it in the library and the operator doesn't want a copy"""
+        if check.cancelled() or check.exception() is not None:
+            self.status_var.set(f"⚠️ Duplicate check failed for {Path(src).name}")
+            return True
+        matches = check.result()
+        return not matches or messagebox.askyesno(
+            "Possible duplicate",
+            f"{Path(src).name} sounds like a track already in the library:\n\n{describe(matches)}\n\n"
+            + ("Keep the copy anyway?" if queued else "Copy it anyway?"))
+
+    def _poll_copies(self):
+        for entry in [e for e in self._unchecked if e[1].done()]:
+            self._unchecked.remove(entry)
+            job, check = entry
+            if not self._confirm_not_duplicate(job["src"], check, queued=True):
+                self.undo_last(job["id"])
+        for job in self.copies.drain():
+            if job["status"] == "done":
+                self.copied_log.add(Path(job["src"]).resolve())
+            elif job["status"] == "failed":
+                self.status_var.set(f"❌ Copy failed: {Path(job['src']).name}")
+                messagebox.showerror("Copy failed", f"{job['src']}\n\n{job['error']}")
+        self._update_pending()
+        self.after(200, self._poll_copies)
+
+    def _update_pending(self):
+        pending = self.copies.pending()
+        self.pending_var.set(f"⏳ {pending} copying" if pending else "")
+
+    def undo_last(self, job_id=None):
+        """Take the last filing (or job_id) back out of the library and show that file again"""
+        try:
+            job = self.copies.undo(job_id)
+        except Exception as e:
+            messagebox.showerror("Undo failed", str(e))
+            return
+        if job is None:
+            self.status_var.set("Nothing to undo.")
+            return
+        src = Path(job["src"])
+        self.copied_log.discard(src.resolve())
+        self._update_pending()
+        if src in self.files[:self.idx]:
+            if self.idx > 0 and self.files[self.idx - 1] == src:
+                self.idx -= 1
+            else:
+                self.files.remove(src)
+                self.idx -= 1
+                self.files.insert(self.idx, src)
+            self.load_current()
+        self.status_var.set(f"↩ Undid {src.name} → {job['category']}.")
 
     def skip_file(self):
         if self.idx < len(self.files):
@@ -198,6 +357,15 @@ class AudioSorter(tk.Tk):
             self.stop_playback()
         except Exception:
             pass
+        pending = self.copies.pending()
+        if pending:
+            self.status_var.set(f"⏳ Finishing {pending} copies…")
+            self.update_idletasks()
+        self.copies.close()
+        if self.duplicates is not None:
+            self.duplicates.close()
+        if self.analyzer is not None:
+            self.analyzer.close()
         self.destroy()
 
 
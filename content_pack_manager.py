@@ -194,6 +194,10 @@ class ContentPack:
         subcategory = self.info.get('subcategory', 'Unknown')
         return f"{category} → {subcategory}"
     
+    def get_clip_filters(self) -> Dict:
+        """Render-time darken / crop / scale for this pack's clips (see utils/clip_filters.py)"""
+        return self.info.get('clip_filters') or {}
+    
     def get_quote_count(self) -> int:
         """How many quotes are in this pack?"""
         return len(self.quotes)
@@ -206,18 +210,21 @@ class ContentPack:
             'audio': len(self.get_audio_files())
         }
     
-    def get_quotes_and_references(self, randomize: bool = True, count: int = None) -> Tuple[List[str], List[str]]:
+    def get_quotes_and_references(self, randomize: bool = True, count: int = None,
+                                  rng=None) -> Tuple[List[str], List[str]]:
         """
         Get quotes and references from this pack
         
         Args:
             randomize: Should we shuffle them?
             count: How many do we need?
+            rng: Optional random.Random (for reproducible batches with a seed)
             
         Returns:
             Tuple of (quotes, references)
         """
         import random
+        rng = rng or random
         
         if not self.quotes:
             return [], []
@@ -227,7 +234,7 @@ class ContentPack:
             refs_copy = self.references.copy()
             
             combined = list(zip(quotes_copy, refs_copy))
-            random.shuffle(combined)
+            rng.shuffle(combined)
             quotes_shuffled, refs_shuffled = zip(*combined) if combined else ([], [])
             quotes_shuffled = list(quotes_shuffled)
             refs_shuffled = list(refs_shuffled)
@@ -240,7 +247,7 @@ class ContentPack:
                 
                 for i in range(times_to_repeat):
                     combined = list(zip(self.quotes.copy(), self.references.copy()))
-                    random.shuffle(combined)
+                    rng.shuffle(combined)
                     q, r = zip(*combined) if combined else ([], [])
                     all_quotes.extend(q)
                     all_refs.extend(r)
@@ -5,6 +5,7 @@ import subprocess
 import re
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 import json_handler
 import verse_handler
 import Fonts
@@ -13,7 +14,15 @@ import cv2
 # Import TTS providers
 from providers.elevenlabs_tts import ElevenLabsTTS
 from providers.cartesia_tts import CartesiaTTS
-from utils.audio_utils import get_audio_duration, mix_voice_and_music, prepare_video_for_audio, prepare_background_music
+from providers.mock_tts import MockTTS
+from providers.tts_cache import get_default_tts_cache
+from providers.duration_model import expected_error
+from utils.audio_utils import get_audio_duration, mix_voice_and_music, loop_video_to_duration, prepare_background_music
+from utils.loudness import gain_for_track
+from utils.scratch import ScratchWorkspace
+from utils import clip_filters as clip_filter_settings
+from utils import metrics
+from utils import output_catalog
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -22,31 +31,239 @@ load_dotenv()
 # MINIMUM VIDEO DURATION (in seconds)
 MINIMUM_VIDEO_DURATION = 10.0  # All TTS videos will be at least 10 seconds
 
+# Voice-overs are synthesized on these threads while the render prepares everything else
+_tts_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="tts")
+
+# Grouped renders (create_videos_grouped): memory budget and frames one output's encoder holds
+DEFAULT_GROUP_MEMORY_MB = 2048
+GROUP_FRAMES_PER_OUTPUT = 40
+
+# x264 settings for the final encode, selectable per job
+ENCODER_PROFILES = {
+    'default': {'preset': 'veryfast', 'crf': 18},
+    'draft': {'preset': 'ultrafast', 'crf': 26},
+    'quality': {'preset': 'medium', 'crf': 17},
+}
+
+# Per-platform variants written next to the master video (create_video delivery_profiles):
+# frame rate, x264 quality / bitrate cap and integrated loudness target (LUFS)
+DELIVERY_PROFILES = {
+    'shorts': {'fps': 30, 'crf': 18, 'maxrate': '15M', 'bufsize': '30M', 'loudness': -14, 'audio_bitrate': '192k'},
+    'tiktok': {'fps': 30, 'crf': 20, 'maxrate': '8M', 'bufsize': '16M', 'loudness': -14, 'audio_bitrate': '128k'},
+    'reels': {'fps': 30, 'crf': 20, 'maxrate': '5M', 'bufsize': '10M', 'loudness': -14, 'audio_bitrate': '128k'},
+}
+
+
+def delivery_outputs(output_folder, file_name, delivery_profiles):
+    """[{name, path, settings...}] for each delivery profile: <output_folder>/<profile>/<file_name>"""
+    deliveries = []
+    for name in delivery_profiles or []:
+        if name not in DELIVERY_PROFILES:
+            raise ValueError(f"Unknown delivery profile '{name}' (known: {', '.join(DELIVERY_PROFILES)})")
+        os.makedirs(f"{output_folder}/{name}", exist_ok=True)
+        deliveries.append({"name": name, "path": f"{output_folder}/{name}/{file_name.strip('/')}",
+                           **DELIVERY_PROFILES[name]})
+    return deliveries
+
 
 def create_dirs(output_folder, customer_name, posts=True):
     """Create necessary output directories"""
     output_path = f"{output_folder}/{customer_name}"
-    if not os.path.exists(output_path):
-        os.makedirs(output_path)
-    
-    if not os.path.exists(f"{output_path}/verse_images"):
-        os.makedirs(f"{output_path}/verse_images")
+    # exist_ok: several workers may create the same customer folders at once
+    os.makedirs(output_path, exist_ok=True)
+    os.makedirs(f"{output_path}/verse_images", exist_ok=True)
     
-    if posts and not os.path.exists(f"{output_path}/post_images"):
-        os.makedirs(f"{output_path}/post_images")
+    if posts:
+        os.makedirs(f"{output_path}/post_images", exist_ok=True)
     
     # Create TTS audio folder if using TTS
-    if not os.path.exists(f"{output_path}/tts_audio"):
-        os.makedirs(f"{output_path}/tts_audio")
+    os.makedirs(f"{output_path}/tts_audio", exist_ok=True)
     
     return output_path
 
 
+def init_tts_engine(tts_provider):
+    """Create the TTS engine for a provider name using the API key from .env (None if unavailable)"""
+    print(f"\n🎤 Initializing {tts_provider.upper()} TTS provider...")
+
+    if tts_provider == 'elevenlabs':
+        api_key = os.getenv('ELEVENLABS_API_KEY')
+        if not api_key:
+            print("❌ Error: ELEVENLABS_API_KEY not found in .env file!")
+            return None
+        tts_engine = ElevenLabsTTS(api_key=api_key)
+        print(f"✅ ElevenLabs TTS initialized!")
+        return tts_engine
+
+    if tts_provider == 'cartesia':
+        api_key = os.getenv('CARTESIA_API_KEY')
+        if not api_key:
+            print("❌ Error: CARTESIA_API_KEY not found in .env file!")
+            return None
+        tts_engine = CartesiaTTS(api_key=api_key)
+        print(f"✅ Cartesia TTS initialized!")
+        return tts_engine
+
+    if tts_provider == 'mock':
+        # Local stand-in service for offline testing (providers/mock_tts.py)
+        tts_engine = MockTTS(base_url=os.getenv('MOCK_TTS_URL'))
+        print(f"✅ Mock TTS initialized ({tts_engine.host}:{tts_engine.port})")
+        return tts_engine
+
+    print(f"❌ Error: Unknown TTS provider '{tts_provider}'")
+    return None
+
+
+def load_content(content_pack, json_file, number_of_videos, randomize=True, rng=None):
+    """
+    Get (verses, refs) from a content pack, or from a legacy JSON file as fallback.
+    Returns (None, None) if there is no content source.
+    """
+    rng = rng or random
+
+    # Load content from content pack (NEW WAY!)
+    if content_pack:
+        # Get quotes from the pack with randomization!
+        verses, refs = content_pack.get_quotes_and_references(
+            randomize=randomize,
+            count=number_of_videos,
+            rng=rng
+        )
+        print(f"📦 Using content pack: {content_pack.get_display_name()}")
+        print(f"🎲 Randomization: {'ON' if randomize else 'OFF'}")
+        return verses, refs
+
+    # Fallback to old method (if no pack selected)
+    print("⚠️ No content pack selected, using legacy method")
+    if not json_file:
+        print("❌ Error: No content source provided!")
+        return None, None
+    json_data = json_handler.get_data(json_file)
+    verses = json_data[0]
+    refs = json_data[1]
+
+    # Apply randomization manually if enabled
+    if randomize:
+        combined = list(zip(verses, refs))
+        rng.shuffle(combined)
+        verses, refs = zip(*combined) if combined else ([], [])
+        verses = list(verses)
+        refs = list(refs)
+    return verses, refs
+
+
+def get_media_files(content_pack, video_folder, audio_folder):
+    """Video and audio file lists from the pack's library folders (or plain folders as fallback)"""
+    # Get video and audio files from the pack (NEW!)
+    if content_pack:
+        # Get files from pack's library folders
+        video_files = content_pack.get_video_files()
+        audio_files = content_pack.get_audio_files()
+        
+        print(f"\n📦 Using content pack resources:")
+        print(f"   🎥 {len(video_files)} videos available")
+        print(f"   🎵 {len(audio_files)} audio files available")
+    else:
+        # Fallback to folder scanning (old method)
+        video_files = [f"{video_folder}/{file}" for file in os.listdir(video_folder) if file.endswith(".mp4")]
+        audio_files = [f"{audio_folder}/{file}" for file in os.listdir(audio_folder) if file.endswith(".mp3")]
+    
+    if not video_files:
+        raise Exception(f"No MP4 video files found!")
+    if not audio_files:
+        raise Exception(f"No MP3 audio files found!")
+    return video_files, audio_files
+
+
+def video_duration_for_voice(voice_duration: float) -> float:
+    """Video length for a voice-over: voice starts at 1s, plus a 1.5s ending, never below the minimum"""
+    return max(1.0 + voice_duration + 1.5, MINIMUM_VIDEO_DURATION)
+
+
+def speculative_duration(tts_engine, voice_id: str, predicted_voice: float) -> float:
+    """
+    Video length to prepare the background for before the voice exists. Padded
+    by twice the voice's typical prediction error: a slightly long loop is
+    trimmed for free, a short one has to be redone.
+    """
+    error = expected_error(tts_engine, voice_id)
+    margin = 2 * error if error is not None else 0.25 * predicted_voice
+    return video_duration_for_voice(predicted_voice + margin)
+
+
+def _synthesize_voice(tts_engine, text_verse, tts_voice_id, tts_audio_path):
+    with metrics.stage("tts"), metrics.tts_request(tts_engine.get_provider_name()):
+        return get_default_tts_cache().synthesize(
+            tts_engine,
+            text=text_verse,
+            voice_id=tts_voice_id,
+            output_path=tts_audio_path
+        )
+
+
+def plan_videos(verses, refs, number_of_videos, video_files, audio_files, fonts: Fonts, rng=None):
+    """
+    Decide clip, music track and font for every video up front.
+
+    Returns a list of dicts (one per video) whose keys match create_video's
+    arguments, plus the chosen indexes for reporting.
+    """
+    rng = rng or random
+
+    # Prepare random selections
+    videos_num = list()
+    audios_num = list()
+    fonts_num = list()
+
+    # Create random but distributed selections
+    random_for_video = rng.randint(0, len(video_files) - 1)
+    random_for_audio = rng.randint(0, len(audio_files) - 1)
+    random_for_font = rng.randint(0, len(fonts.fonts_path) - 1)
+    
+    for i in range(number_of_videos):
+        videos_num.append((random_for_video + i) % len(video_files))
+        audios_num.append((random_for_audio + i) % len(audio_files))
+        fonts_num.append((random_for_font + i) % len(fonts.fonts_path))
+    
+    rng.shuffle(videos_num)
+    rng.shuffle(audios_num)
+    rng.shuffle(fonts_num)
+
+    plan = []
+    for i in range(number_of_videos):
+        text_verse = verses[i]
+        text_source = refs[i]
+        video_num, audio_num, font_num = videos_num[i], audios_num[i], fonts_num[i]
+
+        # Create filename
+        text_source_for_image = text_source.replace(":", "").rstrip('\n')
+        text_source_for_name = text_source_for_image.replace(' ', '')
+        file_name = f"/{i}-{text_source_for_name}_{video_num}_{audio_num}_{font_num}.mp4"
+
+        plan.append({
+            'video_index': i,
+            'text_verse': text_verse,
+            'text_source': text_source,
+            'text_source_for_image': text_source_for_image,
+            'video_file': video_files[video_num],
+            'audio_file': audio_files[audio_num],
+            'font_file': fonts.fonts_path[font_num],
+            'font_size': fonts.fonts_size[font_num],
+            'font_chars': fonts.fonts_chars_limit[font_num],
+            'file_name': file_name,
+            'video_num': video_num,
+            'audio_num': audio_num,
+            'font_num': font_num,
+        })
+    return plan
+
+
 def create_videos(video_folder, audio_folder, fonts_dir, output_folder, 
                   text_source_font, image_file: str, customer_name, number_of_videos, 
                   fonts: Fonts, posts=False, progress_callback=None, use_logo=True,
                   use_tts=False, tts_provider=None, tts_voice_id=None,
-                  content_pack=None, randomize=True, json_file=None):
+                  content_pack=None, randomize=True, json_file=None, keep_intermediates=None,
+                  encoder_profile="default"):
     """
     Create multiple videos with progress tracking and optional AI voices
     
@@ -59,58 +276,19 @@ def create_videos(video_folder, audio_folder, fonts_dir, output_folder,
         content_pack: ContentPack object with resources (NEW!)
         randomize: Boolean to enable quote randomization (NEW!)
         json_file: Legacy JSON file path (fallback)
+        keep_intermediates: Keep per-video scratch files for debugging (default: env var)
+        encoder_profile: Name of an entry in ENCODER_PROFILES
     """
     # Initialize TTS provider if needed
     tts_engine = None
     if use_tts and tts_provider and tts_voice_id:
-        print(f"\n🎤 Initializing {tts_provider.upper()} TTS provider...")
-        
-        if tts_provider == 'elevenlabs':
-            api_key = os.getenv('ELEVENLABS_API_KEY')
-            if not api_key:
-                print("❌ Error: ELEVENLABS_API_KEY not found in .env file!")
-                use_tts = False
-            else:
-                tts_engine = ElevenLabsTTS(api_key=api_key)
-                print(f"✅ ElevenLabs TTS initialized!")
-        
-        elif tts_provider == 'cartesia':
-            api_key = os.getenv('CARTESIA_API_KEY')
-            if not api_key:
-                print("❌ Error: CARTESIA_API_KEY not found in .env file!")
-                use_tts = False
-            else:
-                tts_engine = CartesiaTTS(api_key=api_key)
-                print(f"✅ Cartesia TTS initialized!")
+        tts_engine = init_tts_engine(tts_provider)
+        if not tts_engine:
+            use_tts = False
     
-    # Load content from content pack (NEW WAY!)
-    if content_pack:
-        # Get quotes from the pack with randomization!
-        verses, refs = content_pack.get_quotes_and_references(
-            randomize=randomize,
-            count=number_of_videos
-        )
-        print(f"📦 Using content pack: {content_pack.get_display_name()}")
-        print(f"🎲 Randomization: {'ON' if randomize else 'OFF'}")
-    else:
-        # Fallback to old method (if no pack selected)
-        print("⚠️ No content pack selected, using legacy method")
-        if json_file:
-            json_data = json_handler.get_data(json_file)
-            verses = json_data[0]
-            refs = json_data[1]
-        else:
-            print("❌ Error: No content source provided!")
-            return
-        
-        # Apply randomization manually if enabled
-        if randomize:
-            import random
-            combined = list(zip(verses, refs))
-            random.shuffle(combined)
-            verses, refs = zip(*combined) if combined else ([], [])
-            verses = list(verses)
-            refs = list(refs)
+    verses, refs = load_content(content_pack, json_file, number_of_videos, randomize)
+    if verses is None:
+        return
 
     # Validate number of videos
     if number_of_videos == -1:
@@ -126,43 +304,8 @@ def create_videos(video_folder, audio_folder, fonts_dir, output_folder,
     if number_of_videos > 1:
         start_time_total = time.time()
 
-    # Prepare random selections
-    videos_num = list()
-    audios_num = list()
-    fonts_num = list()
-
-    # Get video and audio files from the pack (NEW!)
-    if content_pack:
-        # Get files from pack's library folders
-        video_files = content_pack.get_video_files()
-        audio_files = content_pack.get_audio_files()
-        
-        print(f"\n📦 Using content pack resources:")
-        print(f"   🎥 {len(video_files)} videos available")
-        print(f"   🎵 {len(audio_files)} audio files available")
-    else:
-        # Fallback to folder scanning (old method)
-        video_files = [f"{video_folder}/{file}" for file in os.listdir(video_folder) if file.endswith(".mp4")]
-        audio_files = [f"{audio_folder}/{file}" for file in os.listdir(audio_folder) if file.endswith(".mp3")]
-    
-    if not video_files:
-        raise Exception(f"No MP4 video files found!")
-    if not audio_files:
-        raise Exception(f"No MP3 audio files found!")
-    
-    # Create random but distributed selections
-    random_for_video = random.randint(0, len(video_files) - 1)
-    random_for_audio = random.randint(0, len(audio_files) - 1)
-    random_for_font = random.randint(0, len(fonts.fonts_path) - 1)
-    
-    for i in range(number_of_videos):
-        videos_num.append((random_for_video + i) % len(video_files))
-        audios_num.append((random_for_audio + i) % len(audio_files))
-        fonts_num.append((random_for_font + i) % len(fonts.fonts_path))
-    
-    random.shuffle(videos_num)
-    random.shuffle(audios_num)
-    random.shuffle(fonts_num)
+    video_files, audio_files = get_media_files(content_pack, video_folder, audio_folder)
+    plan = plan_videos(verses, refs, number_of_videos, video_files, audio_files, fonts)
 
     # Create output directory
     output_path = create_dirs(output_folder, customer_name, posts)
@@ -184,7 +327,7 @@ def create_videos(video_folder, audio_folder, fonts_dir, output_folder,
         print(f"\033[0;32m   for {number_of_videos} videos!\033[0m")
 
     # Create each video
-    for i in range(number_of_videos):
+    for i, task in enumerate(plan):
         start_time = time.time()
         
         # Report progress
@@ -195,55 +338,37 @@ def create_videos(video_folder, audio_folder, fonts_dir, output_folder,
         print(f"🎬 Creating Video #{i+1}/{number_of_videos}")
         print(f"{'='*50}")
 
-        text_verse = verses[i]
-        text_source = refs[i]
-
-        # Select resources
-        random_video_num = videos_num[0]
-        del videos_num[0]
-        video_file = video_files[random_video_num]
-
-        random_font_num = fonts_num[0]
-        del fonts_num[0]
-        font_file = fonts.fonts_path[random_font_num]
-        font_size = fonts.fonts_size[random_font_num]
-        font_chars = fonts.fonts_chars_limit[random_font_num]
-
-        random_audio_num = audios_num[0]
-        del audios_num[0]
-        audio_file = audio_files[random_audio_num]
-
-        # Create filename
-        text_source_for_image = text_source.replace(":", "").rstrip('\n')
-        text_source_for_name = text_source_for_image.replace(' ', '')
-        file_name = f"/{i}-{text_source_for_name}_{random_video_num}_{random_audio_num}_{random_font_num}.mp4"
+        text_verse = task['text_verse']
+        text_source = task['text_source']
+        file_name = task['file_name']
 
         # Create the video
         print(f"📝 Quote: {text_source}")
-        print(f"🎥 Video: {os.path.basename(video_file)}")
+        print(f"🎥 Video: {os.path.basename(task['video_file'])}")
         
         if use_tts and tts_engine:
             print(f"🎤 AI Voice: Enabled ({tts_provider.upper()})")
         else:
-            print(f"🎵 Audio: {os.path.basename(audio_file)}")
+            print(f"🎵 Audio: {os.path.basename(task['audio_file'])}")
         
-        print(f"✍️ Font: {os.path.basename(font_file)}")
+        print(f"✍️ Font: {os.path.basename(task['font_file'])}")
         if use_logo:
             print(f"🖼️ Logo: {os.path.basename(image_file)}")
         else:
             print(f"🖼️ Logo: Disabled")
         
-        create_video(
+        clip_filters = content_pack.get_clip_filters() if content_pack else None
+        info = create_video(
             text_verse=text_verse, 
             text_source=text_source, 
             text_source_font=text_source_font,
-            text_source_for_image=text_source_for_image,
-            video_file=video_file, 
-            audio_file=audio_file, 
+            text_source_for_image=task['text_source_for_image'],
+            video_file=task['video_file'], 
+            audio_file=task['audio_file'], 
             image_file=image_file,
-            font_file=font_file, 
-            font_size=font_size, 
-            font_chars=font_chars,
+            font_file=task['font_file'], 
+            font_size=task['font_size'], 
+            font_chars=task['font_chars'],
             posts=posts,
             output_path=output_path, 
             file_name=file_name,
@@ -251,8 +376,16 @@ def create_videos(video_folder, audio_folder, fonts_dir, output_folder,
             use_tts=use_tts,
             tts_engine=tts_engine,
             tts_voice_id=tts_voice_id,
-            video_index=i
+            video_index=i,
+            keep_intermediates=keep_intermediates,
+            encoder_profile=encoder_profile,
+            clip_filters=clip_filters
         )
+        output_catalog.add_video(
+            output_folder, task, customer_name, output_path, info=info, seconds=round(time.time() - start_time, 2),
+            tts_provider=tts_provider if use_tts and tts_engine else None,
+            voice=tts_voice_id if use_tts and tts_engine else None,
+            encoder_profile=encoder_profile, settings={"clip_filters": clip_filters or {}})
 
         # Record for spreadsheet
         spreadsheet_col1.append(file_name.strip("/"))
@@ -297,7 +430,9 @@ def create_videos(video_folder, audio_folder, fonts_dir, output_folder,
 def create_video(text_verse, text_source, text_source_font, text_source_for_image, 
                  video_file: str, audio_file, image_file, font_file, font_size, 
                  font_chars, output_path, file_name, posts=True, use_logo=True,
-                 use_tts=False, tts_engine=None, tts_voice_id=None, video_index=0):
+                 use_tts=False, tts_engine=None, tts_voice_id=None, video_index=0,
+                 keep_intermediates=None, encoder_profile="default", delivery_profiles=None,
+                 clip_filters=None):
     """Create a single video with all overlays and optional AI voice
     
     Args:
@@ -306,13 +441,42 @@ def create_video(text_verse, text_source, text_source_font, text_source_for_imag
         tts_engine: TTS provider instance (ElevenLabsTTS or CartesiaTTS)
         tts_voice_id: Voice ID to use
         video_index: Index of current video (for unique filenames)
+        keep_intermediates: Keep the scratch workspace for debugging
+                            (default: SHORTSMAKER_KEEP_INTERMEDIATES env var)
+        encoder_profile: Name of an entry in ENCODER_PROFILES
+        delivery_profiles: Names from DELIVERY_PROFILES; each variant is encoded
+                           in the same ffmpeg pass into <output_path>/<profile>/
+        clip_filters: Darken / crop / scale applied to the clip in the final graph
+                      (see utils/clip_filters.py)
+
+    Returns:
+        {file, duration, deliveries} of the rendered video (see video_info)
     """
-    
-    # Layout coordinates
-    image_y = 0
-    image_text_source_y = 800
+    # Mixed audio / adjusted clips go to a private scratch folder that is removed afterwards
+    with ScratchWorkspace(f"video_{video_index}", keep=keep_intermediates) as workspace:
+        prepared = _prepare_video(
+            text_verse=text_verse, text_source=text_source, text_source_font=text_source_font,
+            text_source_for_image=text_source_for_image, video_file=video_file,
+            audio_file=audio_file, image_file=image_file, font_file=font_file,
+            font_size=font_size, font_chars=font_chars, output_path=output_path,
+            file_name=file_name, posts=posts, use_logo=use_logo, use_tts=use_tts,
+            tts_engine=tts_engine, tts_voice_id=tts_voice_id, video_index=video_index,
+            workspace=workspace, encoder_profile=encoder_profile,
+            delivery_profiles=delivery_profiles, clip_filters=clip_filters
+        )
+        _encode_video(prepared)
+    return video_info(prepared)
+
+
+def video_info(prepared: dict) -> dict:
+    """What a render produced: output file, length (s) and delivery variant files"""
+    return {"file": prepared['output_file'], "duration": prepared['video_duration'],
+            "deliveries": {d['name']: d['path'] for d in prepared['deliveries']}}
+
 
-    # Get video dimensions
+def probe_clip(video_file: str):
+    """(width, height, duration) of a background clip"""
+    probe_started = time.perf_counter()
     result = subprocess.run(
         ['ffprobe', '-v', 'error', '-show_entries', 'stream=width,height', '-of', 'csv=p=0:s=x', video_file],
         stdout=subprocess.PIPE, 
@@ -325,23 +489,59 @@ def create_video(text_verse, text_source, text_source_font, text_source_for_imag
     ffprobe_command = f'ffprobe -i "{video_file}" -show_entries format=duration -v quiet -of csv="p=0"'
     video_duration = subprocess.check_output(ffprobe_command, shell=True)
     video_duration = float(video_duration.decode('utf-8').strip())
+    metrics.stage_seconds.observe(time.perf_counter() - probe_started, stage="probe")
+    return video_width, video_height, video_duration
+
+
+def _prepare_video(text_verse, text_source, text_source_font, text_source_for_image,
+                   video_file: str, audio_file, image_file, font_file, font_size,
+                   font_chars, output_path, file_name, posts, use_logo,
+                   use_tts, tts_engine, tts_voice_id, video_index, workspace: ScratchWorkspace,
+                   encoder_profile="default", delivery_profiles=None, clip_filters=None,
+                   loop_background=True):
+    """
+    Everything create_video does before the final encode (voice, audio mix,
+    overlay layer, background length); intermediate files go into workspace.
+    With loop_background=False the clip is left as it is and the encoder is
+    expected to loop it (grouped renders use -stream_loop).
+    Returns the inputs of the final encode as a dict.
+    """
+    
+    # Layout coordinates
+    image_y = 0
+    image_text_source_y = 800
+
+    # Get video dimensions and duration; overlays are laid out for the frame after the clip filters
+    clip_width, clip_height, video_duration = probe_clip(video_file)
+    clip_settings = clip_filter_settings.normalize(clip_filters)
+    video_width, video_height = clip_filter_settings.output_size(clip_width, clip_height, clip_settings)
+    clip_chain = clip_filter_settings.filter_chain(clip_width, clip_height, clip_settings)
+
+    # Start the voice-over first; the verse image and background are prepared while it is in flight
+    tts_future = None
+    predicted_voice = None
+    if use_tts and tts_engine and tts_voice_id:
+        print(f"\n🎤 Generating AI voice for this video...")
+        tts_audio_path = f"{output_path}/tts_audio/voice_{video_index}.mp3"
+        predicted_voice = tts_engine.estimate_duration(text_verse, voice_id=tts_voice_id)
+        tts_future = _tts_pool.submit(_synthesize_voice, tts_engine, text_verse, tts_voice_id, tts_audio_path)
 
     # Timing
     text_start_time = 1
     text_color = (255, 255, 255, 255)
-    font_color = "white"
 
     # Create quote image
-    created_verse_image_data = verse_handler.create_image(
-        text_verse, 
-        font_file, 
-        font_size, 
-        font_chars,
-        (int(video_width), int(video_height / 2)), 
-        output_path,
-        text_source_for_image, 
-        text_color=text_color
-    )
+    with metrics.stage("verse_image"):
+        created_verse_image_data = verse_handler.create_image(
+            text_verse, 
+            font_file, 
+            font_size, 
+            font_chars,
+            (int(video_width), int(video_height / 2)), 
+            output_path,
+            text_source_for_image, 
+            text_color=text_color
+        )
     created_verse_image = created_verse_image_data[0]
     verse_height = created_verse_image_data[1]
 
@@ -354,54 +554,71 @@ def create_video(text_verse, text_source, text_source_font, text_source_for_imag
         text2_y = 1200
         image_text_source_y -= diff
 
+    # Speculatively loop a too-short clip to the predicted length
+    speculative = None
+    if tts_future is not None and loop_background:
+        guess = speculative_duration(tts_engine, tts_voice_id, predicted_voice)
+        if guess - video_duration > 1.0:
+            try:
+                print(f"   📹 Preparing background for ~{guess:.1f}s while the voice is generated...")
+                with metrics.stage("video_adjust"):
+                    speculative = (loop_video_to_duration(video_file, guess, workspace.file("video_speculative.mp4")), guess)
+            except Exception as e:
+                print(f"   ⚠️ Could not prepare background early: {str(e)}")
+
     # Handle AI Voice Generation
     final_audio_file = audio_file
+
+    # Precomputed loudness correction for the music track (0 dB if not analyzed yet)
+    music_gain_db = gain_for_track(audio_file)
     
-    if use_tts and tts_engine and tts_voice_id:
+    if tts_future is not None:
         try:
-            print(f"\n🎤 Generating AI voice for this video...")
-            
-            # Generate TTS audio
-            tts_audio_path = f"{output_path}/tts_audio/voice_{video_index}.mp3"
-            tts_engine.generate_audio(
-                text=text_verse,
-                voice_id=tts_voice_id,
-                output_path=tts_audio_path
-            )
+            # Wait for the TTS audio
+            tts_future.result()
             
             # Get voice duration
             voice_duration = get_audio_duration(tts_audio_path)
-            print(f"   ✅ AI voice generated ({voice_duration:.1f} seconds)")
+            print(f"   ✅ AI voice generated ({voice_duration:.1f} seconds, predicted {predicted_voice:.1f})")
+            if voice_duration > 0:
+                metrics.tts_duration_error.observe(abs(voice_duration - predicted_voice),
+                                                   provider=tts_engine.get_provider_name())
             
-            # Calculate total video duration
-            # Voice starts at 1s, so total = 1s + voice_duration + 1.5s ending
-            calculated_duration = 1.0 + voice_duration + 1.5
-            
-            # Enforce minimum duration
-            video_target_duration = max(calculated_duration, MINIMUM_VIDEO_DURATION)
+            # Calculate total video duration (at least MINIMUM_VIDEO_DURATION)
+            video_target_duration = video_duration_for_voice(voice_duration)
             
             print(f"   📏 Target video duration: {video_target_duration:.1f}s (minimum: {MINIMUM_VIDEO_DURATION}s)")
             
             # Mix voice + background music
             # Music starts at 0s, voice starts at 1s
-            mixed_audio_path = f"{output_path}/tts_audio/final_mix_{video_index}.mp3"
-            mix_voice_and_music(
-                voice_audio=tts_audio_path,
-                background_music=audio_file,
-                output_file=mixed_audio_path,
-                video_duration=video_target_duration,
-                voice_delay=1.0,  # Voice starts at 1 second
-                voice_volume=1.0,
-                music_volume=0.15
-            )
+            mixed_audio_path = workspace.file("final_mix.wav")
+            with metrics.stage("mix"):
+                mixed_audio_path = mix_voice_and_music(
+                    voice_audio=tts_audio_path,
+                    background_music=audio_file,
+                    output_file=mixed_audio_path,
+                    video_duration=video_target_duration,
+                    voice_delay=1.0,  # Voice starts at 1 second
+                    voice_volume=1.0,
+                    music_volume=0.15,
+                    music_gain_db=music_gain_db
+                )
             
             final_audio_file = mixed_audio_path
             
-            # Adjust video to match target duration
-            if abs(video_duration - video_target_duration) > 1.0:
-                print(f"   📹 Adjusting video to {video_target_duration:.1f}s...")
-                adjusted_video = f"{output_path}/tts_audio/video_adjusted_{video_index}.mp4"
-                video_file = prepare_video_for_audio(video_file, video_target_duration, adjusted_video)
+            # Reconcile the background with the real length: longer clips are
+            # trimmed by -t in the final pass, only a too-short one is extended
+            if speculative is not None:
+                metrics.cache_lookup("speculative_background", hit=speculative[1] >= video_target_duration)
+            if video_duration >= video_target_duration or not loop_background:
+                video_duration = video_target_duration
+            elif speculative is not None and speculative[1] >= video_target_duration:
+                video_file, video_duration = speculative[0], video_target_duration
+            elif video_target_duration - video_duration > 1.0:
+                print(f"   📹 Extending video to {video_target_duration:.1f}s...")
+                adjusted_video = workspace.file("video_adjusted.mp4")
+                with metrics.stage("video_adjust"):
+                    video_file = loop_video_to_duration(video_file, video_target_duration, adjusted_video)
                 video_duration = video_target_duration
             
         except Exception as e:
@@ -413,75 +630,234 @@ def create_video(text_verse, text_source, text_source_font, text_source_for_imag
     if not use_tts:
         try:
             print(f"\n🎵 Processing background audio...")
-            processed_audio = f"{output_path}/tts_audio/music_processed_{video_index}.mp3"
-            prepare_background_music(
-                music_file=audio_file,
-                output_file=processed_audio,
-                target_duration=video_duration
-            )
+            processed_audio = workspace.file("music_processed.wav")
+            with metrics.stage("music"):
+                processed_audio = prepare_background_music(
+                    music_file=audio_file,
+                    output_file=processed_audio,
+                    target_duration=video_duration,
+                    gain_db=music_gain_db
+                )
             final_audio_file = processed_audio
         except Exception as e:
             print(f"   ⚠️ Could not process audio, using original: {str(e)}")
             final_audio_file = audio_file
 
-    # Escape special characters for ffmpeg
-    text_source = text_source.replace(':', '\\:')
     output_folder = output_path
     output_path += f"/{file_name}"
     
-    # Build ffmpeg command - WITH or WITHOUT logo
-    if use_logo:
-        # Original command with logo overlay
-        ffmpeg_command = (
-            f'ffmpeg -loglevel error -stats -y '
-            f'-loop 1 -i "{image_file}" '
-            f'-i "{final_audio_file}" '
-            f'-i "{video_file}" '
-            f'-i "{created_verse_image}" '
-            f'-r 24 -filter_complex '
-            f'"[2:v][0:v]overlay=(W-w)/2:{image_y}[v1]; '
-            f'[v1]drawtext=fontfile=\'{text_source_font}\':'
-            f'text=\'{text_source}\':'
-            f'x=(w-text_w)/2:y={text2_y}:'
-            f'fontsize=42:fontcolor={font_color}:'
-            f'enable=\'between(t,{text_start_time},{video_duration})\'[v2]; '
-            f'[v2][3:v]overlay=(W-w)/2:{image_text_source_y}:'
-            f'enable=\'between(t,{text_start_time},{video_duration})\'[v3]" '
-            f'-t {video_duration} -map "[v3]" -map 1 '
-            f'-c:v libx264 -preset veryfast -crf 18 "{output_path}"'
+    if encoder_profile not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder profile '{encoder_profile}' (known: {', '.join(ENCODER_PROFILES)})")
+    encoder = ENCODER_PROFILES[encoder_profile]
+    encoder_args = f"-c:v libx264 -preset {encoder['preset']} -crf {encoder['crf']}"
+    deliveries = delivery_outputs(output_folder, file_name, delivery_profiles)
+    for delivery in deliveries:
+        delivery['preset'] = encoder['preset']
+
+    # Logo, reference and verse are static: flatten them into one premultiplied layer
+    with metrics.stage("overlay"):
+        overlay_layer = verse_handler.compose_overlay(
+            frame_size=(video_width, video_height),
+            verse_image=created_verse_image,
+            verse_y=image_text_source_y,
+            reference=text_source,
+            reference_font=text_source_font,
+            reference_y=text2_y,
+            logo_image=image_file if use_logo else None,
+            logo_y=image_y,
+            text_color=text_color
         )
-    else:
-        # Simplified command WITHOUT logo overlay
-        ffmpeg_command = (
-            f'ffmpeg -loglevel error -stats -y '
-            f'-i "{final_audio_file}" '
-            f'-i "{video_file}" '
-            f'-i "{created_verse_image}" '
-            f'-r 24 -filter_complex '
-            f'"[1:v]drawtext=fontfile=\'{text_source_font}\':'
-            f'text=\'{text_source}\':'
-            f'x=(w-text_w)/2:y={text2_y}:'
-            f'fontsize=42:fontcolor={font_color}:'
-            f'enable=\'between(t,{text_start_time},{video_duration})\'[v1]; '
-            f'[v1][2:v]overlay=(W-w)/2:{image_text_source_y}:'
-            f'enable=\'between(t,{text_start_time},{video_duration})\'[v2]" '
-            f'-t {video_duration} -map "[v2]" -map 0 '
-            f'-c:v libx264 -preset veryfast -crf 18 "{output_path}"'
+
+    return {
+        "video_file": video_file, "video_duration": video_duration, "audio_file": final_audio_file,
+        "overlay_layer": overlay_layer, "text_start_time": text_start_time,
+        "output_file": output_path, "output_folder": output_folder, "posts": posts,
+        "encoder_args": encoder_args, "deliveries": deliveries, "clip_chain": clip_chain,
+    }
+
+
+def _output_branches(prepared: dict, video_label: str, audio_stream: str, tag: str):
+    """
+    Filter graph parts and output arguments for one composited video: the master
+    file, plus (after a split) one branch per delivery profile with its own
+    frame rate, loudness normalization and encoder settings.
+    """
+    duration = prepared['video_duration']
+    deliveries = prepared.get('deliveries') or []
+    master = f'-r 24 -t {duration} {prepared["encoder_args"]} "{prepared["output_file"]}"'
+    if not deliveries:
+        return [], [f'-map "[{video_label}]" -map {audio_stream} {master}']
+
+    count = len(deliveries) + 1
+    graph = [
+        f'[{video_label}]split={count}[{tag}m]' + ''.join(f'[{tag}v{k}]' for k in range(len(deliveries))),
+        f'[{audio_stream}]asplit={count}[{tag}am]' + ''.join(f'[{tag}a{k}]' for k in range(len(deliveries))),
+    ]
+    outputs = [f'-map "[{tag}m]" -map "[{tag}am]" {master}']
+    for k, delivery in enumerate(deliveries):
+        graph.append(f'[{tag}v{k}]fps={delivery["fps"]}[{tag}dv{k}]')
+        graph.append(f'[{tag}a{k}]loudnorm=I={delivery["loudness"]}:TP=-1.5:LRA=11,aresample=48000[{tag}da{k}]')
+        outputs.append(
+            f'-map "[{tag}dv{k}]" -map "[{tag}da{k}]" -t {duration} '
+            f'-c:v libx264 -preset {delivery["preset"]} -crf {delivery["crf"]} '
+            f'-maxrate {delivery["maxrate"]} -bufsize {delivery["bufsize"]} -pix_fmt yuv420p '
+            f'-c:a aac -b:a {delivery["audio_bitrate"]} "{delivery["path"]}"'
         )
+    return graph, outputs
+
+
+def _encode_video(prepared: dict):
+    """Final encode of one prepared video (see _prepare_video)"""
+    # One still image, one overlay (the single frame is repeated to the end)
+    video_duration = prepared['video_duration']
+    branches, outputs = _output_branches(prepared, "v", "0:a", "o")
+    graph = []
+    background = "1:v"
+    if prepared['clip_chain']:
+        graph.append(f'[1:v]{prepared["clip_chain"]}[bg]')
+        background = "bg"
+    graph.append(f'[{background}][2:v]overlay=0:0:alpha=premultiplied:'
+                 f'enable=\'gte(t,{prepared["text_start_time"]})\'[v]')
+    ffmpeg_command = (
+        f'ffmpeg -loglevel error -stats -y '
+        f'-i "{prepared["audio_file"]}" '
+        f'-i "{prepared["video_file"]}" '
+        f'-i "{prepared["overlay_layer"]}" '
+        f'-filter_complex "{"; ".join(graph + branches)}" '
+        + ' '.join(outputs)
+    )
 
     # Execute ffmpeg
+    encode_started = time.perf_counter()
     try:
         subprocess.check_call(ffmpeg_command, shell=True)
     except subprocess.CalledProcessError as e:
         print(f"❌ Error creating video: {e}")
         raise
+    encode_seconds = time.perf_counter() - encode_started
+    metrics.stage_seconds.observe(encode_seconds, stage="encode")
+    metrics.record_encode(video_duration * (1 + len(prepared['deliveries'])), encode_seconds)
+    _post_images(prepared)
+
+
+def _post_images(prepared: dict):
+    """Create post images if requested"""
+    if prepared['posts']:
+        with metrics.stage("post_image"):
+            verse_handler.create_post_images(
+                video_path=prepared['output_file'], 
+                output_folder=f"{prepared['output_folder']}/post_images"
+            )
 
-    # Create post images if requested
-    if posts:
-        verse_handler.create_post_images(
-            video_path=output_path, 
-            output_folder=f"{output_folder}/post_images"
+
+def group_size_limit(frame_size, memory_limit_mb: float) -> int:
+    """How many outputs one grouped encode may have within memory_limit_mb"""
+    width, height = frame_size
+    per_output = width * height * 1.5 * GROUP_FRAMES_PER_OUTPUT  # yuv420p frames held per encoder
+    return max(1, int(memory_limit_mb * 1024 * 1024 // per_output))
+
+
+def create_videos_grouped(videos, memory_limit_mb=DEFAULT_GROUP_MEMORY_MB, keep_intermediates=None):
+    """
+    Render several videos that share one background clip with a single ffmpeg:
+    the clip is decoded (and looped) once and split to every output, each with
+    its own overlay layer, audio and length.
+
+    Args:
+        videos: create_video keyword arguments, all with the same video_file,
+                encoder_profile, delivery_profiles and clip_filters
+        memory_limit_mb: bigger groups are encoded in several passes
+                         (see group_size_limit)
+        keep_intermediates: keep the scratch workspaces for debugging
+
+    Returns:
+        One result per video, in order: video_info plus "error" (None = rendered)
+    """
+    results = [{"error": None} for _ in videos]
+    clip = videos[0]['video_file']
+    clip_width, clip_height, clip_duration = probe_clip(clip)
+    frame_size = clip_filter_settings.output_size(
+        clip_width, clip_height, clip_filter_settings.normalize(videos[0].get('clip_filters')))
+    outputs_per_video = 1 + len(videos[0].get('delivery_profiles') or [])
+    step = max(1, group_size_limit(frame_size, memory_limit_mb) // outputs_per_video)
+    for first in range(0, len(videos), step):
+        chunk = list(range(first, min(first + step, len(videos))))
+        workspaces = {i: ScratchWorkspace(f"video_{videos[i].get('video_index', i)}", keep=keep_intermediates)
+                      for i in chunk}
+        try:
+            # Voices, mixes and layers of the whole chunk are prepared in parallel
+            def prepare(i):
+                kwargs = {k: v for k, v in videos[i].items() if k != 'keep_intermediates'}
+                return _prepare_video(**kwargs, workspace=workspaces[i], loop_background=False)
+
+            prepared = {}
+            with ThreadPoolExecutor(max_workers=min(8, len(chunk)), thread_name_prefix="prepare") as pool:
+                futures = {i: pool.submit(prepare, i) for i in chunk}
+            for i, future in futures.items():
+                if future.exception() is not None:
+                    print(f"❌ Could not prepare video {i}: {future.exception()}")
+                    results[i]["error"] = future.exception()
+                else:
+                    prepared[i] = future.result()
+            if not prepared:
+                continue
+            try:
+                _encode_group(clip, clip_duration, list(prepared.values()))
+            except Exception as e:
+                for i in prepared:
+                    results[i]["error"] = e
+                continue
+            for i, item in prepared.items():
+                results[i].update(video_info(item))
+                try:
+                    _post_images(item)
+                except Exception as e:
+                    results[i]["error"] = e
+        finally:
+            for workspace in workspaces.values():
+                workspace.cleanup()
+    return results
+
+
+def _encode_group(clip: str, clip_duration: float, prepared):
+    """One ffmpeg: decode clip once, split it, one overlay + audio + length per output"""
+    count = len(prepared)
+    longest = max(item['video_duration'] for item in prepared)
+    loop = '-stream_loop -1 ' if longest > clip_duration else ''
+
+    inputs = [f'{loop}-i "{clip}"']
+    chain = prepared[0]['clip_chain']
+    graph = [f'[0:v]{chain + "," if chain else ""}split={count}' + ''.join(f'[s{i}]' for i in range(count))]
+    outputs = []
+    for i, item in enumerate(prepared):
+        audio_input, layer_input = 1 + 2 * i, 2 + 2 * i
+        inputs.append(f'-i "{item["audio_file"]}" -i "{item["overlay_layer"]}"')
+        graph.append(
+            f'[s{i}]trim=duration={item["video_duration"]},setpts=PTS-STARTPTS[b{i}]; '
+            f'[b{i}][{layer_input}:v]overlay=0:0:alpha=premultiplied:'
+            f'enable=\'gte(t,{item["text_start_time"]})\'[v{i}]'
         )
+        branches, item_outputs = _output_branches(item, f"v{i}", f"{audio_input}:a", f"o{i}")
+        graph.extend(branches)
+        outputs.extend(item_outputs)
+    ffmpeg_command = (
+        f'ffmpeg -loglevel error -stats -y '
+        + ' '.join(inputs)
+        + ' -filter_complex "' + '; '.join(graph) + '" '
+        + ' '.join(outputs)
+    )
+
+    print(f"🎞️ Encoding {count} videos from one decode of {os.path.basename(clip)}")
+    encode_started = time.perf_counter()
+    try:
+        subprocess.check_call(ffmpeg_command, shell=True)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Error creating videos: {e}")
+        raise
+    encode_seconds = time.perf_counter() - encode_started
+    metrics.stage_seconds.observe(encode_seconds, stage="encode")
+    metrics.record_encode(sum(item['video_duration'] * (1 + len(item['deliveries'])) for item in prepared),
+                          encode_seconds)
 
 
 def get_avg_runtime(filename: str):
@@ -1,14 +1,16 @@
 """
 File Organizer — responsive + Windows-friendly.
-- Plays a temp preview copy so the original file isn't locked by the player.
-- Moves originals to library/audio|video/<category>.
-- Move and preview-copy are both done in background threads to avoid UI freezes.
+- Plays a preview stand-in so the original file isn't locked by the player
+  (hardlink / clone / low-res proxy, see utils/preview_cache.py).
+- Moves originals to library/audio|video/<category> (hardlinks into the
+  content store, utils/asset_store.py), after warning when the library
+  already holds the same clip/track (utils/duplicates.py). Pointed at a
+  library category folder, it recategorizes (a rename, no copy).
+- Moves and previews are done in background threads to avoid UI freezes; the
+  next few files' previews are prepared while the current one plays.
 """
 
 import sys
-import shutil
-import uuid
-import os
 from pathlib import Path
 
 from PyQt6.QtWidgets import (
@@ -16,11 +18,19 @@ from PyQt6.QtWidgets import (
     QPushButton, QLabel, QProgressBar, QFileDialog, QMessageBox,
     QGroupBox, QScrollArea, QSizePolicy
 )
-from PyQt6.QtCore import Qt, QUrl, QThread, pyqtSignal, QObject
+from PyQt6.QtCore import Qt, QUrl, QThread, QTimer, pyqtSignal, QObject
 from PyQt6.QtGui import QFont
 from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 from PyQt6.QtMultimediaWidgets import QVideoWidget
 
+from utils.asset_store import get_default_store
+from utils.duplicates import DuplicateChecker, describe
+from utils.preview_cache import PreviewCache
+
+PREFETCH_COUNT = 3        # upcoming files whose previews are prepared in advance
+PREVIEW_CACHE_MB = 2048
+DUPLICATE_POLL_MS = 200   # how often a move waiting for its duplicate check looks again
+
 
 # ---------------- background workers ---------------- #
 
@@ -34,8 +44,13 @@ class MoveWorker(QObject):
 
     def run(self):
         try:
-            self.dst.parent.mkdir(parents=True, exist_ok=True)
-            shutil.move(str(self.src), str(self.dst))
+            store = get_default_store()
+            if store.in_library(self.src):
+                # Recategorizing a library file: a rename, no bytes move
+                store.move_view(self.src, self.dst)
+            else:
+                # Into the content store; the category file is a hardlink to it
+                store.place(self.src, self.dst, move=True)
             self.finished.emit(True, "")
         except Exception as e:
             self.finished.emit(False, str(e))
@@ -44,16 +59,14 @@ class MoveWorker(QObject):
 class PreviewWorker(QObject):
     finished = pyqtSignal(bool, str, str)  # success, error, preview_path
 
-    def __init__(self, src: Path, preview_dir: Path):
+    def __init__(self, src: Path, cache: PreviewCache):
         super().__init__()
         self.src = Path(src)
-        self.preview_dir = Path(preview_dir)
+        self.cache = cache
 
     def run(self):
         try:
-            self.preview_dir.mkdir(exist_ok=True)
-            preview_path = self.preview_dir / f"{uuid.uuid4().hex}{self.src.suffix}"
-            shutil.copy2(str(self.src), str(preview_path))
+            preview_path = self.cache.get(self.src)  # usually already prefetched
             self.finished.emit(True, "", str(preview_path))
         except Exception as e:
             self.finished.emit(False, str(e), "")
@@ -75,10 +88,19 @@ class FileOrganizerWindow(QMainWindow):
         self.library_path = Path("library")
         self.media_root = {"video": "video", "audio": "audio"}  # exact folder names
 
-        # Preview cache
-        self.preview_dir = Path.cwd() / ".preview_cache"
+        # Preview cache (size-capped, emptied when the window closes)
+        self.preview_cache = PreviewCache(Path.cwd() / ".preview_cache",
+                                          max_bytes=PREVIEW_CACHE_MB * 1024 * 1024)
         self.current_preview: Path | None = None
 
+        # Duplicate checks against the library (started with the first folder)
+        self.duplicates: DuplicateChecker | None = None
+        # Category chosen while the current file's check was still running; filed once it is done
+        self._pending_category: str | None = None
+        self._duplicate_timer = QTimer(self)
+        self._duplicate_timer.setInterval(DUPLICATE_POLL_MS)
+        self._duplicate_timer.timeout.connect(self._on_duplicate_poll)
+
         # Player
         self.media_player = QMediaPlayer()
         self.audio_output = QAudioOutput()
@@ -90,6 +112,7 @@ class FileOrganizerWindow(QMainWindow):
         # Worker threads
         self._move_thread: QThread | None = None
         self._move_worker: MoveWorker | None = None
+        self._moving: tuple[Path, Path] | None = None
         self._preview_thread: QThread | None = None
         self._preview_worker: PreviewWorker | None = None
         self._preview_inflight = False
@@ -224,6 +247,8 @@ class FileOrganizerWindow(QMainWindow):
 
         self.current_index = 0
         self.update_progress()
+        if self.duplicates is None:
+            self.duplicates = DuplicateChecker(self.library_path)
 
         self.setup_category_buttons()
         self.category_group.setVisible(True)
@@ -296,15 +321,12 @@ class FileOrganizerWindow(QMainWindow):
             self.media_player.setSource(QUrl())
         except Exception:
             pass
-        if self.current_preview and self.current_preview.exists():
-            try:
-                os.remove(self.current_preview)
-            except Exception:
-                pass
+        if self.current_preview:
+            self.preview_cache.release(self.current_preview)
         self.current_preview = None
 
     def load_current_file(self):
-        """Start background copy for preview; UI stays responsive."""
+        """Fetch the preview in the background (and prefetch the next ones); UI stays responsive."""
         if self.current_index >= len(self.files_to_organize):
             self.finish_organizing()
             return
@@ -318,10 +340,10 @@ class FileOrganizerWindow(QMainWindow):
         self.skip_btn.setEnabled(False)
         self.status_label.setText("⏳ Preparing preview...")
 
-        # Kick off preview copy in background
+        # Kick off preview in background
         self._preview_inflight = True
         self._preview_thread = QThread()
-        self._preview_worker = PreviewWorker(src, self.preview_dir)
+        self._preview_worker = PreviewWorker(src, self.preview_cache)
         self._preview_worker.moveToThread(self._preview_thread)
         self._preview_thread.started.connect(self._preview_worker.run)
         self._preview_worker.finished.connect(self._on_preview_ready)
@@ -329,6 +351,17 @@ class FileOrganizerWindow(QMainWindow):
         self._preview_worker.finished.connect(self._preview_worker.deleteLater)
         self._preview_thread.finished.connect(self._preview_thread.deleteLater)
         self._preview_thread.start()
+        upcoming = self.files_to_organize[self.current_index + 1:self.current_index + 1 + PREFETCH_COUNT]
+        self.preview_cache.prefetch(upcoming)
+        for path in [src] + upcoming:
+            self.duplicates.check_async(path)
+
+    def _duplicate_matches(self, src: Path) -> list[dict]:
+        """Library files that look like src ([] if unknown yet or the check failed); never waits"""
+        check = self.duplicates.check_async(src)
+        if not check.done() or check.cancelled() or check.exception() is not None:
+            return []
+        return check.result()
 
     def _on_preview_ready(self, success: bool, error: str, preview_path: str):
         self._preview_inflight = False
@@ -346,7 +379,11 @@ class FileOrganizerWindow(QMainWindow):
         self.play_btn.setText("⏸ Pause")
         self.play_btn.setEnabled(True)
         self.skip_btn.setEnabled(True)
-        self.status_label.setText("▶ Playing preview")
+        matches = self._duplicate_matches(self.files_to_organize[self.current_index])
+        if matches:
+            self.status_label.setText(f"⚠️ Possible duplicate of {describe(matches, limit=1)}")
+        else:
+            self.status_label.setText("▶ Playing preview")
 
     # ============================= ACTIONS ============================= #
 
@@ -362,13 +399,34 @@ class FileOrganizerWindow(QMainWindow):
     def move_to_category(self, category: str):
         """Move original in background; preview keeps playing temp file."""
         if self._preview_inflight:
-            # avoid starting a move while preview is copying
+            # avoid starting a move while the preview is being prepared
             return
         if self.current_index >= len(self.files_to_organize):
             return
 
         src = self.files_to_organize[self.current_index]
 
+        # Never wait for the check here (on a first run it needs the whole library):
+        # remember the choice and come back when the check is done
+        check = self.duplicates.check_async(src)
+        if not check.done():
+            self._pending_category = category
+            self._duplicate_timer.start()
+            self.status_label.setText(f"⏳ Duplicate check pending — {src.name} goes to {category} when it's done")
+            return
+        self._cancel_pending_move()
+
+        question = None
+        if check.cancelled() or check.exception() is not None:
+            reason = "cancelled" if check.cancelled() else check.exception()
+            question = f"The duplicate check for {src.name} failed ({reason}).\n\nFile it anyway?"
+        elif check.result():
+            question = (f"{src.name} looks like a file already in the library:\n\n{describe(check.result())}\n\n"
+                        "File it anyway?")
+        if question and QMessageBox.question(self, "Possible Duplicate", question) != QMessageBox.StandardButton.Yes:
+            self.status_label.setText("▶ Playing preview")
+            return
+
         base_root = self.media_root[self.organizing_type]  # 'audio' or 'video'
         dest_folder = self.library_path / base_root / category
         dest_folder.mkdir(parents=True, exist_ok=True)
@@ -385,6 +443,7 @@ class FileOrganizerWindow(QMainWindow):
         self.skip_btn.setEnabled(False)
         self.status_label.setText("⏳ Moving file...")
 
+        self._moving = (src, dest)
         self._move_thread = QThread()
         self._move_worker = MoveWorker(src, dest)
         self._move_worker.moveToThread(self._move_thread)
@@ -395,6 +454,17 @@ class FileOrganizerWindow(QMainWindow):
         self._move_thread.finished.connect(self._move_thread.deleteLater)
         self._move_thread.start()
 
+    def _on_duplicate_poll(self):
+        if self._pending_category is None or self.current_index >= len(self.files_to_organize):
+            self._cancel_pending_move()
+            return
+        if self.duplicates.check_async(self.files_to_organize[self.current_index]).done():
+            self.move_to_category(self._pending_category)
+
+    def _cancel_pending_move(self):
+        self._pending_category = None
+        self._duplicate_timer.stop()
+
     def _on_move_finished(self, success: bool, error: str):
         if not success:
             QMessageBox.warning(self, "Move Error", error)
@@ -402,6 +472,9 @@ class FileOrganizerWindow(QMainWindow):
             self.skip_btn.setEnabled(True)
             return
 
+        if self._moving:
+            self.duplicates.filed(*self._moving)
+            self._moving = None
         self.status_label.setText("✅ Moved.")
         # Advance to next file immediately; preview keeps playing old temp until next ready
         self.current_index += 1
@@ -411,6 +484,7 @@ class FileOrganizerWindow(QMainWindow):
     def skip_file(self):
         if self._preview_inflight:
             return
+        self._cancel_pending_move()
         self.status_label.setText("⏭ Skipped (kept in original location)")
         self.current_index += 1
         self.update_progress()
@@ -449,6 +523,14 @@ class FileOrganizerWindow(QMainWindow):
             f"They're now in: library/{self.media_root[self.organizing_type]}/"
         )
 
+    def closeEvent(self, event):
+        self._cancel_pending_move()
+        self._cleanup_preview()
+        self.preview_cache.close()
+        if self.duplicates is not None:
+            self.duplicates.close()
+        super().closeEvent(event)
+
 
 def main():
     app = QApplication(sys.argv)
@@ -22,6 +22,8 @@ from Fonts import Fonts
 # Import TTS providers
 from providers.elevenlabs_tts import ElevenLabsTTS
 from providers.cartesia_tts import CartesiaTTS
+from providers.tts_cache import get_default_tts_cache
+from providers.voice_catalog import VoiceListUnavailable, get_default_catalog
 
 # Import content pack manager (NEW!)
 from content_pack_manager import ContentPackManager
@@ -74,6 +76,47 @@ class VideoCreatorThread(QThread):
         self.status.emit(f"Creating video {current} of {total}...")
 
 
+class VoiceLoaderThread(QThread):
+    """Fetches a provider's voice list in the background and stores it in the voice catalog"""
+    loaded = pyqtSignal(str, list)
+    failed = pyqtSignal(str, str, list)  # provider, error, built-in voices to use meanwhile (not cached)
+    
+    def __init__(self, provider_name, provider, catalog):
+        super().__init__()
+        self.provider_name = provider_name
+        self.provider = provider
+        self.catalog = catalog
+    
+    def run(self):
+        try:
+            voices = self.catalog.refresh(self.provider_name, self.provider)
+            self.loaded.emit(self.provider_name, voices)
+        except VoiceListUnavailable as e:
+            self.failed.emit(self.provider_name, str(e), e.fallback)
+        except Exception as e:
+            self.failed.emit(self.provider_name, str(e), [])
+
+
+class TestVoiceThread(QThread):
+    """Synthesizes the test sentence in the background (through the TTS cache)"""
+    done = pyqtSignal(bool, str)
+    
+    def __init__(self, provider, text, voice_id, output_path):
+        super().__init__()
+        self.provider = provider
+        self.text = text
+        self.voice_id = voice_id
+        self.output_path = output_path
+    
+    def run(self):
+        try:
+            get_default_tts_cache().synthesize(
+                self.provider, text=self.text, voice_id=self.voice_id, output_path=self.output_path)
+            self.done.emit(True, self.output_path)
+        except Exception as e:
+            self.done.emit(False, str(e))
+
+
 class ShortsMakerGUI(QMainWindow):
     """Main application window"""
     
@@ -83,6 +126,9 @@ class ShortsMakerGUI(QMainWindow):
         load_dotenv()
         self.tts_providers = {}
         self.current_voices = []
+        self.voice_catalog = get_default_catalog()
+        self.voice_request = None
+        self.background_threads = []
         self.pack_manager = ContentPackManager()
         self.selected_pack_key = ""
         self.init_ui()
@@ -343,22 +389,63 @@ class ShortsMakerGUI(QMainWindow):
                 self.api_key_status_label.setText("✅ Cartesia: Connected")
                 self.api_key_status_label.setStyleSheet("color: #4CAF50; font-weight: bold;")
             
-            voices = provider.get_available_voices()
-            self.current_voices = voices
-            
-            self.voice_combo.clear()
-            for voice in voices:
-                display_text = f"{voice['name']} - {voice['description']}"
-                self.voice_combo.addItem(display_text, voice['id'])
-            
-            self.test_voice_btn.setEnabled(True)
-            self.status_label.setText(f"✅ Loaded {len(voices)} voices from {provider_name.title()}!")
+            # Show the cached list right away; fetch in the background if it's missing or old
+            self.voice_request = provider_name
+            cached = self.voice_catalog.cached(provider_name)
+            if cached:
+                self.populate_voices(provider_name, cached)
+            if cached is None or not self.voice_catalog.is_fresh(provider_name):
+                self.start_background(VoiceLoaderThread(provider_name, provider, self.voice_catalog),
+                                      loaded=self.on_voices_loaded, failed=self.on_voices_failed)
             
         except Exception as e:
             self.voice_combo.clear()
             self.voice_combo.addItem(f"❌ Error loading voices: {str(e)}")
             self.status_label.setText(f"❌ Error: {str(e)}")
     
+    def start_background(self, thread, **signals):
+        """Start a QThread and keep a reference until it finishes"""
+        for name, slot in signals.items():
+            getattr(thread, name).connect(slot)
+        self.background_threads.append(thread)
+        thread.finished.connect(lambda: self.background_threads.remove(thread))
+        thread.start()
+    
+    def populate_voices(self, provider_name, voices):
+        selected = self.voice_combo.currentData()
+        self.current_voices = voices
+        
+        self.voice_combo.clear()
+        for voice in voices:
+            display_text = f"{voice['name']} - {voice['description']}"
+            self.voice_combo.addItem(display_text, voice['id'])
+        
+        index = self.voice_combo.findData(selected) if selected else -1
+        if index >= 0:
+            self.voice_combo.setCurrentIndex(index)
+        
+        self.test_voice_btn.setEnabled(True)
+        self.status_label.setText(f"✅ Loaded {len(voices)} voices from {provider_name.title()}!")
+    
+    def on_voices_loaded(self, provider_name, voices):
+        if provider_name != self.voice_request:
+            return  # user switched provider meanwhile
+        self.populate_voices(provider_name, voices)
+    
+    def on_voices_failed(self, provider_name, error, fallback):
+        if provider_name != self.voice_request:
+            return
+        if self.voice_catalog.cached(provider_name):
+            self.status_label.setText(f"⚠️ Could not refresh voices, showing saved list: {error}")
+            return
+        if fallback:
+            self.populate_voices(provider_name, fallback)
+            self.status_label.setText(f"⚠️ {error} Showing the built-in voices for now.")
+            return
+        self.voice_combo.clear()
+        self.voice_combo.addItem(f"❌ Error loading voices: {error}")
+        self.status_label.setText(f"❌ Error: {error}")
+    
     def test_voice(self):
         if self.voice_combo.currentIndex() < 0:
             return
@@ -381,22 +468,28 @@ class ShortsMakerGUI(QMainWindow):
             
             self.status_label.setText(f"🎤 Generating test audio with {voice_name}...")
             
-            provider.generate_audio(text=test_text, voice_id=voice_id, output_path=output_path)
-            
-            self.status_label.setText(f"✅ Test audio created! Listen to: {output_path}")
-            
-            try:
-                import subprocess
-                subprocess.Popen(["start", output_path], shell=True)
-            except:
-                pass
+            self.start_background(TestVoiceThread(provider, test_text, voice_id, output_path),
+                                  done=self.on_test_voice_done)
             
         except Exception as e:
             self.status_label.setText(f"❌ Error testing voice: {str(e)}")
-        finally:
             self.test_voice_btn.setEnabled(True)
             self.test_voice_btn.setText("🔊 Test Voice")
     
+    def on_test_voice_done(self, success, result):
+        self.test_voice_btn.setEnabled(True)
+        self.test_voice_btn.setText("🔊 Test Voice")
+        if not success:
+            self.status_label.setText(f"❌ Error testing voice: {result}")
+            return
+        
+        self.status_label.setText(f"✅ Test audio created! Listen to: {result}")
+        try:
+            import subprocess
+            subprocess.Popen(["start", result], shell=True)
+        except:
+            pass
+    
     def create_file_selector_compact(self, default_path, file_filter):
         layout = QHBoxLayout()
         
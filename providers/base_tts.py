@@ -4,7 +4,9 @@ This is like a recipe card that says what every voice service needs to do
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from providers.transport import TTSTransport, get_transport
 
 
 class BaseTTSProvider(ABC):
@@ -75,13 +77,15 @@ class BaseTTSProvider(ABC):
         pass
     
     @abstractmethod
-    def estimate_duration(self, text: str) -> float:
+    def estimate_duration(self, text: str, voice_id: Optional[str] = None) -> float:
         """
         Figure out how long the audio will be (in seconds)
         This helps us know if we need to loop the video!
         
         Args:
             text: The text that will be spoken
+            voice_id: The voice that will speak it (learned per voice, see
+                providers/duration_model.py)
             
         Returns:
             float: Number of seconds (like 12.5 seconds)
@@ -107,6 +111,14 @@ class BaseTTSProvider(ABC):
         except:
             return False
     
+    @property
+    def transport(self) -> TTSTransport:
+        """
+        Shared connection pool + retry/rate limiting for this voice service
+        (one per service for the whole program, see providers/transport.py)
+        """
+        return get_transport(self.provider_name)
+    
     def get_provider_name(self) -> str:
         """Get the name of this voice service (like "ElevenLabs" or "Cartesia")"""
         return self.provider_name
@@ -4,11 +4,12 @@ Cartesia provides ultra-fast, low-latency AI voices!
 Known for: Speed, natural sound, and emotional control
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 import os
 from cartesia import Cartesia
 
 from providers.base_tts import BaseTTSProvider
+from providers.duration_model import fitted_duration
 
 
 class CartesiaTTS(BaseTTSProvider):
@@ -28,7 +29,8 @@ class CartesiaTTS(BaseTTSProvider):
         self.provider_name = "Cartesia"
         
         # Create the Cartesia client
-        self.client = Cartesia(api_key=api_key)
+        # It uses the shared pooled connection; retries happen in self.transport
+        self.client = Cartesia(api_key=api_key, **self.transport.sdk_kwargs(Cartesia))
         
         # Default model (Cartesia's best English model)
         self.default_model = "sonic-english"
@@ -64,26 +66,31 @@ class CartesiaTTS(BaseTTSProvider):
             
             # THIS IS THE MAGIC! Generate the audio using Cartesia's API
             # Cartesia returns a generator, so we need to collect all chunks
-            audio_generator = self.client.tts.bytes(
-                model_id=model,
-                transcript=text,
-                voice={"mode": "id", "id": voice_id},
-                output_format={
-                    "container": "mp3",
-                    "encoding": "mp3",
-                    "sample_rate": 44100
-                },
-                language="en"
-            )
+            # The request and reading every chunk are one retryable unit
+            def request():
+                audio_generator = self.client.tts.bytes(
+                    model_id=model,
+                    transcript=text,
+                    voice={"mode": "id", "id": voice_id},
+                    output_format={
+                        "container": "mp3",
+                        "encoding": "mp3",
+                        "sample_rate": 44100
+                    },
+                    language="en"
+                )
+                
+                # Collect all audio chunks from the generator
+                audio_data = b""
+                for chunk in audio_generator:
+                    # Each chunk is a dictionary with 'audio' key
+                    if isinstance(chunk, dict) and 'audio' in chunk:
+                        audio_data += chunk['audio']
+                    elif isinstance(chunk, bytes):
+                        audio_data += chunk
+                return audio_data
             
-            # Collect all audio chunks from the generator
-            audio_data = b""
-            for chunk in audio_generator:
-                # Each chunk is a dictionary with 'audio' key
-                if isinstance(chunk, dict) and 'audio' in chunk:
-                    audio_data += chunk['audio']
-                elif isinstance(chunk, bytes):
-                    audio_data += chunk
+            audio_data = self.transport.call(request)
             
             # Save the complete audio to a file
             with open(output_path, 'wb') as audio_file:
@@ -107,7 +114,7 @@ class CartesiaTTS(BaseTTSProvider):
         """
         try:
             # Get voices from Cartesia
-            voices_response = self.client.voices.list()
+            voices_response = self.transport.call(lambda: list(self.client.voices.list()))
             
             voices_list = []
             for voice in voices_response:
@@ -125,41 +132,53 @@ class CartesiaTTS(BaseTTSProvider):
         except Exception as e:
             print(f"❌ Error getting voices: {str(e)}")
             # Return some popular Cartesia voices as fallback
+            # (marked 'fallback' so the voice catalog never caches them as the real list)
             return [
                 {
                     'id': 'a0e99841-438c-4a64-b679-ae501e7d6091',
                     'name': 'Barbershop Man',
-                    'description': 'Friendly, conversational male voice'
+                    'description': 'Friendly, conversational male voice',
+                    'fallback': True
                 },
                 {
                     'id': '79a125e8-cd45-4c13-8a67-188112f4dd22',
                     'name': 'British Lady',
-                    'description': 'Professional British female voice'
+                    'description': 'Professional British female voice',
+                    'fallback': True
                 },
                 {
                     'id': '5619d38c-cf51-4d8e-9575-48f61a280413',
                     'name': 'Calm Lady',
-                    'description': 'Soothing, gentle female voice'
+                    'description': 'Soothing, gentle female voice',
+                    'fallback': True
                 },
                 {
                     'id': '421b3369-f63f-4b03-8980-37a44df1d4e8',
                     'name': 'Friendly Sidekick',
-                    'description': 'Energetic, upbeat voice'
+                    'description': 'Energetic, upbeat voice',
+                    'fallback': True
                 },
             ]
     
-    def estimate_duration(self, text: str) -> float:
+    def estimate_duration(self, text: str, voice_id: Optional[str] = None) -> float:
         """
         Estimate how long the audio will be
+        Uses the duration model learned from our cached audio when there is
+        one for this voice, otherwise a fixed speaking rate.
         
         Cartesia speaks at about 160 words per minute (slightly faster than average)
         
         Args:
             text: The text that will be spoken
+            voice_id: The voice that will speak it
             
         Returns:
             Estimated duration in seconds
         """
+        learned = fitted_duration(self, voice_id, text)
+        if learned is not None:
+            return learned
+        
         # Count words
         word_count = len(text.split())
         
@@ -0,0 +1,249 @@
+"""
+TTS duration predictor
+Learns how long a voice takes to say a text from our own cached TTS output
+(providers/tts_cache.py), per (provider, voice, model). Features: characters,
+words, pause punctuation, sentence ends and numerals (which are read out long).
+
+With a prediction the video length is known before the audio arrives, so clip
+selection, background preparation and batch ETA don't have to wait for TTS.
+
+Groups with too few clips fall back to the voice's fit across models, then to
+the provider-wide fit, then to the provider's old words-per-second rule.
+
+Batches refit the model by themselves once REFIT_AFTER new clips have been
+cached since the last fit (refit_if_stale); it can also be fitted by hand:
+
+    python -m providers.duration_model fit     # fit + print cross-validated error per voice
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_MODEL_FILE = Path(".cache") / "duration_model.json"
+FEATURES = ["bias", "chars", "words", "pauses", "sentences", "numerals"]
+MIN_CLIPS = 8           # clips needed before a group gets its own fit
+RIDGE = 1e-2            # keeps small groups from producing wild coefficients
+FALLBACK_WORDS_PER_SECOND = 2.5
+# The providers' own fixed-rate estimates: (words per second, padding seconds)
+FALLBACK_RATES = {"elevenlabs": (2.5, 0.5), "cartesia": (2.67, 0.4), "mock": (2.6, 0.5)}
+REFIT_AFTER = 20        # newly cached clips that make the next batch refit the model
+ANY = "*"
+
+
+def text_features(text: str) -> np.ndarray:
+    return np.array([
+        1.0,
+        len(text),
+        len(text.split()),
+        len(re.findall(r"[,;:—–-]", text)),
+        len(re.findall(r"[.!?]+", text)),
+        len(re.findall(r"\d+", text)),
+    ], dtype=float)
+
+
+def fallback_duration(text: str, provider: Optional[str] = None) -> float:
+    """The provider's old fixed-rate estimate"""
+    words_per_second, padding = FALLBACK_RATES.get((provider or "").lower(), (FALLBACK_WORDS_PER_SECOND, 0.5))
+    return len(text.split()) / words_per_second + padding
+
+
+def _group_keys(provider: str, voice: str, model: str) -> List[Tuple[str, str, str]]:
+    provider = (provider or "").lower()
+    return [(provider, voice or "", model or ""), (provider, voice or "", ANY), (provider, ANY, ANY)]
+
+
+def _fit(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    penalty = RIDGE * np.eye(X.shape[1])
+    penalty[0, 0] = 0.0  # don't shrink the intercept
+    return np.linalg.solve(X.T @ X + penalty, X.T @ y)
+
+
+def _cross_validated_error(X: np.ndarray, y: np.ndarray, folds: int = 5) -> Dict[str, float]:
+    """k-fold mean absolute error (seconds) and mean absolute percentage error"""
+    n = len(y)
+    folds = min(folds, n)
+    errors = np.zeros(n)
+    indices = np.arange(n)
+    for k in range(folds):
+        test = indices[k::folds]
+        train = np.setdiff1d(indices, test)
+        coef = _fit(X[train], y[train])
+        errors[test] = X[test] @ coef - y[test]
+    return {"mae_seconds": round(float(np.mean(np.abs(errors))), 3),
+            "mape": round(float(np.mean(np.abs(errors) / np.maximum(y, 0.1))), 4)}
+
+
+class DurationModel:
+    """Linear duration model per (provider, voice, model) with fallbacks"""
+
+    def __init__(self, model_file=DEFAULT_MODEL_FILE):
+        self.model_file = Path(model_file)
+        self.groups: Dict[str, dict] = {}
+        self.cache_entries = 0  # TTS cache size at the last fit (see refit_if_stale)
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def _key(group: Tuple[str, str, str]) -> str:
+        return "|".join(group)
+
+    def load(self):
+        try:
+            with open(self.model_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.groups = data.get("groups", {})
+            self.cache_entries = data.get("cache_entries", 0)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.groups = {}
+
+    def save(self):
+        self.model_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.model_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"features": FEATURES, "fitted_at": time.time(), "cache_entries": self.cache_entries,
+                       "groups": self.groups}, f, indent=1)
+        os.replace(tmp, self.model_file)
+
+    def fit(self, samples: List[dict]) -> Dict[str, dict]:
+        """
+        samples: [{provider, voice_id, model, text, duration}] — fits every group with
+        enough clips and returns {group: {clips, coef, mae_seconds, mape, baseline_mae_seconds}}
+        """
+        buckets: Dict[Tuple[str, str, str], list] = {}
+        for s in samples:
+            if not s.get("duration") or not s.get("text"):
+                continue
+            for group in _group_keys(s.get("provider"), s.get("voice_id"), s.get("model")):
+                buckets.setdefault(group, []).append(s)
+
+        groups = {}
+        for group, rows in buckets.items():
+            if len(rows) < MIN_CLIPS:
+                continue
+            X = np.stack([text_features(r["text"]) for r in rows])
+            y = np.array([float(r["duration"]) for r in rows])
+            baseline = np.array([fallback_duration(r["text"], r.get("provider")) for r in rows])
+            groups[self._key(group)] = {
+                "clips": len(rows),
+                "coef": [round(float(c), 6) for c in _fit(X, y)],
+                **_cross_validated_error(X, y),
+                "baseline_mae_seconds": round(float(np.mean(np.abs(baseline - y))), 3),
+            }
+        with self._lock:
+            self.groups = groups
+        return groups
+
+    def group_for(self, provider: str, voice: str, model: str) -> Optional[str]:
+        with self._lock:
+            for group in _group_keys(provider, voice, model):
+                key = self._key(group)
+                if key in self.groups:
+                    return key
+        return None
+
+    def fitted(self, provider: str, voice: str, model: str, text: str) -> Optional[float]:
+        """Predicted speech duration in seconds, or None if nothing is fitted for this provider"""
+        key = self.group_for(provider, voice, model)
+        if key is None:
+            return None
+        coef = np.array(self.groups[key]["coef"])
+        return max(0.5, float(text_features(text) @ coef))
+
+    def predict(self, provider: str, voice: str, model: str, text: str) -> float:
+        """Predicted speech duration in seconds (fixed-rate estimate until a fit exists)"""
+        duration = self.fitted(provider, voice, model, text)
+        return fallback_duration(text, provider) if duration is None else duration
+
+    def expected_error(self, provider: str, voice: str, model: str) -> Optional[float]:
+        """Cross-validated mean absolute error (s) of the group used for this voice, if fitted"""
+        key = self.group_for(provider, voice, model)
+        return self.groups[key]["mae_seconds"] if key else None
+
+
+def collect_samples(cache=None) -> List[dict]:
+    """Training rows from the TTS cache; measures (and stores) missing durations"""
+    from providers.tts_cache import get_default_tts_cache
+    from utils.audio_utils import get_audio_duration
+
+    cache = cache or get_default_tts_cache()
+    samples = []
+    for entry in cache.entries():
+        if not entry.get("duration"):
+            duration = get_audio_duration(entry["path"])
+            if duration <= 0:
+                continue
+            entry["duration"] = duration
+            cache.update_meta(entry["path"], duration=duration)
+        samples.append(entry)
+    return samples
+
+
+def fit_from_cache(model: Optional["DurationModel"] = None, cache=None) -> Dict[str, dict]:
+    from providers.tts_cache import get_default_tts_cache
+
+    model = model or get_default_duration_model()
+    cache = cache or get_default_tts_cache()
+    samples = collect_samples(cache)
+    groups = model.fit(samples)
+    model.cache_entries = len(samples)
+    model.save()
+    return groups
+
+
+def refit_if_stale(model: Optional["DurationModel"] = None, cache=None) -> bool:
+    """Refit from the TTS cache if REFIT_AFTER clips were added since the last fit; True if it did"""
+    from providers.tts_cache import get_default_tts_cache
+
+    model = model or get_default_duration_model()
+    cache = cache or get_default_tts_cache()
+    with _refit_lock:  # jobs planned in parallel refit once
+        if cache.count() - model.cache_entries < REFIT_AFTER:
+            return False
+        fit_from_cache(model, cache)
+    return True
+
+
+_default_model = None
+_default_lock = threading.Lock()
+_refit_lock = threading.Lock()
+
+
+def get_default_duration_model() -> DurationModel:
+    global _default_model
+    with _default_lock:
+        if _default_model is None:
+            _default_model = DurationModel()
+        return _default_model
+
+
+def fitted_duration(engine, voice_id: Optional[str], text: str) -> Optional[float]:
+    """Learned duration for an engine instance (its name and default model), None without a fit"""
+    return get_default_duration_model().fitted(
+        engine.get_provider_name(), voice_id or "", getattr(engine, 'default_model', '') or '', text)
+
+
+def expected_error(engine, voice_id: Optional[str]) -> Optional[float]:
+    """Typical prediction error (s) for an engine's voice, None without a fit"""
+    return get_default_duration_model().expected_error(
+        engine.get_provider_name(), voice_id or "", getattr(engine, 'default_model', '') or '')
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] != ["fit"]:
+        print(__doc__)
+        sys.exit(1)
+    report = fit_from_cache()
+    if not report:
+        print(f"Not enough cached TTS clips yet (need {MIN_CLIPS} per group).")
+    for group, info in sorted(report.items()):
+        print(f"{group:60s} clips={info['clips']:4d}  MAE={info['mae_seconds']:.2f}s  "
+              f"MAPE={info['mape'] * 100:.1f}%  (fixed-rate MAE {info['baseline_mae_seconds']:.2f}s)")
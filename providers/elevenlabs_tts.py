@@ -3,11 +3,12 @@ ElevenLabs TTS Provider
 This connects to ElevenLabs and generates realistic AI voices!
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 import os
 from elevenlabs.client import ElevenLabs
 
 from providers.base_tts import BaseTTSProvider
+from providers.duration_model import fitted_duration
 
 
 class ElevenLabsTTS(BaseTTSProvider):
@@ -27,7 +28,11 @@ class ElevenLabsTTS(BaseTTSProvider):
         self.provider_name = "ElevenLabs"
         
         # Create the ElevenLabs client (this is what talks to their service)
-        self.client = ElevenLabs(api_key=api_key)
+        # It uses the shared pooled connection; retries happen in self.transport
+        self.client = ElevenLabs(api_key=api_key, **self.transport.sdk_kwargs(ElevenLabs))
+        
+        # Default model (also part of the TTS cache key)
+        self.default_model = "eleven_multilingual_v2"
     
     def generate_audio(self, text: str, voice_id: str, output_path: str, **kwargs) -> str:
         """
@@ -44,7 +49,7 @@ class ElevenLabsTTS(BaseTTSProvider):
         """
         
         # Get settings from kwargs
-        model = kwargs.get('model', 'eleven_multilingual_v2')
+        model = kwargs.get('model', self.default_model)
         
         try:
             print(f"🎤 Generating audio with ElevenLabs...")
@@ -58,18 +63,21 @@ class ElevenLabsTTS(BaseTTSProvider):
             
             # THIS IS THE MAGIC! Generate the audio using the new API
             # The new ElevenLabs SDK uses text_to_speech.convert()
-            audio_generator = self.client.text_to_speech.convert(
-                voice_id=voice_id,
-                text=text,
-                model_id=model
-            )
+            # and returns an iterator of audio chunks. The whole download is one
+            # retryable request, so a dropped stream is retried instead of saved half.
+            def request():
+                audio_generator = self.client.text_to_speech.convert(
+                    voice_id=voice_id,
+                    text=text,
+                    model_id=model
+                )
+                return b"".join(chunk for chunk in audio_generator if chunk)
+            
+            audio_data = self.transport.call(request)
             
             # Save it to a file
-            # The new API returns an iterator of audio chunks
             with open(output_path, 'wb') as audio_file:
-                for chunk in audio_generator:
-                    if chunk:
-                        audio_file.write(chunk)
+                audio_file.write(audio_data)
             
             print(f"   ✅ Audio saved to: {output_path}")
             return output_path
@@ -87,7 +95,7 @@ class ElevenLabsTTS(BaseTTSProvider):
         """
         try:
             # Ask ElevenLabs for all available voices using the new API
-            voices_response = self.client.voices.get_all()
+            voices_response = self.transport.call(self.client.voices.get_all)
             
             voices_list = []
             for voice in voices_response.voices:
@@ -102,21 +110,29 @@ class ElevenLabsTTS(BaseTTSProvider):
         except Exception as e:
             print(f"❌ Error getting voices: {str(e)}")
             # Return some common default voices if we can't get the list
+            # (marked 'fallback' so the voice catalog never caches them as the real list)
             return [
-                {'id': 'EXAVITQu4vr4xnSDxMaL', 'name': 'Rachel', 'description': 'Calm, warm female voice'},
-                {'id': 'pNInz6obpgDQGcFmaJgB', 'name': 'Adam', 'description': 'Deep, authoritative male voice'},
+                {'id': 'EXAVITQu4vr4xnSDxMaL', 'name': 'Rachel', 'description': 'Calm, warm female voice', 'fallback': True},
+                {'id': 'pNInz6obpgDQGcFmaJgB', 'name': 'Adam', 'description': 'Deep, authoritative male voice', 'fallback': True},
             ]
     
-    def estimate_duration(self, text: str) -> float:
+    def estimate_duration(self, text: str, voice_id: Optional[str] = None) -> float:
         """
         Estimate how long the audio will be
+        Uses the duration model learned from our cached audio when there is
+        one for this voice, otherwise a fixed speaking rate.
         
         Args:
             text: The text that will be spoken
+            voice_id: The voice that will speak it
             
         Returns:
             Estimated duration in seconds
         """
+        learned = fitted_duration(self, voice_id, text)
+        if learned is not None:
+            return learned
+        
         # Count words
         word_count = len(text.split())
         
@@ -0,0 +1,206 @@
+"""
+Hedged TTS requests
+Wraps a TTS provider so one slow request can't stall a video: if a request
+takes longer than the recent p95 (configurable), a second request is fired —
+to the same provider, or to a failover provider with a mapped voice — and
+whichever finishes first wins. If the primary fails outright, the failover
+provider is tried immediately.
+
+Hedges cost money, so they are capped: at most `max_hedge_rate` of all
+requests may be hedged. Stats report the hedge rate, how often the hedge won
+and how many seconds it saved.
+
+Requests can't be aborted mid-flight through the vendor SDKs, so "cancel"
+means: a hedge still waiting to start is dropped, and a loser that is already
+running finishes into its own temp file, which is thrown away.
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from providers.base_tts import BaseTTSProvider
+from utils import metrics
+
+tts_hedges_total = metrics.REGISTRY.counter(
+    "shortsmaker_tts_hedges_total", "Hedged / failed-over TTS requests", ["provider", "kind", "winner"])
+
+MIN_SAMPLES = 20        # latencies needed before the percentile deadline is trusted
+HISTORY = 200           # recent latencies kept per wrapper
+
+
+class HedgedTTS(BaseTTSProvider):
+    """
+    BaseTTSProvider that hedges the primary provider's slow requests.
+
+    Args:
+        primary: the provider normally used
+        failover: optional second provider for hedges / errors (None = duplicate to primary)
+        voice_map: {primary voice id: failover voice id}; unmapped voices hedge to the primary
+        percentile: hedge after this percentile of recent latencies (default p95)
+        initial_deadline: seconds to use until MIN_SAMPLES latencies are known
+        min_deadline: never hedge sooner than this
+        max_hedge_rate: at most this share of requests get a second request
+    """
+
+    def __init__(self, primary: BaseTTSProvider, failover: Optional[BaseTTSProvider] = None,
+                 voice_map: Optional[Dict[str, str]] = None, percentile: float = 95,
+                 initial_deadline: float = 8.0, min_deadline: float = 1.0,
+                 max_hedge_rate: float = 0.1):
+        super().__init__(primary.api_key)
+        self.primary = primary
+        self.failover = failover
+        self.voice_map = dict(voice_map or {})
+        self.percentile = percentile
+        self.initial_deadline = initial_deadline
+        self.min_deadline = min_deadline
+        self.max_hedge_rate = max_hedge_rate
+        self.provider_name = primary.get_provider_name()
+        self.default_model = getattr(primary, 'default_model', None)
+        self._latencies = deque(maxlen=HISTORY)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="tts-hedge")
+        self._stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0,
+                       "saved_seconds": 0.0, "capped": 0}
+
+    # ---------- deadline / budget ----------
+
+    def deadline(self) -> float:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < MIN_SAMPLES:
+            return self.initial_deadline
+        index = min(len(samples) - 1, int(round(self.percentile / 100 * (len(samples) - 1))))
+        return max(self.min_deadline, samples[index])
+
+    def _may_hedge(self) -> bool:
+        with self._lock:
+            allowed = self._stats["hedged"] + 1 <= self.max_hedge_rate * max(1, self._stats["requests"])
+            if not allowed:
+                self._stats["capped"] += 1
+            return allowed
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self._stats[key] += value
+
+    def _hedge_target(self, voice_id: str):
+        """(provider, voice id, kind) used for the second request"""
+        if self.failover is not None and voice_id in self.voice_map:
+            return self.failover, self.voice_map[voice_id], "failover"
+        return self.primary, voice_id, "duplicate"
+
+    def served_by(self) -> Optional[str]:
+        """Provider that produced the last audio on this thread (lets caches skip failover audio)"""
+        return getattr(self._local, "served_by", None)
+
+    # ---------- BaseTTSProvider ----------
+
+    def generate_audio(self, text: str, voice_id: str, output_path: str, **kwargs) -> str:
+        self._count(requests=1)
+        started = time.perf_counter()
+        tmp_base = f"{output_path}.{uuid.uuid4().hex}"
+        ext = os.path.splitext(output_path)[1] or ".mp3"
+
+        def attempt(provider, voice, tag):
+            path = f"{tmp_base}.{tag}{ext}"
+            provider.generate_audio(text=text, voice_id=voice, output_path=path, **kwargs)
+            return provider, path, time.perf_counter() - started
+
+        primary = self._pool.submit(attempt, self.primary, voice_id, "primary")
+        futures = {primary: "primary"}
+        kind = None
+        try:
+            done, _ = wait([primary], timeout=self.deadline())
+            if primary in done and primary.exception() is not None:
+                # Primary failed before the deadline: go straight to the other provider
+                provider, voice, kind = self._hedge_target(voice_id)
+                if kind != "failover":
+                    raise primary.exception()
+                self._count(failovers=1)
+                futures[self._pool.submit(attempt, provider, voice, kind)] = kind
+            elif primary not in done and self._may_hedge():
+                provider, voice, kind = self._hedge_target(voice_id)
+                self._count(hedged=1)
+                print(f"   🪁 {self.provider_name} slower than {self.deadline():.1f}s, hedging ({kind})")
+                futures[self._pool.submit(attempt, provider, voice, kind)] = kind
+
+            winner, error = self._first_success(futures)
+            if winner is None and kind is None and self._hedge_target(voice_id)[2] == "failover":
+                # Primary failed after the deadline without a hedge running
+                provider, voice, kind = self._hedge_target(voice_id)
+                self._count(failovers=1)
+                futures[self._pool.submit(attempt, provider, voice, kind)] = kind
+                winner, error = self._first_success({f: t for f, t in futures.items() if t == kind})
+            if winner is None:
+                raise error
+            provider, path, elapsed = winner.result()
+            winner_tag = futures[winner]
+            shutil.move(path, output_path)
+            self._local.served_by = provider.get_provider_name()
+        finally:
+            for future in futures:
+                future.cancel()
+                future.add_done_callback(lambda f: self._discard(f, output_path))
+
+        if kind is not None:
+            tts_hedges_total.inc(provider=self.provider_name, kind=kind, winner=winner_tag)
+        if winner_tag == "primary":
+            with self._lock:
+                self._latencies.append(elapsed)
+        else:
+            self._count(hedge_wins=1)
+            primary.add_done_callback(lambda f: self._record_saving(f, elapsed))
+        return output_path
+
+    def _first_success(self, futures):
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future, None
+                error = future.exception()
+        return None, error
+
+    def _discard(self, future, output_path):
+        """Delete a loser's temp file once it finishes"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        _, path, _ = future.result()
+        if path != output_path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _record_saving(self, primary_future, hedge_elapsed):
+        if primary_future.cancelled() or primary_future.exception() is not None:
+            return
+        _, _, primary_elapsed = primary_future.result()
+        with self._lock:
+            self._latencies.append(primary_elapsed)  # the slow tail still belongs in the history
+            self._stats["saved_seconds"] += max(0.0, primary_elapsed - hedge_elapsed)
+
+    def get_available_voices(self) -> List[Dict[str, str]]:
+        return self.primary.get_available_voices()
+
+    def estimate_duration(self, text: str, voice_id: Optional[str] = None) -> float:
+        return self.primary.estimate_duration(text, voice_id=voice_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats["requests"]
+        stats["hedge_rate"] = round(stats["hedged"] / requests, 3) if requests else 0.0
+        stats["saved_seconds"] = round(stats["saved_seconds"], 2)
+        stats["deadline_seconds"] = round(self.deadline(), 2)
+        return stats
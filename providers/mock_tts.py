@@ -0,0 +1,400 @@
+"""
+Mock TTS service + provider (offline load testing)
+A local HTTP server that behaves like a TTS API, and MockTTS, a normal
+BaseTTSProvider that talks to it. Nothing leaves the machine and no credits
+are spent, so the TTS-heavy path (concurrency, caching, retries, hedging) can
+be measured reproducibly.
+
+The audio is deterministic "speech-like" sound: voiced syllables (harmonics of
+a per-voice pitch) separated by short gaps and longer pauses at punctuation,
+so its duration grows with the text like real speech does.
+
+Configurable: latency distribution (log-normal), chunked streaming speed,
+429 throttling with Retry-After, and injected 5xx errors.
+
+    python -m providers.mock_tts serve --port 8765 --median 0.8 --rps 4 --error-rate 0.02
+    python -m providers.mock_tts bench --requests 200 --concurrency 8
+    (renders) tts: {provider: mock, voice: mock-mid}   # MOCK_TTS_URL or an in-process server
+"""
+
+import argparse
+import hashlib
+import http.client
+import io
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from providers.base_tts import BaseTTSProvider
+from providers.duration_model import fitted_duration
+
+SAMPLE_RATE = 22050
+
+MOCK_VOICES = [
+    {'id': 'mock-low', 'name': 'Mock Low', 'description': 'Low pitched test voice', 'f0': 105.0},
+    {'id': 'mock-mid', 'name': 'Mock Mid', 'description': 'Medium pitched test voice', 'f0': 150.0},
+    {'id': 'mock-high', 'name': 'Mock High', 'description': 'High pitched test voice', 'f0': 215.0},
+]
+
+
+# ---------- audio ----------
+
+def synthesize_speech(text: str, voice_id: str, words_per_second: float = 2.6,
+                      sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Deterministic speech-like int16 mono audio for text (same input = same samples)"""
+    seed = int.from_bytes(hashlib.sha256(f"{voice_id}|{text}".encode("utf-8")).digest()[:8], "little")
+    rng = np.random.default_rng(seed)
+    f0 = next((v['f0'] for v in MOCK_VOICES if v['id'] == voice_id), 150.0)
+    # Syllable length chosen so an average word (1.5 syllables) matches words_per_second
+    syllable_seconds = 0.85 / (words_per_second * 1.5)
+
+    pieces = [np.zeros(int(0.15 * sample_rate))]
+    for token in re.findall(r"[\w']+|[.,!?;:]", text):
+        if token in ",;:":
+            pieces.append(np.zeros(int(0.25 * sample_rate)))
+            continue
+        if token in ".!?":
+            pieces.append(np.zeros(int(0.45 * sample_rate)))
+            continue
+        syllables = max(1, len(re.findall(r"[aeiouy]+", token.lower())))
+        for _ in range(syllables):
+            n = int(syllable_seconds * rng.uniform(0.8, 1.2) * sample_rate)
+            t = np.arange(n) / sample_rate
+            pitch = f0 * rng.uniform(0.9, 1.15) * (1 + 0.03 * np.sin(2 * np.pi * 5 * t))
+            phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+            voiced = sum(np.sin(h * phase) / h for h in range(1, 6))
+            burst = np.zeros(n)
+            k = min(n, int(0.02 * sample_rate))
+            burst[:k] = rng.normal(0, 0.3, k)  # consonant-ish onset
+            envelope = np.sin(np.pi * np.linspace(0, 1, n)) ** 0.6
+            pieces.append((0.5 * voiced + burst) * envelope)
+        pieces.append(np.zeros(int(syllable_seconds * 0.3 * sample_rate)))
+    pieces.append(np.zeros(int(0.2 * sample_rate)))
+
+    audio = np.concatenate(pieces)
+    peak = float(np.max(np.abs(audio))) or 1.0
+    return (audio / peak * 0.6 * 32767).astype(np.int16)
+
+
+def to_wav_bytes(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+# ---------- server ----------
+
+class MockTTSConfig:
+    """Behaviour of the mock service; every random choice comes from `seed`"""
+
+    def __init__(self, median_latency: float = 0.6, latency_sigma: float = 0.5,
+                 stream_bytes_per_second: float = 400_000, chunk_size: int = 16384,
+                 rps_limit: Optional[float] = None, retry_after: float = 1.0,
+                 error_rate: float = 0.0, words_per_second: float = 2.6, seed: int = 1234):
+        self.median_latency = median_latency
+        self.latency_sigma = latency_sigma
+        self.stream_bytes_per_second = stream_bytes_per_second
+        self.chunk_size = chunk_size
+        self.rps_limit = rps_limit
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.words_per_second = words_per_second
+        self.seed = seed
+
+
+class MockTTSServer(ThreadingHTTPServer):
+    """
+    POST /v1/tts    {"text", "voice_id"} -> chunked audio/wav
+    GET  /v1/voices -> [{"id", "name", "description"}]
+    GET  /v1/stats  -> request / throttled / error counts
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), config: Optional[MockTTSConfig] = None):
+        super().__init__(address, _MockHandler)
+        self.config = config or MockTTSConfig()
+        self.rng = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.window = []  # request timestamps in the last second (for the rps limit)
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "bytes": 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockTTSServer":
+        threading.Thread(target=self.serve_forever, name="mock-tts", daemon=True).start()
+        return self
+
+    def admit(self):
+        """Decide the fate of one request: ('throttle'|'error'|'ok', latency seconds)"""
+        with self.lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            self.window = [t for t in self.window if now - t < 1.0]
+            if self.config.rps_limit is not None and len(self.window) >= self.config.rps_limit:
+                self.stats["throttled"] += 1
+                return "throttle", 0.0
+            self.window.append(now)
+            latency = self.rng.lognormvariate(math.log(max(1e-3, self.config.median_latency)),
+                                              self.config.latency_sigma)
+            if self.rng.random() < self.config.error_rate:
+                self.stats["errors"] += 1
+                return "error", latency / 2
+            return "ok", latency
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive + chunked transfer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status: int, data, headers: Optional[dict] = None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/v1/voices":
+            self._json(200, [{k: v[k] for k in ('id', 'name', 'description')} for v in MOCK_VOICES])
+        elif self.path == "/v1/stats":
+            with self.server.lock:
+                self._json(200, dict(self.server.stats))
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._json(400, {"error": "invalid JSON"})
+            return
+        if self.path != "/v1/tts" or not request.get("text"):
+            self._json(400, {"error": "POST /v1/tts needs text and voice_id"})
+            return
+
+        config = self.server.config
+        verdict, latency = self.server.admit()
+        if verdict == "throttle":
+            self._json(429, {"error": "rate limited"}, {"Retry-After": f"{config.retry_after:g}"})
+            return
+        time.sleep(latency)
+        if verdict == "error":
+            self._json(503, {"error": "injected failure"})
+            return
+
+        audio = to_wav_bytes(synthesize_speech(request["text"], request.get("voice_id", ""),
+                                               config.words_per_second))
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for start in range(0, len(audio), config.chunk_size):
+            chunk = audio[start:start + config.chunk_size]
+            self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+            if config.stream_bytes_per_second:
+                time.sleep(len(chunk) / config.stream_bytes_per_second)
+        self.wfile.write(b"0\r\n\r\n")
+        with self.server.lock:
+            self.server.stats["bytes"] += len(audio)
+
+
+# ---------- provider ----------
+
+class MockTTSError(Exception):
+    """HTTP error from the mock service (status_code/headers are what the transport retries on)"""
+
+    def __init__(self, status_code: int, headers: dict, message: str):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+        self.headers = headers
+
+
+_default_server = None
+_default_server_lock = threading.Lock()
+
+
+def default_server_url() -> str:
+    """MOCK_TTS_URL, or an in-process mock server started on first use"""
+    global _default_server
+    url = os.getenv("MOCK_TTS_URL")
+    if url:
+        return url
+    with _default_server_lock:
+        if _default_server is None:
+            _default_server = MockTTSServer().start()
+        return _default_server.url
+
+
+class MockTTS(BaseTTSProvider):
+    """BaseTTSProvider for the mock service (writes WAV audio)"""
+
+    def __init__(self, api_key: str = "mock", base_url: Optional[str] = None):
+        super().__init__(api_key)
+        self.provider_name = "Mock"
+        self.default_model = "mock-v1"
+        parsed = urlparse(base_url or default_server_url())
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self._local = threading.local()  # one keep-alive connection per thread
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        return conn
+
+    def _request(self, method: str, path: str, body: Optional[dict] = None) -> bytes:
+        conn = self._connection()
+        try:
+            payload = json.dumps(body).encode("utf-8") if body is not None else None
+            conn.request(method, path, body=payload, headers={"Content-Type": "application/json",
+                                                              "Authorization": f"Bearer {self.api_key}"})
+            response = conn.getresponse()
+            chunks = []
+            while True:
+                chunk = response.read(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise ConnectionError(f"mock TTS connection to {self.host}:{self.port} failed")
+        data = b"".join(chunks)
+        if response.status >= 400:
+            raise MockTTSError(response.status, dict(response.getheaders()), data.decode("utf-8", "replace"))
+        return data
+
+    def generate_audio(self, text: str, voice_id: str, output_path: str, **kwargs) -> str:
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        audio = self.transport.call(self._request, "POST", "/v1/tts",
+                                    {"text": text, "voice_id": voice_id,
+                                     "model": kwargs.get('model', self.default_model)})
+        with open(output_path, "wb") as f:
+            f.write(audio)
+        return output_path
+
+    def get_available_voices(self) -> List[Dict[str, str]]:
+        return json.loads(self.transport.call(self._request, "GET", "/v1/voices"))
+
+    def estimate_duration(self, text: str, voice_id: Optional[str] = None) -> float:
+        learned = fitted_duration(self, voice_id, text)
+        return learned if learned is not None else len(text.split()) / 2.6 + 0.5
+
+
+# ---------- command line ----------
+
+def _config_from_args(args) -> MockTTSConfig:
+    return MockTTSConfig(median_latency=args.median, latency_sigma=args.sigma,
+                         stream_bytes_per_second=args.stream_bps, rps_limit=args.rps,
+                         retry_after=args.retry_after, error_rate=args.error_rate, seed=args.seed)
+
+
+def bench(args):
+    """Fire N requests with C threads against a fresh server; prints one JSON summary"""
+    from concurrent.futures import ThreadPoolExecutor
+    import tempfile
+
+    from providers.transport import get_transport
+    from providers.tts_cache import TTSCache
+
+    server = MockTTSServer(config=_config_from_args(args)).start()
+    engine = MockTTS(base_url=server.url)
+    bucket = get_transport("Mock").bucket
+    bucket.rate = bucket.max_rate = args.client_rate
+    bucket.burst = bucket.tokens = max(1, args.concurrency)
+    texts = [f"Verse number {i % args.unique}: be strong and courageous, do not be afraid." for i in range(args.requests)]
+    workdir = tempfile.mkdtemp(prefix="mock-tts-bench-")
+    cache = TTSCache(os.path.join(workdir, "cache")) if args.cache else None
+    latencies, failures = [], 0
+
+    def one(i):
+        out = os.path.join(workdir, f"out_{i}.wav")
+        started = time.perf_counter()
+        if cache is not None:
+            cache.synthesize(engine, text=texts[i], voice_id="mock-mid", output_path=out)
+        else:
+            engine.generate_audio(text=texts[i], voice_id="mock-mid", output_path=out)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [pool.submit(one, i) for i in range(args.requests)]:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                failures += 1
+    wall = time.perf_counter() - started
+    latencies.sort()
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))], 3) if latencies else None
+
+    print(json.dumps({"requests": args.requests, "concurrency": args.concurrency, "failed": failures,
+                      "wall_seconds": round(wall, 2), "p50": pct(50), "p95": pct(95), "p99": pct(99),
+                      "client": get_transport("Mock").stats(), "server": server.stats}, indent=2))
+    server.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m providers.mock_tts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "bench"):
+        p = sub.add_parser(name)
+        p.add_argument("--median", type=float, default=0.6, help="Median time to first byte (s)")
+        p.add_argument("--sigma", type=float, default=0.5, help="Log-normal latency spread")
+        p.add_argument("--stream-bps", type=float, default=400_000, help="Streaming speed (bytes/s, 0 = instant)")
+        p.add_argument("--rps", type=float, default=None, help="Requests per second before 429s")
+        p.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with 429s (s)")
+        p.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 503")
+        p.add_argument("--seed", type=int, default=1234)
+    serve = sub.choices["serve"]
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    run = sub.choices["bench"]
+    run.add_argument("--requests", type=int, default=100)
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--unique", type=int, default=1000, help="Distinct texts (lower = more cache hits)")
+    run.add_argument("--cache", action="store_true", help="Go through the TTS cache")
+    run.add_argument("--client-rate", type=float, default=50.0,
+                     help="Starting rate of the client's adaptive limiter (req/s)")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        bench(args)
+        return
+    server = MockTTSServer((args.host, args.port), _config_from_args(args))
+    print(f"Mock TTS on {server.url} (set MOCK_TTS_URL={server.url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
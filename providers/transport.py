@@ -0,0 +1,243 @@
+"""
+Shared HTTP transport for TTS providers
+One per provider per process, shared by every engine instance:
+  - a pooled keep-alive httpx client handed to the vendor SDK
+  - retries with jittered exponential backoff for 429 / 5xx / network errors,
+    honoring Retry-After when the server sends it
+  - a token bucket that halves its rate on every 429 and creeps back up on
+    success (AIMD), so parallel workers settle just under the account limit
+  - counters for requests, retries and time spent throttled
+
+Rates can be tuned per provider with env vars, e.g.
+SHORTSMAKER_TTS_RATE_ELEVENLABS=2 (requests per second).
+"""
+
+import email.utils
+import inspect
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+try:
+    import httpx
+except ImportError:  # the vendor SDKs bring httpx; without it they use their own client
+    httpx = None
+
+from utils import metrics
+
+RETRY_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+DEFAULT_RATE = 5.0  # requests per second before any 429 was seen
+DEFAULT_BURST = 5
+
+tts_retries_total = metrics.REGISTRY.counter(
+    "shortsmaker_tts_retries_total", "TTS requests retried", ["provider", "reason"])
+tts_throttle_seconds_total = metrics.REGISTRY.counter(
+    "shortsmaker_tts_throttle_seconds_total", "Seconds TTS calls waited on the rate limiter or Retry-After", ["provider"])
+tts_rate_limit = metrics.REGISTRY.gauge(
+    "shortsmaker_tts_rate_limit", "Current adaptive TTS request rate (per second)", ["provider"])
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate adapts to 429s (multiplicative decrease, additive increase)"""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 min_rate: float = 0.2, max_rate: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """Take one token, sleeping if needed; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + 0.1)
+
+
+def _status_of(exc) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_after(exc) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), if any"""
+    headers = getattr(exc, "headers", None) or getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def _is_network_error(exc) -> bool:
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    # SDK wrappers (APIConnectionError, APITimeoutError, ...)
+    name = type(exc).__name__
+    return "Connection" in name or "Timeout" in name
+
+
+class TTSTransport:
+    """Retry / rate-limit wrapper plus pooled HTTP client for one provider"""
+
+    def __init__(self, provider: str, rate: Optional[float] = None, burst: int = DEFAULT_BURST,
+                 max_attempts: int = 5, backoff_base: float = 0.5, backoff_cap: float = 30.0,
+                 timeout: float = 120.0, max_connections: int = 16):
+        self.provider = provider
+        env_rate = os.getenv(f"SHORTSMAKER_TTS_RATE_{provider.upper()}")
+        self.bucket = TokenBucket(rate=float(env_rate or rate or DEFAULT_RATE), burst=burst)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client = None
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "succeeded": 0, "failed": 0, "retries": 0,
+                       "throttled": 0, "throttle_seconds": 0.0, "backoff_seconds": 0.0}
+
+    @property
+    def http_client(self):
+        """Pooled keep-alive client shared by every SDK client of this provider (None without httpx)"""
+        if httpx is None:
+            return None
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections,
+                                        keepalive_expiry=60),
+                )
+            return self._client
+
+    def sdk_kwargs(self, client_cls) -> dict:
+        """Constructor kwargs that make a vendor SDK client use our pooled connection and no own retries"""
+        try:
+            params = inspect.signature(client_cls.__init__).parameters
+        except (TypeError, ValueError):
+            return {}
+        kwargs = {}
+        client = self.http_client
+        if client is not None:
+            for name in ("httpx_client", "http_client"):
+                if name in params:
+                    kwargs[name] = client
+                    break
+        if "max_retries" in params:
+            kwargs["max_retries"] = 0  # retries happen in call(), with the shared limiter
+        return kwargs
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self._stats[key] += value
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """Run one API request (fn must do the whole request, including reading a streamed body)"""
+        attempt = 0
+        while True:
+            attempt += 1
+            waited = self.bucket.acquire()
+            self._count(requests=1, throttle_seconds=waited)
+            if waited:
+                tts_throttle_seconds_total.inc(waited, provider=self.provider)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                status = _status_of(e)
+                retryable = status in RETRY_STATUSES if status is not None else _is_network_error(e)
+                if not retryable or attempt >= self.max_attempts:
+                    self._count(failed=1)
+                    raise
+                delay = self.backoff(attempt)
+                reason = str(status) if status is not None else "network"
+                if status == 429:
+                    self.bucket.on_throttle()
+                    self._count(throttled=1)
+                retry_after = _retry_after(e)
+                if retry_after is not None:
+                    delay = max(delay, min(retry_after, 300.0))
+                self._count(retries=1, backoff_seconds=delay)
+                if status == 429:
+                    self._count(throttle_seconds=delay)
+                    tts_throttle_seconds_total.inc(delay, provider=self.provider)
+                tts_retries_total.inc(provider=self.provider, reason=reason)
+                tts_rate_limit.set(self.bucket.rate, provider=self.provider)
+                print(f"   ⏳ {self.provider} request failed ({reason}), retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            self.bucket.on_success()
+            self._count(succeeded=1)
+            tts_rate_limit.set(self.bucket.rate, provider=self.provider)
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["throttle_seconds"] = round(stats["throttle_seconds"], 2)
+        stats["backoff_seconds"] = round(stats["backoff_seconds"], 2)
+        stats["rate"] = round(self.bucket.rate, 2)
+        return stats
+
+
+_transports: Dict[str, TTSTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(provider: str) -> TTSTransport:
+    """The shared transport for a provider name (created on first use)"""
+    with _transports_lock:
+        if provider not in _transports:
+            _transports[provider] = TTSTransport(provider)
+        return _transports[provider]
+
+
+def all_stats() -> Dict[str, dict]:
+    with _transports_lock:
+        transports = dict(_transports)
+    return {name: t.stats() for name, t in transports.items()}
@@ -0,0 +1,165 @@
+"""
+TTS output cache
+Synthesized speech is stored once per (provider, voice, model, text), so
+re-rendering a verse, retrying a failed video or pressing "Test Voice" twice
+never pays for the same audio again.
+
+Every entry is the audio file plus a small JSON sidecar with what produced it
+(provider, voice, model, text, size, duration); that metadata is what the
+duration predictor (providers/duration_model.py) is trained on.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Iterator, Optional
+
+from utils import metrics
+from utils.audio_utils import get_audio_duration
+
+DEFAULT_CACHE_DIR = Path(".cache") / "tts"
+
+
+def _model_for(engine, kwargs: dict) -> str:
+    return str(kwargs.get('model') or getattr(engine, 'default_model', '') or '')
+
+
+class TTSCache:
+    """Content-addressed store of synthesized audio"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    @staticmethod
+    def key(provider: str, voice_id: str, model: str, text: str) -> str:
+        raw = json.dumps([provider, voice_id, model, text], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def path_for(self, key: str, ext: str = ".mp3") -> Path:
+        return self.cache_dir / key[:2] / f"{key}{ext}"
+
+    def lookup(self, provider: str, voice_id: str, model: str, text: str) -> Optional[Path]:
+        path = self.path_for(self.key(provider, voice_id, model, text))
+        hit = path.exists() and path.stat().st_size > 0
+        metrics.cache_lookup("tts", hit=hit)
+        return path if hit else None
+
+    def synthesize(self, engine, text: str, voice_id: str, output_path: str, **kwargs) -> str:
+        """
+        Same contract as engine.generate_audio, but served from the cache when
+        possible. Concurrent requests for the same audio share one API call.
+        """
+        provider = engine.get_provider_name()
+        model = _model_for(engine, kwargs)
+        key = self.key(provider, voice_id, model, text)
+        cached = self.path_for(key, Path(output_path).suffix or ".mp3")
+
+        while True:
+            with self._lock:
+                if cached.exists() and cached.stat().st_size > 0:
+                    hit = True
+                    break
+                pending = self._inflight.get(key)
+                if pending is None:
+                    pending = self._inflight[key] = threading.Event()
+                    hit = False
+                    break
+            pending.wait()
+
+        metrics.cache_lookup("tts", hit=hit)
+        source = cached
+        if not hit:
+            try:
+                source = self._generate(engine, text, voice_id, model, cached, kwargs)
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+                pending.set()
+        else:
+            print(f"   ♻️ Reusing cached {provider} audio")
+
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        if source != cached:
+            shutil.move(str(source), output_path)  # not cacheable (see _generate)
+        elif os.path.abspath(output_path) != os.path.abspath(cached):
+            shutil.copyfile(cached, output_path)
+        return output_path
+
+    def _generate(self, engine, text, voice_id, model, cached: Path, kwargs) -> Path:
+        """Synthesize into the cache; returns the cached path, or a temp file if it must not be cached"""
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_name(f"{cached.stem}.{uuid.uuid4().hex}{cached.suffix}")
+        try:
+            engine.generate_audio(text=text, voice_id=voice_id, output_path=str(tmp), **kwargs)
+            if not tmp.exists() or tmp.stat().st_size == 0:
+                raise RuntimeError(f"{engine.get_provider_name()} returned no audio")
+            served_by = getattr(engine, "served_by", None)
+            if callable(served_by) and served_by() not in (None, engine.get_provider_name()):
+                # A hedging wrapper answered with its failover voice: use it, don't cache it
+                keep, tmp = tmp, None
+                return keep
+            meta = {
+                "provider": engine.get_provider_name(), "voice_id": voice_id, "model": model,
+                "text": text, "bytes": tmp.stat().st_size, "duration": get_audio_duration(str(tmp)) or None,
+                "created_at": time.time(),
+            }
+            with open(cached.with_suffix(".json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(tmp, cached)
+            return cached
+        finally:
+            if tmp is not None and tmp.exists():
+                tmp.unlink()
+
+    def update_meta(self, audio_path, **fields):
+        """Add fields to a clip's sidecar (e.g. a duration measured after the fact)"""
+        meta_file = Path(audio_path).with_suffix(".json")
+        try:
+            with open(meta_file, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        meta.update(fields)
+        tmp = meta_file.with_name(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, meta_file)
+
+    def count(self) -> int:
+        """Number of cached clips (sidecars), without reading them"""
+        return sum(1 for _ in self.cache_dir.glob("*/*.json"))
+
+    def entries(self) -> Iterator[dict]:
+        """Metadata of every cached clip, with 'path' added"""
+        for meta_file in self.cache_dir.glob("*/*.json"):
+            try:
+                with open(meta_file, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            audio = next((p for p in meta_file.parent.glob(f"{meta_file.stem}.*") if p.suffix != ".json"), None)
+            if audio is not None:
+                meta["path"] = str(audio)
+                yield meta
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_default_tts_cache() -> TTSCache:
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = TTSCache()
+        return _default_cache
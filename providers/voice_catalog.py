@@ -0,0 +1,134 @@
+"""
+Voice catalog cache
+Voice lists change rarely but take seconds to fetch, so they are kept on
+disk with a TTL. Callers get the cached list instantly and can refresh it in
+the background; only a cold cache ever waits for the network.
+
+Providers answer a failed fetch with a few built-in voices marked
+'fallback': True. Those are never stored: refresh() raises VoiceListUnavailable
+so callers know the fetch failed, and the next call tries the network again.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_CATALOG_FILE = Path(".cache") / "voice_catalog.json"
+DEFAULT_TTL = 24 * 3600  # seconds
+
+
+class VoiceListUnavailable(Exception):
+    """The provider could not list its voices; fallback holds its built-in stand-ins"""
+
+    def __init__(self, provider: str, fallback: List[Dict[str, str]]):
+        super().__init__(f"Could not fetch the {provider} voice list (API key or network problem?)")
+        self.fallback = fallback
+
+
+class VoiceCatalog:
+    """{provider: voices} with a timestamp per provider, persisted as JSON"""
+
+    def __init__(self, catalog_file=DEFAULT_CATALOG_FILE, ttl: float = DEFAULT_TTL):
+        self.catalog_file = Path(catalog_file)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._refreshing: Dict[str, threading.Thread] = {}
+        self.entries: Dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.catalog_file, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def save(self):
+        self.catalog_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.catalog_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with self._lock:
+            data = json.dumps(self.entries, ensure_ascii=False, indent=1)
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.catalog_file)
+
+    def cached(self, provider: str) -> Optional[List[Dict[str, str]]]:
+        """Cached voices (even if stale), or None if never fetched"""
+        with self._lock:
+            entry = self.entries.get(provider)
+        return list(entry['voices']) if entry else None
+
+    def is_fresh(self, provider: str) -> bool:
+        with self._lock:
+            entry = self.entries.get(provider)
+        return bool(entry) and time.time() - entry['fetched_at'] < self.ttl
+
+    def refresh(self, provider: str, engine) -> List[Dict[str, str]]:
+        """Fetch from the provider now (blocking) and store the result; raises VoiceListUnavailable"""
+        voices = engine.get_available_voices()
+        if any(v.get('fallback') for v in voices):
+            raise VoiceListUnavailable(provider, voices)
+        if voices:
+            with self._lock:
+                self.entries[provider] = {"fetched_at": time.time(), "voices": voices}
+            self.save()
+        return voices
+
+    def get_voices(self, provider: str, engine) -> List[Dict[str, str]]:
+        """Cached list if fresh; stale lists are returned too, with a refresh started in the background"""
+        voices = self.cached(provider)
+        if voices is None:
+            try:
+                return self.refresh(provider, engine)
+            except VoiceListUnavailable as e:
+                return e.fallback  # usable for now, not cached
+        if not self.is_fresh(provider):
+            self.refresh_async(provider, engine)
+        return voices
+
+    def refresh_async(self, provider: str, engine,
+                      callback: Optional[Callable[[str, List[Dict[str, str]]], None]] = None) -> threading.Thread:
+        """Refresh on a daemon thread (one at a time per provider); callback(provider, voices) when done"""
+        with self._lock:
+            running = self._refreshing.get(provider)
+            if running is not None and running.is_alive() and callback is None:
+                return running
+
+            def _run():
+                try:
+                    voices = self.refresh(provider, engine)
+                except Exception as e:
+                    print(f"⚠️ Could not refresh {provider} voices: {e}")
+                    voices = self.cached(provider) or getattr(e, 'fallback', [])
+                if callback:
+                    callback(provider, voices)
+
+            thread = threading.Thread(target=_run, name=f"voices-{provider}", daemon=True)
+            self._refreshing[provider] = thread
+        thread.start()
+        return thread
+
+    def resolve_voice(self, provider: str, engine, voice: str) -> str:
+        """Accept a voice id or a voice name (case-insensitive); returns the id"""
+        voices = self.get_voices(provider, engine) or []
+        if any(v['id'] == voice for v in voices):
+            return voice
+        for v in voices:
+            if v['name'].lower() == str(voice).lower():
+                return v['id']
+        return voice
+
+
+_default_catalog = None
+_default_lock = threading.Lock()
+
+
+def get_default_catalog() -> VoiceCatalog:
+    global _default_catalog
+    with _default_lock:
+        if _default_catalog is None:
+            _default_catalog = VoiceCatalog()
+        return _default_catalog
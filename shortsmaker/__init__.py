@@ -0,0 +1,5 @@
+"""
+ShortsMaker headless tools (no GUI needed)
+
+    python -m shortsmaker render job.yaml [more_jobs.yaml ...]
+"""
@@ -0,0 +1,4 @@
+from shortsmaker.cli import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Command line entry point: python -m shortsmaker <command> ...
+
+Commands:
+    render JOB_FILE [JOB_FILE ...]   render jobs from YAML/JSON specs (see shortsmaker/jobs.py)
+    enqueue JOB_FILE [...]           plan jobs into the durable render queue
+    worker                           run a worker daemon that renders queued videos
+    status                           show queue / job progress
+    node --queue-dir DIR             render tasks from a shared (multi-node) queue folder
+    preprocess IN_DIR OUT_DIR        bake darken / crop / scale / fps into a clip library
+    catalog [--ref R] [--asset A]    look up finished videos; --csv writes a customer sheet
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+from shortsmaker.dirqueue import DEFAULT_LEASE_TTL
+from shortsmaker.jobs import JobSpecError, load_job_file, read_spec_file
+from shortsmaker.render_queue import DEFAULT_DB
+
+METRICS_HELP = "Serve Prometheus metrics at http://HOST:PORT/metrics (default host 127.0.0.1)"
+
+
+def cmd_render(args) -> int:
+    from shortsmaker.runner import BatchRunner, EventLog
+
+    jobs = []
+    file_workers = []
+    try:
+        for path in args.job_files:
+            file_jobs, workers = load_job_file(path)
+            jobs.extend(file_jobs)
+            if workers:
+                file_workers.append(int(workers))
+    except JobSpecError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    _start_metrics(args)
+    workers = args.workers or (max(file_workers) if file_workers else None) or min(4, os.cpu_count() or 2)
+
+    # JSON progress events own stdout; everything the render code prints goes to stderr
+    events = EventLog(sys.stdout)
+    with contextlib.redirect_stdout(sys.stderr):
+        runner = BatchRunner(workers=workers, events=events,
+                             keep_intermediates=True if args.keep_intermediates else None,
+                             group_by_clip=args.group_by_clip, group_memory_mb=args.group_memory)
+        if args.cluster:
+            from shortsmaker.cluster import ClusterCoordinator
+            coordinator = ClusterCoordinator(args.cluster, runner, local_workers=args.local_workers)
+            summary = coordinator.run(jobs)
+        else:
+            summary = runner.run(jobs)
+    return 0 if summary["failed"] == 0 else 1
+
+
+def _start_metrics(args):
+    if args.metrics:
+        from utils.metrics import start_http_server
+        with contextlib.redirect_stdout(sys.stderr):
+            start_http_server(args.metrics)
+
+
+def _load_jobs(job_files):
+    jobs = []
+    for path in job_files:
+        jobs.extend(load_job_file(path)[0])
+    return jobs
+
+
+def cmd_enqueue(args) -> int:
+    from shortsmaker.daemon import enqueue_jobs
+
+    try:
+        jobs = _load_jobs(args.job_files)
+    except JobSpecError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    with contextlib.redirect_stdout(sys.stderr):
+        job_ids = enqueue_jobs(jobs, db_path=args.db, priority=args.priority,
+                               max_attempts=args.max_attempts)
+    for job, job_id in zip(jobs, job_ids):
+        print(json.dumps({"event": "job_enqueued", "job": job_id, "customer": job.customer,
+                          "priority": args.priority}))
+    return 0
+
+
+def cmd_worker(args) -> int:
+    from shortsmaker.daemon import WorkerDaemon
+    from shortsmaker.runner import EventLog
+
+    _start_metrics(args)
+    events = EventLog(sys.stdout)
+    with contextlib.redirect_stdout(sys.stderr):
+        daemon = WorkerDaemon(db_path=args.db, concurrency=args.concurrency,
+                              poll_interval=args.poll, events=events,
+                              exit_when_idle=args.once,
+                              keep_intermediates=True if args.keep_intermediates else None)
+        daemon.install_signal_handlers()
+        daemon.run()
+    return 0
+
+
+def cmd_status(args) -> int:
+    from shortsmaker.render_queue import RenderQueue
+
+    queue = RenderQueue(args.db)
+    try:
+        print(json.dumps({"tasks": queue.counts(), "jobs": queue.jobs(args.limit)}, indent=2))
+    finally:
+        queue.close()
+    return 0
+
+
+def cmd_node(args) -> int:
+    from shortsmaker.cluster import ClusterNode, load_render_fn
+    from shortsmaker.runner import EventLog
+
+    _start_metrics(args)
+    events = EventLog(sys.stdout)
+    with contextlib.redirect_stdout(sys.stderr):
+        node = ClusterNode(args.queue_dir, concurrency=args.concurrency, poll_interval=args.poll,
+                           events=events, exit_when_idle=args.once, lease_ttl=args.lease_ttl,
+                           render_root=args.render_root, render_fn=load_render_fn(args.render),
+                           keep_intermediates=True if args.keep_intermediates else None,
+                           exit_after_claims=args.exit_after_claims)
+        node.run()
+    return 0
+
+
+def cmd_preprocess(args) -> int:
+    from utils.preprocess import preprocess_folder
+
+    try:
+        recipe = read_spec_file(args.recipe) if args.recipe else {}
+    except JobSpecError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    for key in ("darken", "crop", "scale", "fps"):
+        if getattr(args, key) is not None:
+            recipe[key] = getattr(args, key)
+    if args.strip_audio:
+        recipe["strip_audio"] = True
+
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            report = preprocess_folder(args.input_folder, args.output_folder, recipe,
+                                       workers=args.workers, force=args.force)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 2
+    print(json.dumps({"done": len(report["done"]), "skipped": len(report["skipped"]),
+                      "failed": report["failed"]}))
+    return 0 if not report["failed"] else 1
+
+
+def cmd_catalog(args) -> int:
+    from utils.output_catalog import CATALOG_NAME, OutputCatalog
+
+    db_path = os.path.join(args.output_folder, CATALOG_NAME)
+    if not os.path.exists(db_path):
+        print(f"❌ No catalog at {db_path}", file=sys.stderr)
+        return 2
+    catalog = OutputCatalog(db_path)
+    try:
+        filters = {"reference": args.ref, "asset": args.asset, "customer": args.customer, "run": args.run}
+        if args.csv:
+            rows = catalog.write_csv(args.csv, **filters)
+            print(json.dumps({"csv": args.csv, "videos": rows}))
+        else:
+            for row in catalog.find(**filters):
+                print(json.dumps(row, ensure_ascii=False))
+    finally:
+        catalog.close()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m shortsmaker",
+                                     description="ShortsMaker headless batch tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    render = sub.add_parser("render", help="Render videos from one or more job spec files")
+    render.add_argument("job_files", nargs="+", help="YAML or JSON job spec file(s)")
+    render.add_argument("--workers", type=int, default=None,
+                        help="Videos rendered in parallel across all jobs (default: spec or min(4, CPUs))")
+    render.add_argument("--keep-intermediates", action="store_true",
+                        help="Keep per-video scratch folders for debugging")
+    render.add_argument("--cluster", metavar="QUEUE_DIR", default=None,
+                        help="Shard videos over nodes sharing this folder (see 'node')")
+    render.add_argument("--local-workers", type=int, default=None,
+                        help="With --cluster: videos rendered on this machine (0 = coordinate only)")
+    render.add_argument("--group-by-clip", action="store_true",
+                        help="Render videos sharing a background clip with one ffmpeg (clip decoded once)")
+    render.add_argument("--group-memory", type=float, default=2048, metavar="MB",
+                        help="With --group-by-clip: memory budget per grouped ffmpeg (default 2048)")
+    render.add_argument("--metrics", metavar="[HOST:]PORT", default=None, help=METRICS_HELP)
+    render.set_defaults(func=cmd_render)
+
+    enqueue = sub.add_parser("enqueue", help="Add jobs to the durable render queue")
+    enqueue.add_argument("job_files", nargs="+", help="YAML or JSON job spec file(s)")
+    enqueue.add_argument("--db", default=DEFAULT_DB, help="Queue database file")
+    enqueue.add_argument("--priority", type=int, default=0, help="Higher runs first (default 0)")
+    enqueue.add_argument("--max-attempts", type=int, default=3, help="Tries per video before giving up")
+    enqueue.set_defaults(func=cmd_enqueue)
+
+    worker = sub.add_parser("worker", help="Run a worker daemon that renders queued videos")
+    worker.add_argument("--db", default=DEFAULT_DB, help="Queue database file")
+    worker.add_argument("--concurrency", type=int, default=1, help="Videos rendered at once by this daemon")
+    worker.add_argument("--poll", type=float, default=2.0, help="Seconds between polls when the queue is empty")
+    worker.add_argument("--once", action="store_true", help="Exit when the queue is drained")
+    worker.add_argument("--keep-intermediates", action="store_true",
+                        help="Keep per-video scratch folders for debugging")
+    worker.add_argument("--metrics", metavar="[HOST:]PORT", default=None, help=METRICS_HELP)
+    worker.set_defaults(func=cmd_worker)
+
+    status = sub.add_parser("status", help="Show render queue progress")
+    status.add_argument("--db", default=DEFAULT_DB, help="Queue database file")
+    status.add_argument("--limit", type=int, default=20, help="Number of recent jobs to list")
+    status.set_defaults(func=cmd_status)
+
+    node = sub.add_parser("node", help="Render tasks from a shared queue folder (multi-node)")
+    node.add_argument("--queue-dir", required=True, help="Shared queue folder (same share on every node)")
+    node.add_argument("--concurrency", type=int, default=1, help="Videos rendered at once on this node")
+    node.add_argument("--poll", type=float, default=2.0, help="Seconds between polls when nothing is pending")
+    node.add_argument("--once", action="store_true", help="Exit when no task is pending or leased")
+    node.add_argument("--lease-ttl", type=float, default=DEFAULT_LEASE_TTL,
+                      help="Seconds without heartbeat before another node takes a task over")
+    node.add_argument("--render-root", default=None, help="Local folder for renders before publishing")
+    node.add_argument("--keep-intermediates", action="store_true",
+                      help="Keep per-video scratch folders for debugging")
+    # Used by `python -m shortsmaker.cluster selftest`
+    node.add_argument("--render", default=None, help=argparse.SUPPRESS)
+    node.add_argument("--exit-after-claims", type=int, default=None, help=argparse.SUPPRESS)
+    node.add_argument("--metrics", metavar="[HOST:]PORT", default=None, help=METRICS_HELP)
+    node.set_defaults(func=cmd_node)
+
+    pre = sub.add_parser("preprocess", help="Bake a recipe (darken, crop, scale, fps) into a folder of clips")
+    pre.add_argument("input_folder", help="Folder with the original clips (searched recursively)")
+    pre.add_argument("output_folder", help="Where processed clips go (same relative paths)")
+    pre.add_argument("--recipe", default=None, help="YAML/JSON recipe file; the options below override it")
+    pre.add_argument("--darken", type=float, default=None, help="Brightness factor, e.g. 0.8")
+    pre.add_argument("--crop", default=None, help="Crop to an aspect ratio, e.g. 9:16")
+    pre.add_argument("--scale", default=None, help="Output size WxH (or W)")
+    pre.add_argument("--fps", type=float, default=None, help="Normalize the frame rate")
+    pre.add_argument("--strip-audio", action="store_true", help="Drop the clips' audio")
+    pre.add_argument("--workers", type=int, default=None, help="Clips processed at once (default min(4, CPUs))")
+    pre.add_argument("--force", action="store_true", help="Re-process clips the manifest says are current")
+    pre.set_defaults(func=cmd_preprocess)
+
+    catalog = sub.add_parser("catalog", help="Look up finished videos in an output folder's catalog")
+    catalog.add_argument("--output-folder", default="customers", help="Output folder holding catalog.sqlite")
+    catalog.add_argument("--ref", default=None, help="Only videos of this reference, e.g. 'Romans 8:28'")
+    catalog.add_argument("--asset", default=None, help="Only videos that used this clip/track/font (path or name)")
+    catalog.add_argument("--customer", default=None, help="Only this customer's videos")
+    catalog.add_argument("--run", default=None, help="Only videos from this run / queue job")
+    catalog.add_argument("--csv", default=None, metavar="FILE",
+                         help="Write File Name, Reference, Verse for the matches instead of printing JSON lines")
+    catalog.set_defaults(func=cmd_catalog)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sys.exit(args.func(args))
@@ -0,0 +1,177 @@
+"""
+Render worker daemon
+Long-running process that pulls single-video tasks from the render queue and
+renders them with ffmpeg.create_video. Start as many as the machine can take:
+
+    python -m shortsmaker worker --concurrency 2
+
+Stop with Ctrl+C / SIGTERM: running videos are finished, nothing new is claimed.
+"""
+
+import signal
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+import ffmpeg
+from utils import metrics
+
+from shortsmaker.jobs import JobSpec
+from shortsmaker.render_queue import DEFAULT_DB, HEARTBEAT_INTERVAL, RenderQueue, worker_id
+from shortsmaker.runner import BatchRunner, EventLog, write_job_sheet
+
+
+class WorkerDaemon:
+    """Pulls tasks from a RenderQueue with `concurrency` threads until stopped"""
+
+    def __init__(self, db_path=DEFAULT_DB, concurrency: int = 1, poll_interval: float = 2.0,
+                 events: Optional[EventLog] = None, exit_when_idle: bool = False,
+                 keep_intermediates: Optional[bool] = None):
+        self.db_path = db_path
+        self.concurrency = max(1, int(concurrency))
+        self.poll_interval = poll_interval
+        self.events = events or EventLog()
+        self.exit_when_idle = exit_when_idle
+        self.worker = worker_id()
+        self.stop_event = threading.Event()
+        # Reuse the batch runner's shared TTS clients and create_video argument mapping
+        self.runner = BatchRunner(workers=self.concurrency, events=self.events,
+                                  keep_intermediates=keep_intermediates)
+
+    def install_signal_handlers(self):
+        def _stop(signum, frame):
+            self.events.emit("worker_stopping", worker=self.worker, signal=signum)
+            self.stop_event.set()
+        signal.signal(signal.SIGINT, _stop)
+        if hasattr(signal, "SIGTERM"):
+            signal.signal(signal.SIGTERM, _stop)
+
+    def run(self):
+        queue = RenderQueue(self.db_path)
+        requeued, finished_jobs = queue.requeue_orphans()
+        self._finish_orphaned_jobs(queue, finished_jobs)
+        queue.close()
+        self.events.emit("worker_start", worker=self.worker, concurrency=self.concurrency,
+                         db=str(self.db_path), requeued=requeued)
+        metrics.workers_total.set(self.concurrency)
+        metrics.REGISTRY.on_collect(self._collect_queue_depth)
+
+        threads = [threading.Thread(target=self._loop, name=f"worker-{i}", daemon=True)
+                   for i in range(self.concurrency)]
+        for t in threads:
+            t.start()
+        queue = RenderQueue(self.db_path)
+        try:
+            next_heartbeat = 0.0
+            while any(t.is_alive() for t in threads):
+                if time.time() >= next_heartbeat:
+                    self._heartbeat(queue)
+                    next_heartbeat = time.time() + HEARTBEAT_INTERVAL
+                for t in threads:
+                    t.join(timeout=0.5)
+        finally:
+            queue.close()
+        self.events.emit("worker_stop", worker=self.worker)
+
+    def _heartbeat(self, queue: RenderQueue):
+        """Keep our running tasks leased and take back those of daemons that died (on any host)"""
+        try:
+            queue.heartbeat(self.worker)
+            requeued, finished_jobs = queue.requeue_orphans()
+        except Exception as e:
+            print(f"⚠️ Queue heartbeat failed: {e}", file=sys.stderr)
+            return
+        if requeued:
+            self.events.emit("orphans_requeued", worker=self.worker, requeued=requeued)
+        self._finish_orphaned_jobs(queue, finished_jobs)
+
+    def _finish_orphaned_jobs(self, queue: RenderQueue, job_ids):
+        """Jobs whose last open task was an orphan that ran out of attempts"""
+        for job_id in job_ids:
+            try:
+                job_row = queue.job(job_id)
+                self.finish_job(queue, job_row, JobSpec.from_dict(job_row['spec']))
+            except Exception as e:
+                print(f"⚠️ Could not finish job {job_id}: {e}", file=sys.stderr)
+
+    def _collect_queue_depth(self):
+        queue = RenderQueue(self.db_path)
+        try:
+            counts = queue.counts()
+        finally:
+            queue.close()
+        for state in ("queued", "running", "done", "failed"):
+            metrics.queue_depth.set(counts.get(state, 0), queue="render_queue", state=state)
+
+    def _loop(self):
+        queue = RenderQueue(self.db_path)  # SQLite connections are per thread
+        try:
+            while not self.stop_event.is_set():
+                task = queue.claim(self.worker)
+                if task is None:
+                    counts = queue.counts()
+                    if self.exit_when_idle and not counts.get('queued') and not counts.get('running'):
+                        return
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                self.process(queue, task)
+        finally:
+            queue.close()
+
+    def process(self, queue: RenderQueue, task: dict):
+        job_row = task['job']
+        job = JobSpec.from_dict(job_row['spec'])
+        payload = task['payload']
+        output_path = job_row['output_path']
+        self.events.emit("video_start", worker=self.worker, job=job_row['id'], customer=job.customer,
+                         index=payload['video_index'], attempt=task['attempts'])
+        started = time.time()
+        try:
+            ffmpeg.create_dirs(job.output_folder, job.customer, job.posts)
+            with metrics.busy_worker():
+                info = ffmpeg.create_video(**self.runner.video_kwargs(job, payload, output_path))
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            metrics.videos_total.inc(status="failed")
+            finished_job = queue.fail(task['id'], str(e), self.worker)
+            self.events.emit("video_failed", worker=self.worker, job=job_row['id'], customer=job.customer,
+                             index=payload['video_index'], attempt=task['attempts'], error=str(e))
+        else:
+            finished_job = queue.complete(task['id'], self.worker)
+            metrics.videos_total.inc(status="done")
+            seconds = round(time.time() - started, 2)
+            self.runner.record_video(job, payload, output_path, info=info, seconds=seconds,
+                                     run=f"queue-{job_row['id']}")
+            self.events.emit("video_done", worker=self.worker, job=job_row['id'], customer=job.customer,
+                             index=payload['video_index'], file=payload['file_name'].strip("/"),
+                             seconds=seconds)
+
+        if finished_job is not None:
+            self.finish_job(queue, job_row, job)
+
+    def finish_job(self, queue: RenderQueue, job_row: dict, job: JobSpec):
+        """Last task of a job finished (on this worker): write the customer CSV"""
+        tasks = queue.job_tasks(job_row['id'])
+        done = [t['payload'] for t in tasks if t['status'] == 'done']
+        write_job_sheet(job.customer, job_row['output_path'], done)
+        self.events.emit("job_done", worker=self.worker, job=job_row['id'], customer=job.customer,
+                         completed=len(done), failed=len(tasks) - len(done))
+
+
+def enqueue_jobs(jobs, db_path=DEFAULT_DB, priority: int = 0, max_attempts: int = 3,
+                 runner: Optional[BatchRunner] = None) -> list:
+    """Plan each JobSpec into video tasks and add them to the queue; returns job ids"""
+    runner = runner or BatchRunner(workers=1)
+    queue = RenderQueue(db_path)
+    job_ids = []
+    try:
+        for job in jobs:
+            tasks = runner.plan_job(job)
+            output_path = f"{job.output_folder}/{job.customer}"
+            job_ids.append(queue.enqueue_job(job.customer, job.to_dict(), output_path, tasks,
+                                             priority=priority, max_attempts=max_attempts))
+    finally:
+        queue.close()
+    return job_ids
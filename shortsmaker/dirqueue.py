@@ -0,0 +1,317 @@
+"""
+Shared-directory task queue (for rendering on several machines)
+Needs nothing but a folder that every node can see (SMB/NFS share, synced disk...).
+All coordination is done with atomic renames, which work on network shares
+where SQLite locking does not.
+
+Layout under the queue root:
+    pending/<task>.json     waiting to be claimed
+    leased/<task>.json      claimed by a node (moved here by an atomic rename)
+    leases/<task>.json      {node, expires} — renewed by the node's heartbeat
+    done/<task>.json        result record written by the node that rendered it
+    failed/<task>.json      gave up after max_attempts
+    staging/<task>/...      files produced by the task, picked up by the coordinator
+    nodes/<node>.json       node heartbeat (for status / debugging)
+    tmp/                    temp files, and tasks a node is publishing or requeueing
+
+A lease that is not renewed in time (node died, lost network...) is reclaimed
+by whichever node notices first: the task goes back to pending/ and another
+node steals it. A node that comes back late finds its lease gone and drops
+its result, so every task is delivered once.
+"""
+
+import json
+import os
+import shutil
+import socket
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_LEASE_TTL = 120.0  # seconds without heartbeat before a task is reclaimed
+
+# Suffixes of task files a node has taken out of leased/ to publish or requeue
+OWNED_COMPLETE = "complete"
+OWNED_REQUEUE = "requeue"
+
+_DIRS = ("pending", "leased", "leases", "done", "failed", "staging", "nodes", "tmp")
+
+
+def node_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _write_json(path: Path, data: dict, tmp_dir: Path):
+    """Write JSON atomically: temp file in the same share, then rename over the target"""
+    tmp = tmp_dir / f"{path.name}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class DirectoryQueue:
+    """Task queue living in a shared folder; safe for many nodes and threads"""
+
+    def __init__(self, root, lease_ttl: float = DEFAULT_LEASE_TTL):
+        self.root = Path(root)
+        self.lease_ttl = lease_ttl
+        for name in _DIRS:
+            (self.root / name).mkdir(parents=True, exist_ok=True)
+
+    def _dir(self, name: str) -> Path:
+        return self.root / name
+
+    # ---------- coordinator side ----------
+
+    def submit(self, tasks: List[dict]):
+        """Add tasks (each needs a unique 'id'); sorted names = claim order"""
+        for task in tasks:
+            task.setdefault("attempts", 0)
+            task.setdefault("max_attempts", 3)
+            _write_json(self._dir("pending") / f"{task['id']}.json", task, self._dir("tmp"))
+
+    def results(self, task_ids) -> Dict[str, dict]:
+        """{task id: result} for tasks that are finished (done or failed)"""
+        found = {}
+        for task_id in task_ids:
+            for state in ("done", "failed"):
+                result = _read_json(self._dir(state) / f"{task_id}.json")
+                if result is not None:
+                    found[task_id] = result
+                    break
+        return found
+
+    def staging_dir(self, task_id: str) -> Path:
+        return self._dir("staging") / task_id
+
+    def state(self, task_id: str) -> Optional[str]:
+        """Where the task is right now ("publishing" = a node took it out of leased/), or None if lost"""
+        for state in ("pending", "leased", "done", "failed"):
+            if (self._dir(state) / f"{task_id}.json").exists():
+                return state
+        for kind in (OWNED_COMPLETE, OWNED_REQUEUE):
+            if any(self._dir("tmp").glob(f"{task_id}.*.{kind}")):
+                return "publishing"
+        return None
+
+    def withdraw(self, task_id: str):
+        """Coordinator gave up on the task: take it out of the queue (a node still rendering it loses its lease)"""
+        for state in ("pending", "leased", "leases"):
+            try:
+                os.remove(self._dir(state) / f"{task_id}.json")
+            except FileNotFoundError:
+                pass
+
+    def counts(self) -> Dict[str, int]:
+        return {name: len(list(self._dir(name).glob("*.json")))
+                for name in ("pending", "leased", "done", "failed")}
+
+    # ---------- node side ----------
+
+    def claim(self, node: str) -> Optional[dict]:
+        """Take the next pending task, or None. The rename makes the claim exclusive."""
+        for path in sorted(self._dir("pending").glob("*.json")):
+            target = self._dir("leased") / path.name
+            try:
+                os.rename(path, target)
+            except (FileNotFoundError, PermissionError, OSError):
+                continue  # somebody else was faster
+            os.utime(target)  # the lease clock starts now, even before leases/ is written
+            task = _read_json(target)
+            if task is None:
+                continue
+            self._write_lease(task["id"], node)
+            return task
+        return None
+
+    def _write_lease(self, task_id: str, node: str):
+        _write_json(self._dir("leases") / f"{task_id}.json",
+                    {"node": node, "expires": time.time() + self.lease_ttl}, self._dir("tmp"))
+
+    def holds_lease(self, task_id: str, node: str) -> bool:
+        lease = _read_json(self._dir("leases") / f"{task_id}.json")
+        return (lease is not None and lease.get("node") == node
+                and (self._dir("leased") / f"{task_id}.json").exists())
+
+    def heartbeat(self, task_ids, node: str, running: int = 0):
+        """Renew leases for the tasks this node is working on"""
+        for task_id in task_ids:
+            if self.holds_lease(task_id, node):
+                self._write_lease(task_id, node)
+        _write_json(self._dir("nodes") / f"{node}.json",
+                    {"node": node, "host": socket.gethostname(), "pid": os.getpid(),
+                     "last_seen": time.time(), "running": running}, self._dir("tmp"))
+
+    def complete(self, task: dict, node: str, files: List[dict], result: dict) -> bool:
+        """
+        Publish produced files to staging/ and record the result.
+        Returns False (and publishes nothing) if the lease was lost meanwhile.
+        """
+        task_id = task["id"]
+        if not self.holds_lease(task_id, node):
+            return False
+
+        # Copy first (slow, may be a network share), while nothing is published yet
+        tmp_staging = self._dir("tmp") / f"{task_id}.{uuid.uuid4().hex}"
+        tmp_staging.mkdir(parents=True)
+        published = []
+        for f in files:
+            rel = Path(f["relpath"])
+            (tmp_staging / rel).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(f["path"], tmp_staging / rel)
+            published.append(rel.as_posix())
+
+        owned = self._take_ownership(task_id, node)
+        if owned is None:
+            shutil.rmtree(tmp_staging, ignore_errors=True)
+            return False
+        staging = self.staging_dir(task_id)
+        shutil.rmtree(staging, ignore_errors=True)
+        os.replace(tmp_staging, staging)
+
+        record = {**result, "id": task_id, "node": node, "files": published,
+                  "finished_at": time.time(), "task": task}
+        _write_json(self._dir("done") / f"{task_id}.json", record, self._dir("tmp"))
+        for path in (owned, self._dir("leases") / f"{task_id}.json"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # owned: we were slower than lease_ttl and _recover() cleaned up
+        return True
+
+    def _own(self, task_id: str, kind: str) -> Optional[Path]:
+        """
+        Rename leased/<task> to tmp/<task>.<time>.<uuid>.<kind> (atomic, only
+        one caller wins). The time in the name lets reclaim_expired() put the
+        task back if the owner dies before it has written the outcome.
+        """
+        owned = self._dir("tmp") / f"{task_id}.{int(time.time())}.{uuid.uuid4().hex}.{kind}"
+        try:
+            os.rename(self._dir("leased") / f"{task_id}.json", owned)
+        except (FileNotFoundError, PermissionError, OSError):
+            return None
+        return owned
+
+    def _take_ownership(self, task_id: str, node: str) -> Optional[Path]:
+        """
+        Move leased/<task> out of the way so nobody can reclaim it while we
+        publish. Returns the moved file, or None if the task is no longer ours
+        (lease expired, maybe re-claimed by another node).
+        """
+        owned = self._own(task_id, OWNED_COMPLETE)
+        if owned is None:
+            return None
+        lease = _read_json(self._dir("leases") / f"{task_id}.json")
+        if lease is None or lease.get("node") != node:
+            # We grabbed the claim of the node that re-took the task: give it back
+            os.rename(owned, self._dir("leased") / f"{task_id}.json")
+            return None
+        return owned
+
+    def fail(self, task: dict, node: str, error: str):
+        """Give the task back for another try, or mark it failed after max_attempts"""
+        task_id = task["id"]
+        if not self.holds_lease(task_id, node):
+            return
+        self._requeue(task_id, error)
+
+    def _requeue(self, task_id: str, error: Optional[str]) -> bool:
+        """Move a leased task back to pending (or to failed). Only one caller can win the rename."""
+        owned = self._own(task_id, OWNED_REQUEUE)
+        if owned is None:
+            return False
+        self._return(owned, task_id, error)
+        return True
+
+    def _return(self, owned: Path, task_id: str, error: Optional[str]):
+        """Count a failed attempt for an owned task file; back to pending, or to failed after max_attempts"""
+        try:
+            os.remove(self._dir("leases") / f"{task_id}.json")
+        except FileNotFoundError:
+            pass
+
+        task = _read_json(owned) or {"id": task_id}
+        task["attempts"] = task.get("attempts", 0) + 1
+        task["last_error"] = error
+        if task["attempts"] >= task.get("max_attempts", 3):
+            _write_json(self._dir("failed") / f"{task_id}.json",
+                        {"id": task_id, "error": error, "task": task, "finished_at": time.time()},
+                        self._dir("tmp"))
+            os.remove(owned)
+        else:
+            _write_json(owned, task, self._dir("tmp"))
+            os.replace(owned, self._dir("pending") / f"{task_id}.json")
+
+    def reclaim_expired(self) -> List[str]:
+        """Return tasks whose lease ran out to the pending pool (work stealing)"""
+        now = time.time()
+        reclaimed = []
+        for leased in self._dir("leased").glob("*.json"):
+            task_id = leased.stem
+            lease = _read_json(self._dir("leases") / leased.name)
+            if lease is not None:
+                expires = lease.get("expires", 0)
+            else:
+                try:
+                    expires = leased.stat().st_mtime + self.lease_ttl
+                except FileNotFoundError:
+                    continue
+            if expires < now and self._requeue(task_id, f"lease expired (node {lease and lease.get('node')})"):
+                reclaimed.append(task_id)
+        return reclaimed + self._recover_owned(now)
+
+    def _recover_owned(self, now: float) -> List[str]:
+        """
+        Tasks stuck in tmp/ because their owner died between taking them out
+        of leased/ and writing done/, failed/ or pending/. Publishing takes
+        seconds, so anything older than lease_ttl is abandoned.
+        """
+        recovered = []
+        for path in self._dir("tmp").glob(f"*.{OWNED_COMPLETE}"):
+            recovered += self._recover(path, now)
+        for path in self._dir("tmp").glob(f"*.{OWNED_REQUEUE}"):
+            recovered += self._recover(path, now)
+        return recovered
+
+    def _recover(self, path: Path, now: float) -> List[str]:
+        try:
+            task_id, taken_at, _, kind = path.name.rsplit(".", 3)
+            taken_at = float(taken_at)
+        except ValueError:
+            return []
+        if taken_at + self.lease_ttl >= now:
+            return []
+        # Rename to a fresh name first, so only one node recovers it
+        owned = self._dir("tmp") / f"{task_id}.{int(now)}.{uuid.uuid4().hex}.{kind}"
+        try:
+            os.rename(path, owned)
+        except (FileNotFoundError, PermissionError, OSError):
+            return []
+        if any((self._dir(state) / f"{task_id}.json").exists() for state in ("done", "failed")):
+            # The outcome was written, only the cleanup is missing
+            os.remove(owned)
+            try:
+                os.remove(self._dir("leases") / f"{task_id}.json")
+            except FileNotFoundError:
+                pass
+            return []
+        self._return(owned, task_id, "node died while publishing its result")
+        return [task_id]
+
+    def clear_task(self, task_id: str):
+        """Coordinator cleanup once a finished task has been assembled"""
+        for state in ("done", "failed"):
+            try:
+                os.remove(self._dir(state) / f"{task_id}.json")
+            except FileNotFoundError:
+                pass
+        shutil.rmtree(self.staging_dir(task_id), ignore_errors=True)
@@ -0,0 +1,169 @@
+"""
+Job specs for the headless batch runner
+A job spec file (YAML or JSON) describes one or more render jobs:
+
+    workers: 4                  # shared worker pool size (optional)
+    defaults:                   # applied to every job (optional)
+      encoder_profile: default
+    jobs:
+      - customer: soulanchor
+        pack: bible/love
+        count: 10
+        tts:
+          provider: elevenlabs
+          voice: EXAVITQu4vr4xnSDxMaL
+          hedge:                # optional, see providers/hedged_tts.py
+            percentile: 95      # re-request when slower than the recent p95
+            max_rate: 0.1       # hedge at most 10% of requests
+            failover: cartesia  # hedge to this provider for mapped voices
+            voices: {EXAVITQu4vr4xnSDxMaL: a0e99841-438c-4a64-b679-ae501e7d6091}
+        encoder_profile: draft
+        deliveries: [shorts, tiktok, reels]   # extra per-platform variants (ffmpeg.DELIVERY_PROFILES)
+        clip_filters: {darken: 0.8, crop: "9:16", scale: 1080x1920}   # over the pack's (utils/clip_filters.py)
+        workers: 2              # max videos of THIS job rendered at once
+        seed: 42
+
+A file may also contain a single job mapping (no "jobs" list).
+"""
+
+import json
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import yaml
+except ImportError:  # JSON job files still work without PyYAML
+    yaml = None
+
+
+class JobSpecError(Exception):
+    """Raised when a job spec file is missing required fields or can't be parsed"""
+
+
+class JobSpec:
+    """One render job: N videos for one customer from one content pack"""
+
+    def __init__(self, customer: str, pack: str, count: int = 1,
+                 tts_provider: Optional[str] = None, tts_voice: Optional[str] = None,
+                 tts_hedge: Optional[dict] = None,
+                 encoder_profile: str = "default", deliveries: Optional[List[str]] = None,
+                 clip_filters: Optional[dict] = None, workers: Optional[int] = None,
+                 seed: Optional[int] = None, logo="sources/logo.png", posts: bool = False,
+                 randomize: bool = True, output_folder: str = "customers",
+                 fonts_dir: str = "sources/fonts",
+                 text_source_font: str = "sources/MouldyCheeseRegular-WyMWG.ttf"):
+        self.customer = customer
+        self.pack = pack
+        self.count = count
+        self.tts_provider = tts_provider
+        self.tts_voice = tts_voice
+        self.tts_hedge = tts_hedge
+        self.encoder_profile = encoder_profile
+        self.deliveries = list(deliveries or [])
+        self.clip_filters = dict(clip_filters or {})
+        self.workers = workers
+        self.seed = seed
+        self.logo = logo
+        self.posts = posts
+        self.randomize = randomize
+        self.output_folder = output_folder
+        self.fonts_dir = fonts_dir
+        self.text_source_font = text_source_font
+
+    @property
+    def use_tts(self) -> bool:
+        return bool(self.tts_provider and self.tts_voice)
+
+    @property
+    def use_logo(self) -> bool:
+        return bool(self.logo)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "JobSpec":
+        missing = [k for k in ("customer", "pack") if not data.get(k)]
+        if missing:
+            raise JobSpecError(f"Job is missing required field(s): {', '.join(missing)}")
+
+        tts = data.get("tts") or {}
+        if isinstance(tts, str):  # "tts: elevenlabs:VOICE_ID" shorthand
+            provider, _, voice = tts.partition(":")
+            tts = {"provider": provider, "voice": voice}
+
+        known = ("count", "encoder_profile", "deliveries", "clip_filters", "workers", "seed", "logo", "posts",
+                 "randomize", "output_folder", "fonts_dir", "text_source_font")
+        kwargs = {k: data[k] for k in known if k in data}
+        if "profile" in data and "encoder_profile" not in data:
+            kwargs["encoder_profile"] = data["profile"]
+
+        if isinstance(kwargs.get("deliveries"), str):
+            kwargs["deliveries"] = [name.strip() for name in kwargs["deliveries"].split(",") if name.strip()]
+
+        from ffmpeg import DELIVERY_PROFILES, ENCODER_PROFILES  # heavy module, only needed here
+        encoder_profile = kwargs.get("encoder_profile", "default")
+        if encoder_profile not in ENCODER_PROFILES:
+            raise JobSpecError(f"Unknown encoder_profile '{encoder_profile}' (known: {', '.join(ENCODER_PROFILES)})")
+        unknown = [name for name in kwargs.get("deliveries") or [] if name not in DELIVERY_PROFILES]
+        if unknown:
+            raise JobSpecError(f"Unknown deliveries: {', '.join(unknown)} (known: {', '.join(DELIVERY_PROFILES)})")
+
+        if not isinstance(kwargs.get("clip_filters") or {}, dict):
+            raise JobSpecError("clip_filters must be a mapping (darken, crop, scale)")
+
+        hedge = tts.get("hedge")
+        if hedge is not None and not isinstance(hedge, dict):
+            raise JobSpecError("tts.hedge must be a mapping (percentile, max_rate, failover, voices)")
+
+        return cls(customer=str(data["customer"]), pack=str(data["pack"]),
+                   tts_provider=tts.get("provider"), tts_voice=tts.get("voice"),
+                   tts_hedge=hedge, **kwargs)
+
+    def to_dict(self) -> dict:
+        data = dict(self.__dict__)
+        data["tts"] = {"provider": data.pop("tts_provider"), "voice": data.pop("tts_voice")}
+        hedge = data.pop("tts_hedge")
+        if hedge:
+            data["tts"]["hedge"] = hedge
+        return data
+
+    def __repr__(self):
+        return f"JobSpec(customer={self.customer!r}, pack={self.pack!r}, count={self.count})"
+
+
+def read_spec_file(path) -> dict:
+    """Parse a YAML/JSON spec file into a dict"""
+    path = Path(path)
+    if not path.exists():
+        raise JobSpecError(f"Job spec not found: {path}")
+    text = path.read_text(encoding="utf-8")
+    try:
+        if path.suffix.lower() == ".json":
+            data = json.loads(text)
+        elif yaml is not None:
+            data = yaml.safe_load(text)
+        else:
+            data = json.loads(text)
+    except Exception as e:
+        raise JobSpecError(f"Could not parse {path}: {e}")
+    if not isinstance(data, dict):
+        raise JobSpecError(f"{path} must contain a mapping at the top level")
+    return data
+
+
+def load_job_file(path) -> Tuple[List[JobSpec], Optional[int]]:
+    """
+    Load all jobs from one spec file.
+
+    Returns:
+        (jobs, workers) — workers is the file's shared pool size or None
+    """
+    data = read_spec_file(path)
+    defaults = data.get("defaults") or {}
+    raw_jobs = data.get("jobs")
+    if raw_jobs is None:
+        raw_jobs = [data]
+    if not isinstance(raw_jobs, list) or not raw_jobs:
+        raise JobSpecError(f"{path}: 'jobs' must be a non-empty list")
+
+    jobs = [JobSpec.from_dict({**defaults, **job}) for job in raw_jobs]
+    workers = data.get("workers") if "jobs" in data else None
+    return jobs, workers
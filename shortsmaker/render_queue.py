@@ -0,0 +1,297 @@
+"""
+Durable render queue (SQLite)
+Jobs are split into video-level tasks when they are enqueued, so any worker
+can pick up any single video. Several worker daemons (threads or processes)
+can share one database file: every claim happens inside a write transaction.
+
+Scheduling order for the next task:
+  1. highest task priority first
+  2. then the customer that was served least recently (fairness — a 500-video
+     order doesn't block a 3-video order behind it)
+  3. then oldest task first
+Failed tasks are retried with a growing delay until max_attempts is reached.
+
+Running tasks hold a lease: the daemon renews claimed_at (heartbeat) while it
+works on them, and tasks whose lease ran out (daemon crashed, host died) are
+put back in the queue by any other daemon.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+DEFAULT_DB = "render_queue.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer    TEXT NOT NULL,
+    spec        TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    priority    INTEGER NOT NULL DEFAULT 0,
+    status      TEXT NOT NULL DEFAULT 'queued',
+    created_at  REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id       INTEGER NOT NULL REFERENCES jobs(id),
+    video_index  INTEGER NOT NULL,
+    payload      TEXT NOT NULL,
+    priority     INTEGER NOT NULL DEFAULT 0,
+    status       TEXT NOT NULL DEFAULT 'queued',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    not_before   REAL NOT NULL DEFAULT 0,
+    worker       TEXT,
+    claimed_at   REAL,
+    finished_at  REAL,
+    error        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, priority, not_before);
+CREATE INDEX IF NOT EXISTS idx_tasks_job ON tasks(job_id, status);
+CREATE TABLE IF NOT EXISTS customers (
+    customer    TEXT PRIMARY KEY,
+    last_served REAL NOT NULL DEFAULT 0
+);
+"""
+
+# Seconds to wait before retry n (1st retry, 2nd retry, ...)
+RETRY_DELAYS = [10, 60, 300]
+
+HEARTBEAT_INTERVAL = 30   # seconds between lease renewals of a daemon's running tasks
+LEASE_SECONDS = 300       # a running task without a heartbeat for this long is orphaned
+
+
+def worker_id() -> str:
+    """host:pid — identifies a daemon process in the queue"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class RenderQueue:
+    """Thin wrapper around the SQLite queue file (one connection per instance/thread)"""
+
+    def __init__(self, db_path=DEFAULT_DB):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _write(self):
+        """BEGIN IMMEDIATE: take the write lock up front so claims never race"""
+        return _Transaction(self.conn)
+
+    # ---------- producers ----------
+
+    def enqueue_job(self, customer: str, spec: dict, output_path: str, tasks: List[dict],
+                    priority: int = 0, max_attempts: int = 3) -> int:
+        """Add a job and one task per planned video; returns the job id"""
+        now = time.time()
+        with self._write():
+            cur = self.conn.execute(
+                "INSERT INTO jobs (customer, spec, output_path, priority, created_at) VALUES (?, ?, ?, ?, ?)",
+                (customer, json.dumps(spec), output_path, priority, now))
+            job_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT INTO tasks (job_id, video_index, payload, priority, max_attempts) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, t['video_index'], json.dumps(t), priority, max_attempts) for t in tasks])
+            self.conn.execute("INSERT OR IGNORE INTO customers (customer) VALUES (?)", (customer,))
+        return job_id
+
+    # ---------- consumers ----------
+
+    def claim(self, worker: Optional[str] = None) -> Optional[dict]:
+        """
+        Atomically take the next runnable task (or None if nothing is ready).
+        Returned dict has the task row plus 'job' (the job row) and decoded 'payload'.
+        """
+        worker = worker or worker_id()
+        now = time.time()
+        with self._write():
+            row = self.conn.execute(
+                """
+                SELECT t.*, j.customer FROM tasks t
+                JOIN jobs j ON j.id = t.job_id
+                LEFT JOIN customers c ON c.customer = j.customer
+                WHERE t.status = 'queued' AND t.not_before <= ?
+                ORDER BY t.priority DESC, COALESCE(c.last_served, 0) ASC, t.id ASC
+                LIMIT 1
+                """, (now,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE tasks SET status='running', worker=?, claimed_at=?, attempts=attempts+1 WHERE id=?",
+                (worker, now, row['id']))
+            self.conn.execute("UPDATE customers SET last_served=? WHERE customer=?", (now, row['customer']))
+            self.conn.execute("UPDATE jobs SET status='running' WHERE id=? AND status='queued'", (row['job_id'],))
+            job = self.conn.execute("SELECT * FROM jobs WHERE id=?", (row['job_id'],)).fetchone()
+
+        task = dict(row)
+        task['attempts'] += 1
+        task['payload'] = json.loads(task['payload'])
+        task['job'] = dict(job)
+        task['job']['spec'] = json.loads(job['spec'])
+        return task
+
+    def complete(self, task_id: int, worker: Optional[str] = None) -> Optional[int]:
+        """
+        Mark a task done. Returns the job id if that was the job's last open task.
+        Does nothing if the worker no longer holds the task (it was requeued as an orphan).
+        """
+        worker = worker or worker_id()
+        with self._write():
+            cur = self.conn.execute(
+                "UPDATE tasks SET status='done', finished_at=?, error=NULL "
+                "WHERE id=? AND status='running' AND worker=?", (time.time(), task_id, worker))
+            if cur.rowcount == 0:
+                return None
+            return self._close_job_if_finished(task_id)
+
+    def fail(self, task_id: int, error: str, worker: Optional[str] = None) -> Optional[int]:
+        """
+        Record a failure: re-queue with a delay while attempts remain, otherwise
+        mark it failed. Returns the job id if the job is now finished.
+        Does nothing if the worker no longer holds the task.
+        """
+        worker = worker or worker_id()
+        now = time.time()
+        with self._write():
+            row = self.conn.execute(
+                "SELECT attempts, max_attempts FROM tasks WHERE id=? AND status='running' AND worker=?",
+                (task_id, worker)).fetchone()
+            if row is None:
+                return None
+            if row['attempts'] < row['max_attempts']:
+                delay = RETRY_DELAYS[min(row['attempts'] - 1, len(RETRY_DELAYS) - 1)]
+                self.conn.execute(
+                    "UPDATE tasks SET status='queued', worker=NULL, not_before=?, error=? WHERE id=?",
+                    (now + delay, error, task_id))
+                return None
+            self.conn.execute(
+                "UPDATE tasks SET status='failed', finished_at=?, error=? WHERE id=?", (now, error, task_id))
+            return self._close_job_if_finished(task_id)
+
+    def _close_job_if_finished(self, task_id: int) -> Optional[int]:
+        job_id = self.conn.execute("SELECT job_id FROM tasks WHERE id=?", (task_id,)).fetchone()['job_id']
+        open_tasks = self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE job_id=? AND status IN ('queued', 'running')", (job_id,)).fetchone()[0]
+        if open_tasks:
+            return None
+        cur = self.conn.execute(
+            "UPDATE jobs SET status='done', finished_at=? WHERE id=? AND status != 'done'", (time.time(), job_id))
+        return job_id if cur.rowcount else None
+
+    def heartbeat(self, worker: Optional[str] = None) -> int:
+        """Renew the lease (claimed_at) of the worker's running tasks; returns how many it holds"""
+        worker = worker or worker_id()
+        with self._write():
+            cur = self.conn.execute(
+                "UPDATE tasks SET claimed_at=? WHERE status='running' AND worker=?", (time.time(), worker))
+        return cur.rowcount
+
+    def requeue_orphans(self, lease: float = LEASE_SECONDS) -> Tuple[int, List[int]]:
+        """
+        Put 'running' tasks back in the queue when the daemon that claimed them
+        is gone: its lease ran out (any host), or it no longer exists on this
+        host (found right away after a crash or reboot, no need to wait for the lease).
+        An orphan that used up its attempts (e.g. a video that crashes every
+        daemon rendering it) is marked failed instead.
+        Returns (tasks requeued or failed, ids of jobs that are now finished).
+        """
+        host = socket.gethostname()
+        orphans, finished_jobs = 0, []
+        with self._write():
+            rows = self.conn.execute(
+                "SELECT id, worker, claimed_at, attempts, max_attempts FROM tasks WHERE status='running'").fetchall()
+            now = time.time()
+            for row in rows:
+                worker_host, _, pid = (row['worker'] or "").rpartition(":")
+                dead = worker_host == host and pid.isdigit() and not _pid_alive(int(pid))
+                if not dead and (row['claimed_at'] or 0) >= now - lease:
+                    continue
+                orphans += 1
+                if row['attempts'] < row['max_attempts']:
+                    self.conn.execute(
+                        "UPDATE tasks SET status='queued', worker=NULL WHERE id=?", (row['id'],))
+                    continue
+                self.conn.execute(
+                    "UPDATE tasks SET status='failed', worker=NULL, finished_at=?, error=? WHERE id=?",
+                    (now, f"orphaned: worker {row['worker']} is gone", row['id']))
+                job_id = self._close_job_if_finished(row['id'])
+                if job_id is not None:
+                    finished_jobs.append(job_id)
+        return orphans, finished_jobs
+
+    # ---------- reporting ----------
+
+    def job(self, job_id: int) -> dict:
+        """The job row, with 'spec' decoded"""
+        job = dict(self.conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone())
+        job['spec'] = json.loads(job['spec'])
+        return job
+
+    def job_tasks(self, job_id: int) -> List[dict]:
+        rows = self.conn.execute(
+            "SELECT * FROM tasks WHERE job_id=? ORDER BY video_index", (job_id,)).fetchall()
+        tasks = []
+        for row in rows:
+            task = dict(row)
+            task['payload'] = json.loads(task['payload'])
+            tasks.append(task)
+        return tasks
+
+    def counts(self) -> dict:
+        """{status: number of tasks}"""
+        rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    def jobs(self, limit: int = 20) -> List[dict]:
+        rows = self.conn.execute(
+            """
+            SELECT j.id, j.customer, j.priority, j.status, j.created_at,
+                   SUM(t.status='done') AS done, SUM(t.status='failed') AS failed, COUNT(t.id) AS total
+            FROM jobs j LEFT JOIN tasks t ON t.job_id = j.id
+            GROUP BY j.id ORDER BY j.id DESC LIMIT ?
+            """, (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) would send CTRL_C on Windows, so ask the kernel instead
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
@@ -0,0 +1,403 @@
+"""
+Headless batch runner
+Renders one or more jobs (customers) with ONE shared worker pool, so several
+customers in one invocation share warm caches (PCM cache, media index,
+content packs, TTS clients) and keep every worker busy.
+
+Progress is reported as JSON lines (one event per line) on the event stream;
+the usual chatty render output goes to stderr.
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+import ffmpeg
+import verse_handler
+from Fonts import default_fonts
+from content_pack_manager import ContentPackManager
+from providers.duration_model import refit_if_stale
+from providers.hedged_tts import HedgedTTS
+from providers.transport import all_stats as tts_transport_stats
+from providers.voice_catalog import get_default_catalog
+from utils import clip_filters, metrics, output_catalog
+
+from shortsmaker.jobs import JobSpec
+
+
+class EventLog:
+    """Thread-safe JSON-lines writer for progress events"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        record = {"ts": round(time.time(), 3), "event": event, **fields}
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class BatchEta:
+    """
+    Remaining-time estimate for a batch: render time so far per second of
+    finished video, times the predicted seconds still to render
+    """
+
+    def __init__(self, tasks: List[dict]):
+        self.started = time.time()
+        self.total = sum(self.weight(t) for t in tasks)
+        self.done = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def weight(task: dict) -> float:
+        # Without a voice-over the length is the clip's own; the minimum is a fair stand-in
+        return task.get('predicted_seconds') or ffmpeg.MINIMUM_VIDEO_DURATION
+
+    def finished(self, task: dict) -> Optional[float]:
+        """Record a finished (or failed) task; returns the ETA in seconds"""
+        with self._lock:
+            self.done += self.weight(task)
+            if self.done <= 0:
+                return None
+            remaining = max(0.0, self.total - self.done)
+            return round((time.time() - self.started) * remaining / self.done, 1)
+
+
+class BatchRunner:
+    """
+    Runs JobSpecs through ffmpeg.create_video on a shared thread pool.
+
+    The heavy work happens in ffmpeg subprocesses, so threads are enough to
+    keep all cores busy; each job can additionally cap its own parallelism
+    with job.workers.
+
+    With group_by_clip, a job's videos that share a background clip are
+    rendered by one ffmpeg that decodes the clip once
+    (ffmpeg.create_videos_grouped), each group taking one worker slot.
+    """
+
+    def __init__(self, workers: int = 2, events: Optional[EventLog] = None,
+                 pack_manager: Optional[ContentPackManager] = None,
+                 keep_intermediates: Optional[bool] = None,
+                 group_by_clip: bool = False,
+                 group_memory_mb: float = ffmpeg.DEFAULT_GROUP_MEMORY_MB):
+        self.workers = max(1, int(workers))
+        self.group_by_clip = group_by_clip
+        self.group_memory_mb = group_memory_mb
+        self.events = events or EventLog()
+        self.pack_manager = pack_manager
+        self.keep_intermediates = keep_intermediates
+        self._tts_engines: Dict[str, object] = {}
+        self._voice_ids: Dict[tuple, str] = {}
+        self._hedged: Dict[tuple, HedgedTTS] = {}
+        self._tts_lock = threading.Lock()
+
+    # ---------- shared resources ----------
+
+    def get_pack_manager(self) -> ContentPackManager:
+        if self.pack_manager is None:
+            self.pack_manager = ContentPackManager()
+        return self.pack_manager
+
+    def get_tts_engine(self, provider: str):
+        """One TTS client per provider for the whole run (None if no API key)"""
+        with self._tts_lock:
+            if provider not in self._tts_engines:
+                self._tts_engines[provider] = ffmpeg.init_tts_engine(provider)
+            return self._tts_engines[provider]
+
+    def tts_engine_for(self, job: JobSpec):
+        """The job's TTS engine, wrapped in HedgedTTS when the job asks for hedging"""
+        engine = self.get_tts_engine(job.tts_provider)
+        if engine is None or not job.tts_hedge:
+            return engine
+        hedge = job.tts_hedge
+        key = (job.tts_provider, json.dumps(hedge, sort_keys=True))
+        with self._tts_lock:
+            if key in self._hedged:
+                return self._hedged[key]
+        failover = self.get_tts_engine(hedge["failover"]) if hedge.get("failover") else None
+        hedged = HedgedTTS(engine, failover=failover, voice_map=hedge.get("voices"),
+                           percentile=float(hedge.get("percentile", 95)),
+                           initial_deadline=float(hedge.get("initial_deadline", 8.0)),
+                           max_hedge_rate=float(hedge.get("max_rate", 0.1)))
+        with self._tts_lock:
+            return self._hedged.setdefault(key, hedged)
+
+    def resolve_voice(self, provider: str, voice: str) -> str:
+        """Job specs may name a voice ('Rachel') instead of its id; uses the cached voice catalog"""
+        key = (provider, voice)
+        with self._tts_lock:
+            if key in self._voice_ids:
+                return self._voice_ids[key]
+        engine = self.get_tts_engine(provider)
+        voice_id = voice
+        if engine is not None:
+            try:
+                voice_id = get_default_catalog().resolve_voice(provider, engine, voice)
+            except Exception as e:
+                print(f"⚠️ Could not look up {provider} voices: {e}", file=sys.stderr)
+        with self._tts_lock:
+            self._voice_ids[key] = voice_id
+        return voice_id
+
+    # ---------- planning ----------
+
+    def plan_job(self, job: JobSpec) -> List[dict]:
+        """Turn a JobSpec into per-video tasks (same planning as create_videos)"""
+        pack = self.get_pack_manager().get_pack(job.pack)
+        if pack is None:
+            raise ValueError(f"Unknown content pack '{job.pack}'")
+
+        rng = random.Random(job.seed)
+        verses, refs = ffmpeg.load_content(pack, None, job.count, job.randomize, rng=rng)
+        count = min(job.count, len(verses))
+        video_files, audio_files = ffmpeg.get_media_files(pack, None, None)
+        fonts = default_fonts(job.fonts_dir)
+        tasks = ffmpeg.plan_videos(verses, refs, count, video_files, audio_files, fonts, rng=rng)
+        self.predict_durations(job, tasks)
+        return tasks
+
+    def predict_durations(self, job: JobSpec, tasks: List[dict]):
+        """
+        Add predicted voice / video length to TTS tasks (providers/duration_model.py),
+        so the batch ETA is known before any audio was synthesized
+        """
+        engine = self.tts_engine_for(job) if job.use_tts else None
+        if engine is None:
+            return
+        try:
+            # Learn from the audio cached by earlier batches before predicting
+            if refit_if_stale():
+                print("📈 Duration model refitted from the TTS cache", file=sys.stderr)
+        except Exception as e:
+            print(f"⚠️ Could not refit the duration model: {e}", file=sys.stderr)
+        voice_id = self.resolve_voice(job.tts_provider, job.tts_voice)
+        for task in tasks:
+            voice = engine.estimate_duration(task['text_verse'], voice_id=voice_id)
+            task['predicted_voice_seconds'] = round(voice, 2)
+            task['predicted_seconds'] = round(ffmpeg.video_duration_for_voice(voice), 2)
+
+    def clip_filters_for(self, job: JobSpec) -> dict:
+        """The pack's clip filters with the job's overrides"""
+        pack = self.get_pack_manager().get_pack(job.pack)
+        return clip_filters.merge(pack.get_clip_filters() if pack else None, job.clip_filters)
+
+    def video_kwargs(self, job: JobSpec, task: dict, output_path: str) -> dict:
+        """create_video keyword arguments for one planned task"""
+        use_tts = job.use_tts
+        tts_engine = self.tts_engine_for(job) if use_tts else None
+        tts_voice = job.tts_voice
+        if tts_engine is not None:
+            tts_voice = self.resolve_voice(job.tts_provider, tts_voice)
+        return dict(
+            text_verse=task['text_verse'],
+            text_source=task['text_source'],
+            text_source_font=job.text_source_font,
+            text_source_for_image=task['text_source_for_image'],
+            video_file=task['video_file'],
+            audio_file=task['audio_file'],
+            image_file=job.logo or "",
+            font_file=task['font_file'],
+            font_size=task['font_size'],
+            font_chars=task['font_chars'],
+            output_path=output_path,
+            file_name=task['file_name'],
+            posts=job.posts,
+            use_logo=job.use_logo,
+            use_tts=use_tts and tts_engine is not None,
+            tts_engine=tts_engine,
+            tts_voice_id=tts_voice,
+            video_index=task['video_index'],
+            keep_intermediates=self.keep_intermediates,
+            encoder_profile=job.encoder_profile,
+            delivery_profiles=job.deliveries,
+            clip_filters=self.clip_filters_for(job),
+        )
+
+    def record_video(self, job: JobSpec, task: dict, output_path: str, info: Optional[dict] = None,
+                     seconds: Optional[float] = None, run: Optional[str] = None):
+        """Append a finished video to the output catalog of the job's output folder"""
+        settings = {"deliveries": (info or {}).get("deliveries") or list(job.deliveries),
+                    "clip_filters": self.clip_filters_for(job)}
+        output_catalog.add_video(
+            job.output_folder, task, job.customer, output_path, info=info, seconds=seconds,
+            tts_provider=job.tts_provider if job.use_tts else None,
+            voice=job.tts_voice if job.use_tts else None,
+            encoder_profile=job.encoder_profile, settings=settings, run=run)
+
+    # ---------- running ----------
+
+    def run(self, jobs: List[JobSpec]) -> dict:
+        """Render all jobs; returns a summary dict (also emitted as 'batch_done')"""
+        started = time.time()
+        self._run_id = time.strftime("%Y%m%d-%H%M%S", time.localtime(started))
+        self.events.emit("batch_start", jobs=len(jobs), workers=self.workers)
+
+        planned = []
+        for job_id, job in enumerate(jobs):
+            try:
+                tasks = self.plan_job(job)
+            except Exception as e:
+                self.events.emit("job_failed", job=job_id, customer=job.customer, error=str(e))
+                continue
+            output_path = ffmpeg.create_dirs(job.output_folder, job.customer, job.posts)
+            if not tasks:
+                self.events.emit("job_done", job=job_id, customer=job.customer,
+                                 completed=0, failed=0, output=output_path)
+                continue
+            limit = max(1, int(job.workers or self.workers))
+            planned.append((job_id, job, tasks, output_path, limit))
+            self.events.emit("job_start", job=job_id, customer=job.customer, pack=job.pack,
+                             videos=len(tasks), seed=job.seed,
+                             predicted_seconds=round(sum(BatchEta.weight(t) for t in tasks), 1))
+
+        # Interleave jobs so a big order doesn't hold back the small ones
+        units = {entry[0]: self.work_units(entry[2]) for entry in planned}
+        pending = []
+        longest = max((len(u) for u in units.values()), default=0)
+        for i in range(longest):
+            for entry in planned:
+                if i < len(units[entry[0]]):
+                    pending.append((entry, units[entry[0]][i]))
+
+        self._eta = BatchEta([task for entry in planned for task in entry[2]])
+        metrics.workers_total.set(self.workers)
+        results = {entry[0]: [] for entry in planned}
+        running = {entry[0]: 0 for entry in planned}
+        inflight = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render") as pool:
+            while pending or inflight:
+                # Hand out free worker slots, respecting each job's own limit
+                i = 0
+                while len(inflight) < self.workers and i < len(pending):
+                    entry, unit = pending[i]
+                    if running[entry[0]] < entry[4]:
+                        pending.pop(i)
+                        running[entry[0]] += 1
+                        inflight[pool.submit(self._render_unit, entry, unit)] = entry
+                    else:
+                        i += 1
+                metrics.queue_depth.set(len(pending), queue="batch", state="pending")
+                metrics.queue_depth.set(len(inflight), queue="batch", state="running")
+
+                finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job_id, job, tasks, output_path, _ = inflight.pop(future)
+                    running[job_id] -= 1
+                    results[job_id].extend(future.result())
+                    if len(results[job_id]) == len(tasks):
+                        self._finish_job(job_id, job, tasks, output_path, results[job_id])
+
+        completed = sum(1 for r in results.values() for item in r if item["ok"])
+        failed = sum(1 for r in results.values() for item in r if not item["ok"])
+        summary = {"completed": completed, "failed": failed,
+                   "seconds": round(time.time() - started, 2)}
+        tts_stats = tts_transport_stats()
+        if tts_stats:
+            summary["tts"] = tts_stats  # requests, retries, throttled, throttle_seconds per provider
+        if self._hedged:
+            summary["hedge"] = {f"{provider}": engine.stats() for (provider, _), engine in self._hedged.items()}
+        self.events.emit("batch_done", **summary)
+        return summary
+
+    def work_units(self, tasks: List[dict]) -> List[List[dict]]:
+        """Tasks per worker slot: one each, or grouped by background clip"""
+        if not self.group_by_clip:
+            return [[task] for task in tasks]
+        groups: Dict[str, List[dict]] = {}
+        for task in tasks:
+            groups.setdefault(task['video_file'], []).append(task)
+        return list(groups.values())
+
+    def _render_unit(self, entry, unit: List[dict]) -> List[dict]:
+        if len(unit) == 1:
+            return [self._render_one(entry, unit[0])]
+        return self._render_group(entry, unit)
+
+    def _render_group(self, entry, unit: List[dict]) -> List[dict]:
+        """Several videos from one decode of their shared clip"""
+        job_id, job, tasks, output_path, _ = entry
+        for task in unit:
+            self.events.emit("video_start", job=job_id, customer=job.customer, index=task['video_index'],
+                             total=len(tasks), clip=task['video_file'], track=task['audio_file'],
+                             group=len(unit))
+        started = time.time()
+        try:
+            with metrics.busy_worker():
+                rendered = ffmpeg.create_videos_grouped(
+                    [self.video_kwargs(job, task, output_path) for task in unit],
+                    memory_limit_mb=self.group_memory_mb, keep_intermediates=self.keep_intermediates)
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            rendered = [{"error": e}] * len(unit)
+        seconds = round(time.time() - started, 2)
+
+        results = []
+        for task, info in zip(unit, rendered):
+            index = task['video_index']
+            error = info["error"]
+            if error is not None:
+                metrics.videos_total.inc(status="failed")
+                self.events.emit("video_failed", job=job_id, customer=job.customer,
+                                 index=index, error=str(error), eta_seconds=self._eta.finished(task))
+                results.append({"ok": False, "task": task})
+                continue
+            metrics.videos_total.inc(status="done")
+            self.record_video(job, task, output_path, info=info, seconds=seconds, run=self._run_id)
+            self.events.emit("video_done", job=job_id, customer=job.customer, index=index,
+                             file=task['file_name'].strip("/"), seconds=seconds,
+                             eta_seconds=self._eta.finished(task))
+            results.append({"ok": True, "task": task, "seconds": seconds})
+        return results
+
+    def _render_one(self, entry, task) -> dict:
+        job_id, job, tasks, output_path, _ = entry
+        index = task['video_index']
+        self.events.emit("video_start", job=job_id, customer=job.customer, index=index,
+                         total=len(tasks), clip=task['video_file'], track=task['audio_file'])
+        started = time.time()
+        try:
+            with metrics.busy_worker():
+                info = ffmpeg.create_video(**self.video_kwargs(job, task, output_path))
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            metrics.videos_total.inc(status="failed")
+            self.events.emit("video_failed", job=job_id, customer=job.customer,
+                             index=index, error=str(e), eta_seconds=self._eta.finished(task))
+            return {"ok": False, "task": task}
+        metrics.videos_total.inc(status="done")
+        seconds = round(time.time() - started, 2)
+        self.record_video(job, task, output_path, info=info, seconds=seconds, run=self._run_id)
+        self.events.emit("video_done", job=job_id, customer=job.customer, index=index,
+                         file=task['file_name'].strip("/"), seconds=seconds,
+                         eta_seconds=self._eta.finished(task))
+        return {"ok": True, "task": task, "seconds": seconds}
+
+    def _finish_job(self, job_id, job: JobSpec, tasks, output_path, results):
+        done = [r["task"] for r in results if r["ok"]]
+        write_job_sheet(job.customer, output_path, done)
+        self.events.emit("job_done", job=job_id, customer=job.customer,
+                         completed=len(done), failed=len(results) - len(done),
+                         output=output_path)
+
+
+def write_job_sheet(customer: str, output_path: str, tasks: List[dict]):
+    """Write the customer CSV (File Name, Reference, Verse) for the finished tasks"""
+    done = sorted(tasks, key=lambda t: t['video_index'])
+    verse_handler.add_sheets(
+        video_names=[t['file_name'].strip("/") for t in done],
+        customer_name=customer,
+        output_path=output_path,
+        refs=[t['text_source'] for t in done],
+        verses=[t['text_verse'] for t in done],
+    )
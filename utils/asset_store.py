@@ -0,0 +1,226 @@
+"""
+Content-addressed asset store for the library
+Every distinct file is stored ONCE under library/.store/<ab>/<sha256><ext>;
+the category folders (library/audio/calm/..., library/videos/nature/...)
+are hardlinks to those blobs. So:
+
+  - filing a file into a category is a link, not a copy
+  - recategorizing is a rename inside the library (no bytes move); the file
+    organizer does that when it is pointed at a library category folder
+  - the same track in two categories takes the space of one
+  - caches can key on the content hash instead of the path (content_key)
+
+Where hardlinks are not available (FAT drives, other volumes) files are
+copied instead, so nothing breaks, it just isn't deduplicated.
+
+    python -m utils.asset_store adopt [library]   # move existing library files into the store
+    python -m utils.asset_store gc                # delete blobs no category uses any more
+    python -m utils.asset_store stats
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+from utils.media_index import MediaIndex, get_default_index
+
+DEFAULT_STORE = Path("library") / ".store"
+SECTION = "content"
+MEDIA_EXTS = (".mp4", ".mov", ".avi", ".mkv", ".m4v", ".webm", ".mp3", ".wav", ".m4a", ".flac", ".ogg")
+
+
+def sha256_file(path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_key(path, index: Optional[MediaIndex] = None) -> Optional[str]:
+    """sha256 of path if it is already known (never hashes), else None"""
+    data = (index or get_default_index()).get(path, SECTION)
+    return data["sha256"] if data else None
+
+
+def _link_or_copy(src: Path, dst: Path) -> bool:
+    """Hardlink src at dst (True), or copy it where links aren't possible (False)"""
+    try:
+        os.link(src, dst)
+        return True
+    except OSError:
+        shutil.copy2(src, dst)
+        return False
+
+
+class AssetStore:
+    """Blob store with hardlinked views (see module docstring)"""
+
+    def __init__(self, root=DEFAULT_STORE, index: Optional[MediaIndex] = None):
+        self.root = Path(root)
+        self.library_root = self.root.parent
+        self.index = index or get_default_index()
+
+    def content_hash(self, path) -> str:
+        """sha256 of a file, remembered in the media index until the file changes"""
+        known = content_key(path, self.index)
+        if known:
+            return known
+        digest = sha256_file(path)
+        self.index.put(path, SECTION, {"sha256": digest})
+        return digest
+
+    def blob_path(self, digest: str, suffix: str) -> Path:
+        return self.root / digest[:2] / f"{digest}{suffix.lower()}"
+
+    def ingest(self, path, move: bool = False) -> Path:
+        """
+        The blob holding path's content, created if needed. With move=True the
+        original is taken over (or dropped if the store already has its bytes).
+        """
+        path = Path(path)
+        blob = self._blob_for(path, move)
+        if move:
+            self._drop_original(path, blob)
+        return blob
+
+    def _blob_for(self, path: Path, link: bool) -> Path:
+        """The blob holding path's content; a new blob is a link to path if link=True, else a copy"""
+        digest = self.content_hash(path)
+        blob = self.blob_path(digest, path.suffix)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_name(f".{uuid.uuid4().hex}.tmp")
+            try:
+                if link:
+                    _link_or_copy(path, tmp)
+                else:
+                    shutil.copy2(path, tmp)  # keep the original independent of the library
+                os.replace(tmp, blob)
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+            self.index.put(blob, SECTION, {"sha256": digest})
+        return blob
+
+    @staticmethod
+    def _drop_original(path: Path, blob: Path):
+        if path.exists() and path.resolve() != blob.resolve():
+            path.unlink()
+
+    def place(self, src, dest, move: bool = False) -> Path:
+        """
+        File src as dest (a category path that must not exist yet): a link to
+        src's blob. With move=True src is removed, but only once dest exists.
+        """
+        src, dest = Path(src), Path(dest)
+        blob = self._blob_for(src, link=move)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        _link_or_copy(blob, dest)
+        if move:
+            self._drop_original(src, blob)
+        self.index.put(dest, SECTION, {"sha256": self.content_hash(blob)})
+        self.index.save()
+        return dest
+
+    def in_library(self, path) -> bool:
+        """Is path a category file of this store's library (not a blob)?"""
+        try:
+            relative = Path(path).resolve().relative_to(self.library_root.resolve())
+        except ValueError:
+            return False
+        return not relative.parts[0].startswith(".")
+
+    def move_view(self, view, dest) -> Path:
+        """Recategorize: rename a category file to dest (must not exist yet; metadata only)"""
+        view, dest = Path(view), Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        known = content_key(view, self.index)
+        os.replace(view, dest)
+        if known:
+            self.index.put(dest, SECTION, {"sha256": known})
+            self.index.save()
+        return dest
+
+    def adopt(self, library_root) -> Dict[str, int]:
+        """
+        Replace the media files under library_root by links into the store;
+        files with identical content end up sharing one blob.
+        """
+        report = {"files": 0, "linked": 0, "bytes_saved": 0}
+        for path in sorted(Path(library_root).rglob("*")):
+            relative = path.relative_to(library_root)
+            if (path.suffix.lower() not in MEDIA_EXTS or not path.is_file()
+                    or any(part.startswith(".") for part in relative.parts)):
+                continue
+            report["files"] += 1
+            digest = self.content_hash(path)
+            blob = self.blob_path(digest, path.suffix)
+            if blob.exists() and path.samefile(blob):
+                continue
+            if not blob.exists():
+                # First copy of this content: it becomes the blob
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(path, blob)
+                except OSError:
+                    continue  # no hardlinks on this drive: leave the file alone
+                self.index.put(blob, SECTION, {"sha256": digest})
+                continue
+            tmp = path.with_name(f".{uuid.uuid4().hex}.tmp")
+            if not _link_or_copy(blob, tmp):
+                tmp.unlink()
+                continue  # no hardlinks on this drive: leave the file alone
+            size = path.stat().st_size
+            os.replace(tmp, path)
+            self.index.put(path, SECTION, {"sha256": digest})
+            report["linked"] += 1
+            report["bytes_saved"] += size
+        self.index.save()
+        return report
+
+    def gc(self) -> Dict[str, int]:
+        """Delete blobs no category file links to any more"""
+        report = {"blobs": 0, "bytes_freed": 0}
+        for blob in self.root.glob("*/*"):
+            if blob.name.startswith("."):
+                continue
+            st = blob.stat()
+            if st.st_nlink == 1:
+                blob.unlink()
+                report["blobs"] += 1
+                report["bytes_freed"] += st.st_size
+        return report
+
+    def stats(self) -> Dict[str, int]:
+        blobs = [b for b in self.root.glob("*/*") if not b.name.startswith(".")]
+        return {"blobs": len(blobs), "bytes": sum(b.stat().st_size for b in blobs),
+                "views": sum(b.stat().st_nlink - 1 for b in blobs)}
+
+
+_default_store: Optional[AssetStore] = None
+
+
+def get_default_store() -> AssetStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = AssetStore()
+    return _default_store
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    store = get_default_store()
+    if command == "adopt":
+        print(store.adopt(sys.argv[2] if len(sys.argv) > 2 else "library"))
+    elif command == "gc":
+        print(store.gc())
+    elif command == "stats":
+        print(store.stats())
+    else:
+        print(__doc__)
+        sys.exit(1)
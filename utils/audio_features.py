@@ -0,0 +1,238 @@
+"""
+Audio feature analysis + category suggestions for the music library
+Decodes tracks in a process pool and measures, with plain NumPy:
+
+  - tempo (BPM, from the autocorrelation of spectral flux)
+  - RMS energy and loudness (dBFS)
+  - spectral centroid (Hz, "brightness")
+  - dynamic range (dB between loud and quiet passages)
+
+Results are cached in the media index (section "features"), so a track is
+analyzed once. Suggestions compare a track with the tracks already filed in
+each category (library/audio/<category>/); categories with too few tracks
+fall back to a built-in profile.
+
+    python -m utils.audio_features                 # analyze library/audio, print suggestions
+    python -m utils.audio_features path/to/folder --workers 8
+"""
+
+import math
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.loudness import find_audio_files
+from utils.media_index import MediaIndex, get_default_index
+
+SECTION = "features"
+SAMPLE_RATE = 22050
+ANALYZE_SECONDS = 120       # the first two minutes are plenty to tell a track's character
+WINDOW = 2048
+HOP = 512
+MIN_BPM, MAX_BPM = 60, 180
+
+FEATURES = ("tempo_bpm", "rms_db", "centroid_hz", "dynamic_range_db")
+# Typical spread of each feature; distances are measured in these units
+FEATURE_SCALES = {"tempo_bpm": 20.0, "rms_db": 4.0, "centroid_hz": 700.0, "dynamic_range_db": 4.0}
+
+# Starting points until a category has MIN_EXAMPLES sorted tracks of its own
+DEFAULT_PROFILES = {
+    "gym":       {"tempo_bpm": 130, "rms_db": -11, "centroid_hz": 2600, "dynamic_range_db": 8},
+    "luxury":    {"tempo_bpm": 95,  "rms_db": -13, "centroid_hz": 1700, "dynamic_range_db": 9},
+    "calm":      {"tempo_bpm": 72,  "rms_db": -22, "centroid_hz": 1300, "dynamic_range_db": 12},
+    "uplifting": {"tempo_bpm": 115, "rms_db": -15, "centroid_hz": 2400, "dynamic_range_db": 10},
+    "dramatic":  {"tempo_bpm": 88,  "rms_db": -16, "centroid_hz": 1600, "dynamic_range_db": 18},
+}
+FALLBACK_CATEGORY = "generic"
+MIN_EXAMPLES = 3
+MAX_DISTANCE = 2.5          # further than this from every category -> generic
+
+
+def _decode(audio_file: str) -> np.ndarray:
+    cmd = ["ffmpeg", "-v", "error", "-t", str(ANALYZE_SECONDS), "-i", audio_file,
+           "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "f32le", "-"]
+    return np.frombuffer(subprocess.check_output(cmd, stderr=subprocess.DEVNULL), dtype=np.float32)
+
+
+def _tempo(flux: np.ndarray) -> float:
+    """Strongest beat period in the onset envelope, with a mild preference for ~120 BPM"""
+    flux = flux - flux.mean()
+    if not flux.any():
+        return 0.0
+    frames_per_second = SAMPLE_RATE / HOP
+    autocorrelation = np.correlate(flux, flux, mode="full")[len(flux) - 1:]
+    lags = np.arange(int(frames_per_second * 60 / MAX_BPM), int(frames_per_second * 60 / MIN_BPM) + 1)
+    lags = lags[lags < len(autocorrelation)]
+    if not len(lags):
+        return 0.0
+    bpm = 60.0 * frames_per_second / lags
+    weight = np.exp(-0.5 * (np.log2(bpm / 120.0) / 0.9) ** 2)
+    return round(float(bpm[np.argmax(autocorrelation[lags] * weight)]), 1)
+
+
+def analyze_track(audio_file: str) -> Dict[str, float]:
+    """Features of one track (runs in a worker process)"""
+    samples = _decode(audio_file)
+    if len(samples) < WINDOW * 4:
+        raise ValueError("track too short to analyze")
+    count = 1 + (len(samples) - WINDOW) // HOP
+    window = np.hanning(WINDOW).astype(np.float32)
+    frequencies = np.fft.rfftfreq(WINDOW, 1.0 / SAMPLE_RATE)
+    rms_db = np.empty(count)
+    centroid = np.empty(count)
+    flux = np.zeros(count)
+    previous = None
+    # Spectra are computed a block of frames at a time to keep worker memory small
+    for first in range(0, count, 256):
+        positions = HOP * np.arange(first, min(first + 256, count))
+        frames = samples[np.arange(WINDOW)[None, :] + positions[:, None]]
+        rms_db[first:first + len(positions)] = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-9)
+        magnitude = np.abs(np.fft.rfft(frames * window, axis=1))
+        centroid[first:first + len(positions)] = (magnitude @ frequencies) / (magnitude.sum(axis=1) + 1e-9)
+        log_magnitude = np.log1p(magnitude)
+        stacked = np.vstack([log_magnitude[:1] if previous is None else previous, log_magnitude])
+        flux[first:first + len(positions)] = np.maximum(0.0, np.diff(stacked, axis=0)).sum(axis=1)
+        previous = log_magnitude[-1:]
+    audible = rms_db > -60  # ignore silence (intros, gaps) for the statistics
+
+    loud = rms_db[audible] if audible.any() else rms_db
+    return {
+        "tempo_bpm": _tempo(flux),
+        "rms_db": round(float(20 * np.log10(np.sqrt(np.mean(samples ** 2)) + 1e-9)), 2),
+        "centroid_hz": round(float(np.median(centroid[audible] if audible.any() else centroid)), 1),
+        "dynamic_range_db": round(float(np.percentile(loud, 95) - np.percentile(loud, 10)), 2),
+        "seconds_analyzed": round(len(samples) / SAMPLE_RATE, 1),
+    }
+
+
+class FeatureAnalyzer:
+    """Background analysis on a process pool; results go to the media index"""
+
+    def __init__(self, index: Optional[MediaIndex] = None, workers: Optional[int] = None):
+        self.index = index or get_default_index()
+        self._pool = ProcessPoolExecutor(max_workers=workers or max(1, (os.cpu_count() or 2) - 1))
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()  # submit() is called from the UI and from learner threads
+
+    def cached(self, audio_file) -> Optional[dict]:
+        return self.index.get(audio_file, SECTION)
+
+    def submit(self, audio_file) -> Future:
+        """Future with the track's features (cached results resolve immediately)"""
+        audio_file = str(audio_file)
+        with self._lock:
+            if audio_file in self._futures:
+                return self._futures[audio_file]
+            data = self.cached(audio_file)
+            if data is not None:
+                future = Future()
+                future.set_result(data)
+            else:
+                future = self._pool.submit(analyze_track, audio_file)
+            self._futures[audio_file] = future
+        if data is None:
+            future.add_done_callback(lambda f, path=audio_file: self._store(path, f))
+        return future
+
+    def _store(self, audio_file: str, future: Future):
+        if not future.cancelled() and future.exception() is None:
+            self.index.put(audio_file, SECTION, future.result())
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            self.index.save()
+        except OSError:
+            pass
+
+
+def _distance(features: dict, profile: dict) -> float:
+    return math.sqrt(sum(((features[k] - profile[k]) / FEATURE_SCALES[k]) ** 2 for k in FEATURES))
+
+
+class CategorySuggester:
+    """Nearest category profile, learned from the tracks already filed in each category"""
+
+    def __init__(self, profiles: Optional[Dict[str, dict]] = None):
+        self.profiles = dict(profiles or DEFAULT_PROFILES)
+
+    def learn(self, examples: Dict[str, List[dict]]):
+        """examples: {category: [features of its tracks]}"""
+        profiles = dict(self.profiles)
+        for category, rows in examples.items():
+            if len(rows) >= MIN_EXAMPLES:
+                profiles[category] = {k: float(np.median([r[k] for r in rows])) for k in FEATURES}
+        self.profiles = profiles  # swapped in one step: suggest() may run on another thread
+
+    def suggest(self, features: dict) -> Tuple[str, float]:
+        """(category, distance); FALLBACK_CATEGORY when nothing is close"""
+        if not self.profiles:
+            return FALLBACK_CATEGORY, float("inf")
+        distances = {c: _distance(features, p) for c, p in self.profiles.items() if c != FALLBACK_CATEGORY}
+        category = min(distances, key=distances.get)
+        distance = round(distances[category], 2)
+        return (FALLBACK_CATEGORY if distance > MAX_DISTANCE else category), distance
+
+
+def submit_library(library_root, analyzer: FeatureAnalyzer) -> Dict[str, Tuple[str, Future]]:
+    """
+    Queue the analysis of every track in the category folders below library_root
+    (returns at once). Submit these before other tracks, so learning isn't behind them.
+    """
+    root = Path(library_root)
+    futures = {}
+    if not root.is_dir():
+        return futures
+    for category in sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")):
+        for audio_file in find_audio_files(category):
+            futures[audio_file] = (category.name, analyzer.submit(audio_file))
+    return futures
+
+
+def library_examples(library_root, analyzer: FeatureAnalyzer,
+                     futures: Optional[Dict[str, Tuple[str, Future]]] = None) -> Dict[str, List[dict]]:
+    """Features of the tracks in each category folder below library_root (waits for analysis)"""
+    if futures is None:
+        futures = submit_library(library_root, analyzer)
+    examples: Dict[str, List[dict]] = {}
+    for audio_file, (category, future) in futures.items():
+        try:
+            examples.setdefault(category, []).append(future.result())
+        except Exception as e:
+            print(f"   ❌ {os.path.basename(audio_file)}: {e}")
+    return examples
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Analyze tracks and suggest a category for each")
+    parser.add_argument("folder", nargs="?", default="library/audio")
+    parser.add_argument("--workers", type=int, default=None, help="Analysis processes (default: CPUs - 1)")
+    args = parser.parse_args()
+
+    started = time.time()
+    analyzer = FeatureAnalyzer(workers=args.workers)
+    suggester = CategorySuggester()
+    if Path("library/audio").is_dir():
+        suggester.learn(library_examples("library/audio", analyzer))
+    files = find_audio_files(args.folder)
+    futures = [(f, analyzer.submit(f)) for f in files]
+    for audio_file, future in futures:
+        try:
+            features = future.result()
+        except Exception as e:
+            print(f"❌ {audio_file}: {e}")
+            continue
+        category, distance = suggester.suggest(features)
+        print(f"{audio_file}: {features['tempo_bpm']:.0f} BPM, {features['rms_db']:.1f} dBFS, "
+              f"centroid {features['centroid_hz']:.0f} Hz, DR {features['dynamic_range_db']:.1f} dB "
+              f"→ {category} ({distance})")
+    analyzer.close()
+    print(f"⏱️ {len(files)} tracks in {time.time() - started:.1f}s")
@@ -8,6 +8,9 @@ import os
 import math
 from typing import Tuple
 
+from utils.loudness import db_to_linear
+from utils.scratch import ScratchWorkspace
+
 
 def _run(cmd: list) -> None:
     """
@@ -141,6 +144,8 @@ def mix_voice_and_music(
     voice_delay: float = 1.0,
     voice_volume: float = 1.0,
     music_volume: float = 0.15,
+    music_gain_db: float = 0.0,
+    duck_db: float = 0.0,
 ) -> str:
     """
     Mix AI voice with background music:
@@ -148,70 +153,68 @@ def mix_voice_and_music(
       - Voice starts after voice_delay
       - Music fades out in the last 1.5 s
     Outputs exactly video_duration seconds.
+
+    music_gain_db is the precomputed loudness correction for the track
+    (see utils.loudness.gain_for_track); it is folded into the music volume.
+
+    A .wav output_file is mixed in-process with NumPy (utils.audio_mixer),
+    which also supports ducking the music by duck_db under the voice.
+    Other formats use the three-step ffmpeg mix below.
     """
+    if output_file.lower().endswith(".wav"):
+        try:
+            from utils.audio_mixer import mix_voice_and_music_pcm
+
+            print("🎵 Mixing voice and background music (in-process)...")
+            return mix_voice_and_music_pcm(
+                voice_audio, background_music, output_file, video_duration,
+                voice_delay=voice_delay, voice_volume=voice_volume,
+                music_volume=music_volume, music_gain_db=music_gain_db, duck_db=duck_db,
+            )
+        except Exception as e:
+            print(f"   ⚠️ In-process mix failed ({e}), using ffmpeg instead")
+
     try:
         print("🎵 Mixing voice and background music (smart sync)...")
         print(f"   Voice starts at: {voice_delay}s (synced with text)")
         print("   Music starts at: 0s (immediate)")
         print(f"   Total duration: {video_duration:.1f}s")
 
-        # 1) Pad the voice to full length: [silence_before] + voice + [silence_after] = video_duration
-        padded_voice = os.path.join(os.path.dirname(output_file) or ".", "voice_padded.mp3")
-
-        pad_cmd = [
-            "ffmpeg",
-            "-y",
-            "-i", voice_audio,
-            "-af", f"adelay={int(voice_delay*1000)}|{int(voice_delay*1000)},apad=whole_dur={video_duration}",
-            "-t", f"{video_duration:.3f}",
-            padded_voice,
-        ]
-        _run(pad_cmd)
-        print(f"   🔇 Padded audio created ({video_duration:.1f}s total)")
-
-        # 2) Ensure background music covers full duration (loop by concat demuxer is fine for MP3)
-        music_duration = get_audio_duration(background_music)
-        music_full = background_music
-        if music_duration < video_duration:
-            loops = max(math.ceil(video_duration / max(music_duration, 0.0001)), 1)
-            concat_list = os.path.join(os.path.dirname(output_file) or ".", "music_concat.txt")
-            with open(concat_list, "w", encoding="utf-8") as f:
-                abs_music = os.path.abspath(background_music).replace("\\", "/")
-                for _ in range(loops):
-                    f.write(f"file '{abs_music}'\n")
-
-            music_full = os.path.join(os.path.dirname(output_file) or ".", "music_looped.mp3")
-            _run([
-                "ffmpeg", "-y",
-                "-f", "concat", "-safe", "0", "-i", concat_list,
+        # Intermediates live in a private workspace (lossless WAV), never next to the output
+        with ScratchWorkspace("mix") as ws:
+            # 1) Pad the voice to full length: [silence_before] + voice + [silence_after] = video_duration
+            padded_voice = ws.file("voice_padded.wav")
+
+            pad_cmd = [
+                "ffmpeg",
+                "-y",
+                "-i", voice_audio,
+                "-af", f"adelay={int(voice_delay*1000)}|{int(voice_delay*1000)},apad=whole_dur={video_duration}",
                 "-t", f"{video_duration:.3f}",
-                "-c", "copy",
-                music_full
-            ])
-            if os.path.exists(concat_list):
-                os.remove(concat_list)
-
-        # 3) Fade music at end, mix with padded voice to exact duration
-        fade_start = max(video_duration - 1.5, 0.0)
-        cmd = [
-            "ffmpeg",
-            "-y",
-            "-i", music_full,
-            "-i", padded_voice,
-            "-filter_complex",
-            f"[0:a]volume={music_volume},afade=t=out:st={fade_start:.3f}:d=1.5[m];"
-            f"[1:a]volume={voice_volume}[v];"
-            f"[m][v]amix=inputs=2:duration=first:dropout_transition=0",
-            "-t", f"{video_duration:.3f}",
-            output_file,
-        ]
-        _run(cmd)
-
-        # cleanup
-        if os.path.exists(padded_voice):
-            os.remove(padded_voice)
-        if music_full.endswith("music_looped.mp3") and os.path.exists(music_full):
-            os.remove(music_full)
+                padded_voice,
+            ]
+            _run(pad_cmd)
+            print(f"   🔇 Padded audio created ({video_duration:.1f}s total)")
+
+            # 2) Ensure background music covers full duration
+            music_full = _loop_music(background_music, video_duration, ws)
+
+            # 3) Fade music at end, mix with padded voice to exact duration
+            fade_start = max(video_duration - 1.5, 0.0)
+            music_level = music_volume * db_to_linear(music_gain_db)
+            cmd = [
+                "ffmpeg",
+                "-y",
+                "-i", music_full,
+                "-i", padded_voice,
+                "-filter_complex",
+                f"[0:a]volume={music_level:.6f},afade=t=out:st={fade_start:.3f}:d=1.5[m];"
+                f"[1:a]volume={voice_volume}[v];"
+                f"[m][v]amix=inputs=2:duration=first:dropout_transition=0",
+                "-t", f"{video_duration:.3f}",
+                output_file,
+            ]
+            _run(cmd)
 
         print(f"   ✅ Perfect mix! Music plays throughout, voice starts at {voice_delay}s")
         return output_file
@@ -221,44 +224,63 @@ def mix_voice_and_music(
         raise
 
 
-def prepare_background_music(music_file: str, output_file: str, target_duration: float) -> str:
+def _loop_music(music_file: str, target_duration: float, workspace: ScratchWorkspace) -> str:
+    """
+    Return a file that covers target_duration: the track itself if it is long
+    enough, otherwise a looped WAV copy inside the workspace.
+    """
+    music_duration = get_audio_duration(music_file)
+    if music_duration >= target_duration:
+        return music_file
+
+    loops = max(math.ceil(target_duration / max(music_duration, 0.0001)), 1)
+    concat_list = workspace.file("music_concat.txt")
+    with open(concat_list, "w", encoding="utf-8") as f:
+        abs_music = os.path.abspath(music_file).replace("\\", "/")
+        for _ in range(loops):
+            f.write(f"file '{abs_music}'\n")
+
+    music_looped = workspace.file("music_looped.wav")
+    _run([
+        "ffmpeg", "-y",
+        "-f", "concat", "-safe", "0", "-i", concat_list,
+        "-t", f"{target_duration:.3f}",
+        "-c:a", "pcm_s16le",
+        music_looped
+    ])
+    return music_looped
+
+
+def prepare_background_music(music_file: str, output_file: str, target_duration: float,
+                             gain_db: float = 0.0) -> str:
     """
     Make background music exactly target_duration with a 1.5 s fade out.
+    gain_db (precomputed loudness correction) is applied in the same filter pass.
+
+    A .wav output_file is built from the decoded PCM cache (no ffmpeg run
+    once the track is cached); other formats go through ffmpeg as before.
     """
+    if output_file.lower().endswith(".wav"):
+        try:
+            return _prepare_background_music_pcm(music_file, output_file, target_duration, gain_db)
+        except Exception as e:
+            print(f"   ⚠️ PCM cache unavailable ({e}), using ffmpeg instead")
+
     try:
-        music_duration = get_audio_duration(music_file)
-        music_full = music_file
-
-        if music_duration < target_duration:
-            loops = max(math.ceil(target_duration / max(music_duration, 0.0001)), 1)
-            concat_list = os.path.join(os.path.dirname(output_file) or ".", "music_concat.txt")
-            with open(concat_list, "w", encoding="utf-8") as f:
-                abs_music = os.path.abspath(music_file).replace("\\", "/")
-                for _ in range(loops):
-                    f.write(f"file '{abs_music}'\n")
-
-            music_full = os.path.join(os.path.dirname(output_file) or ".", "music_temp.mp3")
+        with ScratchWorkspace("music") as ws:
+            music_full = _loop_music(music_file, target_duration, ws)
+
+            fade_start = max(target_duration - 1.5, 0.0)
+            audio_filter = f"afade=t=out:st={fade_start:.3f}:d=1.5"
+            if gain_db:
+                audio_filter = f"volume={gain_db:.2f}dB," + audio_filter
             _run([
                 "ffmpeg", "-y",
-                "-f", "concat", "-safe", "0", "-i", concat_list,
+                "-i", music_full,
+                "-af", audio_filter,
                 "-t", f"{target_duration:.3f}",
-                "-c", "copy",
-                music_full
+                output_file
             ])
-            if os.path.exists(concat_list):
-                os.remove(concat_list)
-
-        fade_start = max(target_duration - 1.5, 0.0)
-        _run([
-            "ffmpeg", "-y",
-            "-i", music_full,
-            "-af", f"afade=t=out:st={fade_start:.3f}:d=1.5",
-            "-t", f"{target_duration:.3f}",
-            output_file
-        ])
-
-        if music_full.endswith("music_temp.mp3") and os.path.exists(music_full):
-            os.remove(music_full)
 
         return output_file
 
@@ -267,6 +289,19 @@ def prepare_background_music(music_file: str, output_file: str, target_duration:
         raise
 
 
+def _prepare_background_music_pcm(music_file: str, output_file: str, target_duration: float,
+                                  gain_db: float = 0.0) -> str:
+    """Loop/trim/fade a cached decoded track with array slicing and write it as WAV."""
+    from utils.pcm_cache import get_default_cache, segment, write_wav
+
+    cache = get_default_cache()
+    track = cache.get(music_file)
+    music = segment(track, target_duration, cache.sample_rate, loop=True, fade_out=1.5)
+    if gain_db:
+        music = music * db_to_linear(gain_db)
+    return write_wav(output_file, music, cache.sample_rate)
+
+
 def prepare_video_for_audio(video_file: str, audio_duration: float, output_file: str) -> str:
     """
     Make video duration match audio_duration:
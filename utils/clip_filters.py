@@ -0,0 +1,96 @@
+"""
+Render-time clip adjustments
+Darkening, cropping and scaling background clips used to mean writing new
+files first (darkenVideos.py). Now they are settings applied inside the final
+ffmpeg filter graph, so a clip variant costs no extra pass and no disk:
+
+    "clip_filters": {
+        "darken": 0.8,                              # brightness factor (1.0 = unchanged), like DARK
+        "crop": {"aspect": "9:16", "offset": 0.0},  # largest centered crop; offset -1..1 shifts it sideways
+        "scale": "1080x1920"                        # "WxH", or "W" to keep the aspect ratio
+    }
+
+Set per pack (pack_config.json) or per job (job spec); job values override the pack's.
+"""
+
+from typing import Optional, Tuple
+
+
+def merge(pack_filters: Optional[dict], job_filters: Optional[dict]) -> dict:
+    """Pack settings overridden key by key by the job's"""
+    merged = dict(pack_filters or {})
+    merged.update(job_filters or {})
+    return normalize(merged)
+
+
+def _even(value: float) -> int:
+    return max(2, int(round(value / 2)) * 2)
+
+
+def _ratio(text) -> float:
+    width, _, height = str(text).partition(":")
+    return float(width) / float(height) if height else float(width)
+
+
+def normalize(settings: Optional[dict]) -> dict:
+    """Validated settings with shorthands expanded (raises ValueError)"""
+    settings = dict(settings or {})
+    result = {}
+    darken = settings.get("darken")
+    if darken is not None:
+        darken = float(darken)
+        if not 0.0 <= darken <= 1.0:
+            raise ValueError(f"clip_filters.darken must be between 0 and 1, got {darken}")
+        if darken != 1.0:
+            result["darken"] = darken
+
+    crop = settings.get("crop")
+    if crop:
+        if crop is True:
+            crop = {"aspect": "9:16"}
+        elif not isinstance(crop, dict):
+            crop = {"aspect": crop}
+        offset = float(crop.get("offset", 0.0))
+        if not -1.0 <= offset <= 1.0:
+            raise ValueError(f"clip_filters.crop.offset must be between -1 and 1, got {offset}")
+        result["crop"] = {"aspect": _ratio(crop.get("aspect", "9:16")), "offset": offset}
+
+    scale = settings.get("scale")
+    if scale:
+        width, _, height = str(scale).lower().partition("x")
+        result["scale"] = (int(width), int(height) if height else None)
+    return result
+
+
+def _crop_box(width: int, height: int, crop: dict) -> Tuple[int, int, int, int]:
+    crop_width = min(width, _even(height * crop["aspect"]))
+    crop_height = min(height, _even(width / crop["aspect"]))
+    x = int((width - crop_width) / 2 * (1 + crop["offset"]))
+    return crop_width, crop_height, min(max(0, x), width - crop_width), int((height - crop_height) / 2)
+
+
+def output_size(width: int, height: int, settings: dict) -> Tuple[int, int]:
+    """Frame size after the filters (what overlays have to be laid out for)"""
+    if "crop" in settings:
+        width, height = _crop_box(width, height, settings["crop"])[:2]
+    if "scale" in settings:
+        scale_width, scale_height = settings["scale"]
+        width, height = scale_width, scale_height or _even(scale_width * height / width)
+    return width, height
+
+
+def filter_chain(width: int, height: int, settings: dict) -> str:
+    """Comma-separated ffmpeg filters for a clip of width x height ("" = none)"""
+    filters = []
+    if "crop" in settings:
+        crop_width, crop_height, x, y = _crop_box(width, height, settings["crop"])
+        filters.append(f"crop={crop_width}:{crop_height}:{x}:{y}")
+    if "scale" in settings:
+        scale_width, scale_height = output_size(width, height, settings)
+        filters.append(f"scale={scale_width}:{scale_height}")
+    if "darken" in settings:
+        # frame * DARK on the YUV planes directly: luma above black level and chroma around
+        # neutral scale by the same factor, with no RGB round trip
+        k = settings["darken"]
+        filters.append(f"lutyuv=y=16+(val-16)*{k}:u=128+(val-128)*{k}:v=128+(val-128)*{k}")
+    return ",".join(filters)
@@ -0,0 +1,174 @@
+"""
+Background filing queue for the sorter tools
+Filing a file into the library (utils.asset_store) may copy gigabytes, so it
+happens on one worker thread while the operator moves on to the next file.
+
+Every step is appended to a journal (JSON lines: queued / done / failed /
+cancelled / undone), so the last filings can be undone, also after a restart:
+
+  - a job still waiting in the queue is simply cancelled
+  - a finished job's category file is removed again (or moved back to where
+    the original was, if the original has been cleaned up meanwhile)
+"""
+
+import json
+import queue
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from utils.asset_store import AssetStore, get_default_store
+
+
+def _free_name(folder: Path, name: str) -> Path:
+    """folder/name, or folder/<stem>_<n><suffix> if that is taken"""
+    dest = folder / name
+    counter = 1
+    while dest.exists():
+        dest = folder / f"{Path(name).stem}_{counter}{Path(name).suffix}"
+        counter += 1
+    return dest
+
+
+class CopyQueue:
+    """
+    Files src into a category folder on a worker thread. on_done(job) runs on
+    that thread after each successful filing; UIs collect finished jobs with
+    drain() from their own thread.
+    """
+
+    def __init__(self, journal_file, store: Optional[AssetStore] = None,
+                 on_done: Optional[Callable[[dict], None]] = None):
+        self.journal_file = Path(journal_file)
+        self.store = store or get_default_store()
+        self.on_done = on_done
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._jobs: List[dict] = self._replay()   # undo history, oldest first
+        self._finished: List[dict] = []
+        self._worker = threading.Thread(target=self._run, name="copy-queue", daemon=True)
+        self._worker.start()
+
+    # ---------- journal ----------
+    def _replay(self) -> List[dict]:
+        """Finished, not yet undone jobs from earlier sessions"""
+        jobs: Dict[str, dict] = {}
+        if not self.journal_file.exists():
+            return []
+        with open(self.journal_file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line after a crash
+                job = jobs.setdefault(entry["id"], {"id": entry["id"]})
+                job.update({k: v for k, v in entry.items() if k not in ("event", "time")})
+                job["status"] = entry["event"]
+        return [job for job in jobs.values() if job["status"] == "done"]
+
+    def _log(self, job: dict, event: str):
+        """Append one event (call with the lock held)"""
+        job["status"] = event
+        entry = {"event": event, "time": time.time(),
+                 **{k: job[k] for k in ("id", "src", "folder", "category", "dest", "error") if job.get(k)}}
+        self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    # ---------- queue ----------
+    def put(self, src, folder, category: Optional[str] = None) -> dict:
+        """Queue filing src into folder (name collisions are resolved when it is copied)"""
+        job = {"id": uuid.uuid4().hex[:12], "src": str(src), "folder": str(folder),
+               "category": category or Path(folder).name}
+        with self._lock:
+            self._log(job, "queued")
+            self._jobs.append(job)
+        self._queue.put(job)
+        return job
+
+    def pending(self) -> int:
+        """Jobs not finished yet"""
+        with self._lock:
+            return sum(1 for job in self._jobs if job["status"] in ("queued", "copying"))
+
+    def drain(self) -> List[dict]:
+        """Jobs that finished (done or failed) since the last call"""
+        with self._lock:
+            finished, self._finished = self._finished, []
+        return finished
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                if job["status"] != "queued":
+                    continue  # cancelled by undo
+                job["status"] = "copying"
+            try:
+                dest = self.store.place(job["src"], _free_name(Path(job["folder"]), Path(job["src"]).name))
+                error = None
+            except Exception as e:
+                dest, error = None, str(e)
+            with self._lock:
+                if error:
+                    job["error"] = error
+                    self._log(job, "failed")
+                else:
+                    job["dest"] = str(dest)
+                    self._log(job, "done")
+                undo = job.pop("undo", False)
+            if not error and self.on_done is not None:
+                try:
+                    self.on_done(job)
+                except Exception as e:
+                    print(f"⚠️ After filing {job['src']}: {e}")
+            if undo and not error:
+                self._remove(job)
+            with self._lock:
+                self._finished.append(job)
+
+    # ---------- undo ----------
+    def _remove(self, job: dict):
+        """Take a finished filing back out of the library"""
+        dest = Path(job["dest"])
+        if dest.exists():
+            if Path(job["src"]).exists():
+                dest.unlink()   # the blob stays until `python -m utils.asset_store gc`
+            else:
+                Path(job["src"]).parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(dest), job["src"])
+        with self._lock:
+            self._log(job, "undone")
+
+    def undo(self, job_id: Optional[str] = None) -> Optional[dict]:
+        """Undo the most recent filing (or job_id) that is queued, in progress or done; returns its job"""
+        with self._lock:
+            for job in reversed(self._jobs):
+                if job["status"] in ("queued", "copying", "done") and job_id in (None, job["id"]):
+                    break
+            else:
+                return None
+            self._jobs.remove(job)
+            if job["status"] == "queued":
+                self._log(job, "cancelled")
+                return job
+            if job["status"] == "copying":
+                job["undo"] = True  # the worker removes it again once the copy is done
+                return job
+        self._remove(job)
+        return job
+
+    def close(self, wait: bool = True):
+        """Stop the worker; with wait=True the queued jobs are filed first"""
+        self._queue.put(None)
+        if wait:
+            self._worker.join()
+        try:
+            self.store.index.save()
+        except OSError:
+            pass
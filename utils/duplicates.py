@@ -0,0 +1,335 @@
+"""
+Duplicate detection for the media library
+Finds copies AND near-copies (re-encodes, trims, different bitrate) of clips
+and tracks, so the organizer tools can warn before the same file is filed twice.
+
+  - videos: perceptual hash (DCT pHash, 64 bit) of one frame every 2 s
+  - audio:  spectral fingerprint, 32 bits per ~93 ms (band energy differences)
+
+Fingerprints are computed once, in parallel, and stored in the media index
+(section "fingerprint"). Lookups don't compare against every file: video
+hashes are bucketed by 16-bit chunks (any frame within 3 bits shares one)
+and audio sub-fingerprints by 16-bit half; only files that share buckets are
+scored (videos when enough of their frames do, audio at the time offset most
+of the shared buckets agree on).
+
+    python -m utils.duplicates                # fingerprint library/ and list duplicates
+    python -m utils.duplicates path/to/folder
+    python -m utils.duplicates --force        # re-fingerprint everything
+"""
+
+import os
+import subprocess
+import sys
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.media_index import MediaIndex, _key_for, get_default_index
+
+SECTION = "fingerprint"
+VIDEO_EXTS = (".mp4", ".mov", ".avi", ".mkv", ".m4v", ".webm")
+AUDIO_EXTS = (".mp3", ".wav", ".m4a", ".flac", ".ogg")
+
+# Video: frame sampling and matching
+FRAME_INTERVAL = 2.0        # seconds between sampled frames
+MAX_FRAMES = 32
+FRAME_DISTANCE = 10         # max differing bits for two frames to count as the same picture
+VIDEO_MATCH = 0.8           # share of the shorter clip's frames that must match
+VIDEO_CHUNKS = 4            # 64-bit hash -> 4 x 16-bit bucket keys
+VIDEO_MIN_VOTES = 0.25      # share of the query's frames that must share a bucket with a file to score it
+
+# Audio: fingerprint layout and matching
+AUDIO_RATE = 5512
+AUDIO_WINDOW = 2048
+AUDIO_HOP = 512
+AUDIO_BANDS = 33            # 33 bands -> 32 difference bits per frame
+AUDIO_SECONDS = 180         # fingerprint the first 3 minutes
+AUDIO_MAX_BER = 0.35        # bit error rate below which two aligned fingerprints are the same audio
+AUDIO_MIN_OVERLAP = 50      # frames (~5 s) that have to line up
+
+_DCT = np.cos(np.pi * np.outer(np.arange(32), 2 * np.arange(32) + 1) / 64)
+
+
+def media_kind(path) -> Optional[str]:
+    suffix = Path(path).suffix.lower()
+    if suffix in VIDEO_EXTS:
+        return "video"
+    if suffix in AUDIO_EXTS:
+        return "audio"
+    return None
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Set bits per element of an unsigned integer array"""
+    as_bytes = values.view(np.uint8).reshape(values.shape + (values.dtype.itemsize,))
+    return np.unpackbits(as_bytes, axis=-1).sum(axis=-1)
+
+
+def phash(frame: np.ndarray) -> int:
+    """64-bit perceptual hash of a 32x32 grayscale frame"""
+    coefficients = (_DCT @ frame.astype(np.float64) @ _DCT.T)[:8, :8].flatten()
+    bits = coefficients > np.median(coefficients[1:])
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def video_fingerprint(video_file: str) -> List[int]:
+    """pHash of one frame every FRAME_INTERVAL seconds (flat frames such as fades are skipped)"""
+    cmd = ["ffmpeg", "-v", "error", "-i", video_file, "-an",
+           "-vf", f"fps=1/{FRAME_INTERVAL:g},scale=32:32:flags=area,format=gray",
+           "-frames:v", str(MAX_FRAMES), "-f", "rawvideo", "-"]
+    raw = subprocess.check_output(cmd, stderr=subprocess.DEVNULL)
+    frames = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 32, 32)
+    return [phash(frame) for frame in frames if frame.std() >= 2.0]
+
+
+def audio_fingerprint(audio_file: str) -> List[int]:
+    """32-bit sub-fingerprint per hop: signs of band energy differences over time and frequency"""
+    cmd = ["ffmpeg", "-v", "error", "-t", str(AUDIO_SECONDS), "-i", audio_file,
+           "-vn", "-ac", "1", "-ar", str(AUDIO_RATE), "-f", "f32le", "-"]
+    samples = np.frombuffer(subprocess.check_output(cmd, stderr=subprocess.DEVNULL), dtype=np.float32)
+    if len(samples) < AUDIO_WINDOW * 2:
+        return []
+    count = 1 + (len(samples) - AUDIO_WINDOW) // AUDIO_HOP
+    index = np.arange(AUDIO_WINDOW)[None, :] + AUDIO_HOP * np.arange(count)[:, None]
+    spectrum = np.abs(np.fft.rfft(samples[index] * np.hanning(AUDIO_WINDOW), axis=1)) ** 2
+
+    frequencies = np.fft.rfftfreq(AUDIO_WINDOW, 1.0 / AUDIO_RATE)
+    edges = np.geomspace(300, 2000, AUDIO_BANDS + 1)
+    bands = np.stack([spectrum[:, (frequencies >= lo) & (frequencies < hi)].sum(axis=1)
+                      for lo, hi in zip(edges[:-1], edges[1:])], axis=1)
+    energy = np.log(bands + 1e-10)
+    difference = energy[:, :-1] - energy[:, 1:]
+    bits = (difference[1:] - difference[:-1]) > 0
+    return [int(v) for v in np.packbits(bits, axis=1).view(">u4")[:, 0]]
+
+
+_HASH_TYPES = {"video": np.dtype(">u8"), "audio": np.dtype(">u4")}
+
+
+def fingerprint_file(path: str) -> dict:
+    """{kind, hashes}; hashes are stored as one hex string to keep the media index small"""
+    kind = media_kind(path)
+    if kind is None:
+        raise ValueError(f"Not a media file: {path}")
+    hashes = video_fingerprint(path) if kind == "video" else audio_fingerprint(path)
+    return {"kind": kind, "hashes": np.array(hashes, dtype=_HASH_TYPES[kind]).tobytes().hex()}
+
+
+def hash_array(data: dict) -> np.ndarray:
+    """The hashes of a stored fingerprint as uint64 (video) / uint32 (audio)"""
+    stored = np.frombuffer(bytes.fromhex(data.get("hashes") or ""), dtype=_HASH_TYPES[data["kind"]])
+    return stored.astype(np.uint64 if data["kind"] == "video" else np.uint32)
+
+
+def _video_score(query: np.ndarray, other: np.ndarray) -> float:
+    shorter, longer = (query, other) if len(query) <= len(other) else (other, query)
+    distances = _popcount(np.bitwise_xor.outer(shorter, longer)).min(axis=1)
+    return float(np.mean(distances <= FRAME_DISTANCE))
+
+
+def _audio_score(query: np.ndarray, other: np.ndarray, offset: int) -> Optional[float]:
+    """1 - bit error rate of the two fingerprints aligned at offset (other[i + offset] ~ query[i])"""
+    start = max(0, -offset)
+    end = min(len(query), len(other) - offset)
+    if end - start < min(AUDIO_MIN_OVERLAP, len(query), len(other)) or end <= start:
+        return None
+    errors = _popcount(np.bitwise_xor(query[start:end], other[start + offset:end + offset])).sum()
+    return 1.0 - float(errors) / (32 * (end - start))
+
+
+def _video_chunks(value: int):
+    """Bucket keys of a frame hash: (chunk no, 16-bit value)"""
+    for chunk in range(VIDEO_CHUNKS):
+        yield chunk, (value >> (16 * chunk)) & 0xFFFF
+
+
+def _audio_halves(value: int):
+    """Bucket keys of an audio sub-fingerprint (all-0 / all-1 halves are silence, not indexed)"""
+    for half in (0, 1):
+        bits = (value >> (16 * half)) & 0xFFFF
+        if bits not in (0, 0xFFFF):
+            yield half, bits
+
+
+class DuplicateIndex:
+    """Fingerprints of known files with bucketed nearest-neighbor lookup"""
+
+    def __init__(self):
+        self.files: Dict[str, dict] = {}
+        self._video_buckets = defaultdict(set)   # (chunk no, chunk value) -> paths
+        self._audio_buckets = defaultdict(list)  # (half, 16-bit value) -> [(path, position)]
+        self._lock = threading.Lock()
+
+    def add(self, path: str, data: dict):
+        key = _key_for(path)
+        hashes = hash_array(data)
+        with self._lock:
+            self.files[key] = {"kind": data["kind"], "hashes": hashes}
+            if data["kind"] == "video":
+                for value in hashes.tolist():
+                    for bucket in _video_chunks(value):
+                        self._video_buckets[bucket].add(key)
+            else:
+                for position, value in enumerate(hashes.tolist()):
+                    for bucket in _audio_halves(value):
+                        self._audio_buckets[bucket].append((key, position))
+
+    def query(self, data: dict, exclude: Optional[str] = None) -> List[dict]:
+        """Known files that look like the same media: [{path, kind, score}], best first"""
+        exclude = _key_for(exclude) if exclude else None
+        query = hash_array(data)
+        if not len(query):
+            return []
+        matches = []
+        with self._lock:
+            if data["kind"] == "video":
+                frames = set(query.tolist())
+                # One vote per query frame and file, however many of the frame's chunks match
+                votes = Counter(key for value in frames for key in set().union(
+                    *(self._video_buckets.get(bucket, ()) for bucket in _video_chunks(value))))
+                needed = max(1, int(np.ceil(VIDEO_MIN_VOTES * len(frames))))
+                for key, count in votes.items():
+                    if key == exclude or count < needed:
+                        continue
+                    score = _video_score(query, self.files[key]["hashes"])
+                    if score >= VIDEO_MATCH:
+                        matches.append({"path": key, "kind": "video", "score": round(score, 3)})
+            else:
+                offsets = Counter()
+                for position, value in enumerate(query.tolist()):
+                    for bucket in _audio_halves(value):
+                        for key, other_position in self._audio_buckets.get(bucket, ()):
+                            if key != exclude:
+                                offsets[(key, other_position - position)] += 1
+                best: Dict[str, float] = {}
+                for (key, offset), _ in offsets.most_common(50):
+                    score = _audio_score(query, self.files[key]["hashes"], offset)
+                    if score is not None and score >= 1.0 - AUDIO_MAX_BER and score > best.get(key, 0.0):
+                        best[key] = score
+                matches = [{"path": key, "kind": "audio", "score": round(score, 3)} for key, score in best.items()]
+        return sorted(matches, key=lambda m: -m["score"])
+
+
+def find_media_files(folder) -> List[str]:
+    """All video and audio files below folder (recursive, sorted; hidden files and folders skipped)"""
+    folder = Path(folder)
+    return sorted(str(p) for p in folder.rglob("*") if media_kind(p)
+                  and not any(part.startswith(".") for part in p.relative_to(folder).parts))
+
+
+def fingerprint_library(root="library", index: Optional[MediaIndex] = None,
+                        workers: Optional[int] = None, force: bool = False) -> Dict[str, dict]:
+    """
+    Fingerprint every media file under root in parallel (unchanged files are
+    skipped unless force=True) and save them to the media index.
+
+    Returns:
+        {file path: fingerprint} for every file under root
+    """
+    index = index or get_default_index()
+    files = find_media_files(root)
+    known = {f: index.get(f, SECTION) for f in files} if not force else {}
+    todo = [f for f in files if not known.get(f)]
+    print(f"🔎 Fingerprints: {len(files)} files, {len(todo)} to analyze")
+
+    results = {f: data for f, data in known.items() if data}
+    if todo:
+        # ffmpeg decodes in its own process and numpy releases the GIL: threads are enough
+        with ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 2)) as pool:
+            futures = {pool.submit(fingerprint_file, f): f for f in todo}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    print(f"   ❌ {os.path.basename(path)}: {e}")
+                    continue
+                index.put(path, SECTION, data)
+                results[path] = data
+        index.save()
+    return results
+
+
+def build_index(root="library", index: Optional[MediaIndex] = None, **kwargs) -> DuplicateIndex:
+    duplicates = DuplicateIndex()
+    for path, data in fingerprint_library(root, index=index, **kwargs).items():
+        duplicates.add(path, data)
+    return duplicates
+
+
+class DuplicateChecker:
+    """
+    Background duplicate checks for the organizer tools: the library is
+    fingerprinted once (new files only), then each file to be filed is
+    fingerprinted and looked up while the user is still previewing it.
+    """
+
+    def __init__(self, library_root="library", workers: int = 2):
+        self.library_root = library_root
+        self.media_index = get_default_index()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="duplicates")
+        self._index: Future = self._pool.submit(build_index, library_root, self.media_index)
+        self._checks: Dict[str, Future] = {}
+        self._fingerprints: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, path: str) -> dict:
+        data = self.media_index.get(path, SECTION)
+        if data is None:
+            data = fingerprint_file(path)
+            self.media_index.put(path, SECTION, data)
+        with self._lock:
+            self._fingerprints[path] = data
+        return data
+
+    def _check(self, path: str) -> List[dict]:
+        data = self._fingerprint(path)
+        return self._index.result().query(data, exclude=path)
+
+    def check_async(self, path) -> Future:
+        """Future with the library files that duplicate path ([{path, kind, score}])"""
+        path = str(path)
+        with self._lock:
+            if path not in self._checks:
+                self._checks[path] = self._pool.submit(self._check, path)
+            return self._checks[path]
+
+    def filed(self, src, dest):
+        """src was filed as dest: later files are checked against it too"""
+        with self._lock:
+            self._checks.pop(str(src), None)
+            data = self._fingerprints.pop(str(src), None)
+        if data is None:
+            return  # never checked (or the check failed); picked up on the next library scan
+        self.media_index.put(dest, SECTION, data)
+        self._index.result().add(str(dest), data)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            self.media_index.save()
+        except OSError:
+            pass
+
+
+def describe(matches: List[dict], limit: int = 3) -> str:
+    """'library/audio/calm/a.mp3 (97%), ...' for dialogs and status lines"""
+    return ", ".join(f"{m['path']} ({m['score'] * 100:.0f}%)" for m in matches[:limit])
+
+
+if __name__ == "__main__":
+    folders = [a for a in sys.argv[1:] if not a.startswith("--")]
+    fingerprints = fingerprint_library(folders[0] if folders else "library", force="--force" in sys.argv)
+    duplicates = DuplicateIndex()
+    reported = set()
+    for path, data in sorted(fingerprints.items()):
+        for match in duplicates.query(data, exclude=path):
+            reported.add(path)
+            print(f"{path}\n    ≈ {match['path']} ({match['score'] * 100:.0f}% {match['kind']})")
+        duplicates.add(path, data)
+    print(f"{len(reported)} duplicate file(s) among {len(fingerprints)}")
@@ -0,0 +1,137 @@
+"""
+Loudness analysis for the music library (EBU R128)
+Measures every track ONCE and stores the result in the media index,
+so renders can level the music with a plain volume filter (no 2-pass loudnorm).
+
+Run it from the project folder:
+    python -m utils.loudness                 # analyze library/audio
+    python -m utils.loudness path/to/folder  # analyze another folder
+    python -m utils.loudness --force         # re-analyze everything
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.media_index import MediaIndex, get_default_index
+
+AUDIO_EXTS = (".mp3", ".wav", ".m4a", ".flac", ".ogg")
+
+# Level every background track to this integrated loudness before the mix volume is applied
+TARGET_LUFS = -16.0
+# Never push a track above this true peak (dBTP)
+MAX_TRUE_PEAK = -1.0
+# Keep corrections sane for silent / broken measurements
+MAX_GAIN_DB = 12.0
+
+SECTION = "loudness"
+
+
+def measure_loudness(audio_file: str) -> Dict[str, float]:
+    """
+    Measure integrated loudness (LUFS), true peak (dBTP) and loudness range (LU)
+    using ffmpeg's loudnorm analysis pass.
+    """
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", audio_file,
+        "-af", "loudnorm=print_format=json",
+        "-vn", "-f", "null", "-",
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg loudness analysis failed for {audio_file}")
+
+    # loudnorm prints its JSON block at the very end of stderr
+    match = re.search(r"\{[^{}]*\"input_i\"[^{}]*\}", result.stderr.decode("utf-8", "replace"))
+    if not match:
+        raise RuntimeError(f"No loudness data in ffmpeg output for {audio_file}")
+    data = json.loads(match.group(0))
+
+    return {
+        "integrated_lufs": float(data["input_i"]),
+        "true_peak_dbtp": float(data["input_tp"]),
+        "lra_lu": float(data["input_lra"]),
+    }
+
+
+def find_audio_files(folder) -> List[str]:
+    """All audio files below folder (recursive, sorted; hidden folders such as .store are skipped)"""
+    folder = Path(folder)
+    return sorted(str(p) for p in folder.rglob("*") if p.suffix.lower() in AUDIO_EXTS
+                  and not any(part.startswith(".") for part in p.relative_to(folder).parts))
+
+
+def analyze_library(audio_root="library/audio", index: Optional[MediaIndex] = None,
+                    workers: Optional[int] = None, force: bool = False) -> Dict[str, dict]:
+    """
+    Analyze every track under audio_root in parallel and save results to the index.
+
+    Tracks that were already analyzed (and did not change since) are skipped
+    unless force=True.
+
+    Returns:
+        {file path: loudness data} for the tracks analyzed in this run
+    """
+    index = index or get_default_index()
+    files = find_audio_files(audio_root)
+    todo = [f for f in files if force or index.get(f, SECTION) is None]
+
+    print(f"🔊 Loudness analysis: {len(files)} tracks, {len(todo)} to analyze")
+    if not todo:
+        return {}
+
+    # ffmpeg does the heavy lifting in its own process, so threads are enough
+    workers = workers or min(8, os.cpu_count() or 2)
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(measure_loudness, f): f for f in todo}
+        for future in as_completed(futures):
+            audio_file = futures[future]
+            try:
+                data = future.result()
+            except Exception as e:
+                print(f"   ❌ {os.path.basename(audio_file)}: {e}")
+                continue
+            index.put(audio_file, SECTION, data)
+            results[audio_file] = data
+            print(f"   ✅ {os.path.basename(audio_file)}: {data['integrated_lufs']:.1f} LUFS, "
+                  f"TP {data['true_peak_dbtp']:.1f} dBTP, LRA {data['lra_lu']:.1f} LU")
+
+    index.save()
+    return results
+
+
+def gain_for_track(audio_file: str, target_lufs: float = TARGET_LUFS,
+                   index: Optional[MediaIndex] = None) -> float:
+    """
+    Gain (dB) that brings a track to target_lufs without exceeding MAX_TRUE_PEAK.
+    Returns 0.0 for tracks that were never analyzed, so renders behave as before.
+    """
+    index = index or get_default_index()
+    data = index.get(audio_file, SECTION)
+    if not data:
+        return 0.0
+
+    integrated = data["integrated_lufs"]
+    if integrated == float("-inf") or integrated < -70:
+        return 0.0
+
+    gain = target_lufs - integrated
+    gain = min(gain, MAX_TRUE_PEAK - data["true_peak_dbtp"])
+    return max(-MAX_GAIN_DB, min(MAX_GAIN_DB, gain))
+
+
+def db_to_linear(gain_db: float) -> float:
+    """Convert a dB gain to the linear factor ffmpeg's volume filter expects"""
+    return 10 ** (gain_db / 20.0)
+
+
+if __name__ == "__main__":
+    folders = [a for a in sys.argv[1:] if not a.startswith("--")]
+    analyze_library(folders[0] if folders else "library/audio", force="--force" in sys.argv)
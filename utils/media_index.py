@@ -0,0 +1,96 @@
+"""
+Media Index — one small JSON file that remembers facts about library files
+Anything that is expensive to measure (loudness, fingerprints, ...) is stored
+here once, so renders can just look it up instead of re-analyzing the file.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from utils import metrics
+
+DEFAULT_INDEX_FILE = Path("library") / "media_index.json"
+
+
+def _key_for(path) -> str:
+    """Index keys are forward-slash paths relative to the project folder."""
+    p = Path(path)
+    try:
+        p = p.resolve().relative_to(Path.cwd().resolve())
+    except ValueError:
+        p = p.resolve()
+    return p.as_posix()
+
+
+def file_signature(path) -> Dict[str, float]:
+    """Size + mtime: cheap way to notice that a file changed since it was analyzed."""
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime": round(st.st_mtime, 3)}
+
+
+class MediaIndex:
+    """
+    Dictionary of {relative file path: {section: data}} saved to JSON.
+
+    Each analysis (e.g. "loudness") owns its own section inside the entry and
+    stores the file signature next to its data so stale results can be detected.
+    """
+
+    def __init__(self, index_file=DEFAULT_INDEX_FILE):
+        self.index_file = Path(index_file)
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Read the index from disk (missing or broken file = empty index)"""
+        if not self.index_file.exists():
+            self.entries = {}
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('files', {})
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ Could not read media index {self.index_file}: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Write the index atomically (temp file + rename)"""
+        with self._lock:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_file.with_suffix(self.index_file.suffix + ".tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'files': self.entries}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.index_file)
+
+    def get(self, path, section: str) -> Optional[dict]:
+        """Return stored data for one section, or None if missing or out of date"""
+        entry = self.entries.get(_key_for(path), {})
+        data = entry.get(section)
+        try:
+            fresh = bool(data) and data.get('signature') == file_signature(path)
+        except OSError:
+            fresh = False
+        metrics.cache_lookup(f"media_index_{section}", hit=fresh)
+        return data if fresh else None
+
+    def put(self, path, section: str, data: dict):
+        """Store data for one section (the file signature is added automatically)"""
+        data = dict(data)
+        data['signature'] = file_signature(path)
+        with self._lock:
+            self.entries.setdefault(_key_for(path), {})[section] = data
+
+
+_default_index: Optional[MediaIndex] = None
+
+
+def get_default_index() -> MediaIndex:
+    """Shared index instance for the default location (loaded once per process)"""
+    global _default_index
+    if _default_index is None:
+        _default_index = MediaIndex()
+    return _default_index
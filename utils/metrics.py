@@ -0,0 +1,298 @@
+"""
+Render metrics in Prometheus text format
+Tiny in-process registry (counters, gauges, histograms with labels) plus an
+optional HTTP endpoint, so a running batch can be scraped or just opened in a
+browser — no Prometheus client library or external service needed:
+
+    python -m shortsmaker render jobs/order.yaml --metrics 9108
+    curl http://127.0.0.1:9108/metrics
+
+Metrics are always recorded (it's only a few dict updates per video);
+the endpoint is what is optional.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+SPEED_BUCKETS = (0.25, 0.5, 1, 2, 3, 5, 8, 12, 20)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((k, {"counts": list(v["counts"]), "sum": v["sum"], "count": v["count"]})
+                           for k, v in self._values.items())
+        for key, state in items:
+            for bound, count in zip(self.buckets, state["counts"]):
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, ('le', _number(bound)))} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(state['sum'])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+
+class Registry:
+    """Holds metrics; collectors run right before each scrape (for values read from elsewhere)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, labelnames=()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def on_collect(self, collector: Callable[[], None]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:  # a broken collector must not break the endpoint
+                print(f"⚠️ Metrics collector failed: {e}")
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+videos_total = REGISTRY.counter(
+    "shortsmaker_videos_total", "Videos finished, by result", ["status"])
+stage_seconds = REGISTRY.histogram(
+    "shortsmaker_stage_seconds", "Time spent per render stage", ["stage"])
+tts_request_seconds = REGISTRY.histogram(
+    "shortsmaker_tts_request_seconds", "TTS synthesis latency", ["provider"])
+tts_duration_error = REGISTRY.histogram(
+    "shortsmaker_tts_duration_error_seconds", "Absolute error of the predicted TTS duration", ["provider"])
+tts_errors_total = REGISTRY.counter(
+    "shortsmaker_tts_errors_total", "Failed TTS requests", ["provider"])
+cache_requests_total = REGISTRY.counter(
+    "shortsmaker_cache_requests_total", "Cache lookups, by cache and hit/miss", ["cache", "result"])
+cache_hit_ratio = REGISTRY.gauge(
+    "shortsmaker_cache_hit_ratio", "Share of cache lookups that were hits", ["cache"])
+queue_depth = REGISTRY.gauge(
+    "shortsmaker_queue_depth", "Tasks per queue state", ["queue", "state"])
+encode_speed = REGISTRY.histogram(
+    "shortsmaker_encode_speed_ratio", "Final ffmpeg encode speed (x realtime)", buckets=SPEED_BUCKETS)
+encode_speed_last = REGISTRY.gauge(
+    "shortsmaker_encode_speed_last_ratio", "Speed of the most recent encode (x realtime)")
+workers_total = REGISTRY.gauge(
+    "shortsmaker_workers", "Render worker slots")
+workers_busy = REGISTRY.gauge(
+    "shortsmaker_workers_busy", "Render worker slots currently rendering")
+worker_utilization = REGISTRY.gauge(
+    "shortsmaker_worker_utilization", "Busy worker slots / worker slots")
+worker_busy_seconds = REGISTRY.counter(
+    "shortsmaker_worker_busy_seconds_total", "Total seconds worker slots spent rendering")
+
+
+def _update_ratios():
+    with cache_requests_total._lock:
+        caches = {key[0] for key in cache_requests_total._values}
+    for cache in caches:
+        hits = cache_requests_total.get(cache=cache, result="hit")
+        total = hits + cache_requests_total.get(cache=cache, result="miss")
+        cache_hit_ratio.set(hits / total if total else 0.0, cache=cache)
+    slots = workers_total.get()
+    worker_utilization.set(workers_busy.get() / slots if slots else 0.0)
+
+
+REGISTRY.on_collect(_update_ratios)
+
+
+# ---------- helpers used by the render code ----------
+
+def stage(name: str):
+    """with stage("encode"): ... — records the stage duration"""
+    return stage_seconds.time(stage=name)
+
+
+def cache_lookup(cache: str, hit: bool):
+    cache_requests_total.inc(cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def tts_request(provider: str):
+    """Times one TTS call and counts it as an error if it raises"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        tts_errors_total.inc(provider=provider)
+        raise
+    finally:
+        tts_request_seconds.observe(time.perf_counter() - started, provider=provider)
+
+
+def record_encode(media_seconds: float, wall_seconds: float):
+    if wall_seconds > 0 and media_seconds > 0:
+        speed = media_seconds / wall_seconds
+        encode_speed.observe(speed)
+        encode_speed_last.set(speed)
+
+
+@contextmanager
+def busy_worker():
+    """Marks one worker slot busy for the duration of a video"""
+    workers_busy.inc()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        workers_busy.dec()
+        worker_busy_seconds.inc(time.perf_counter() - started)
+
+
+# ---------- HTTP endpoint ----------
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the render log
+
+
+def parse_address(address) -> Tuple[str, int]:
+    """'9108' -> ('127.0.0.1', 9108); '0.0.0.0:9108' -> ('0.0.0.0', 9108)"""
+    host, _, port = str(address).rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def start_http_server(address) -> ThreadingHTTPServer:
+    """Serve /metrics on a daemon thread; returns the server (call .shutdown() to stop)"""
+    host, port = parse_address(address)
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"📈 Metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,199 @@
+"""
+Output catalog (SQLite)
+One row per finished video, appended the moment the video is done: quote,
+reference, clip, track, font, voice, length, encode settings, file size and
+render time. Nothing is lost when a run dies halfway, and questions like
+"which videos used clip 13?" are an indexed lookup instead of parsing file
+names like 0-Romans828_14_5_2.mp4.
+
+The customer CSV (File Name, Reference, Verse) can be regenerated from it at
+any time:
+
+    python -m shortsmaker catalog --asset 13                      # videos that used clip/track/font "13"
+    python -m shortsmaker catalog --ref "Romans 8:28"
+    python -m shortsmaker catalog --customer soulanchor --csv soulanchor.csv
+
+Each output folder (e.g. customers/) has its own catalog.sqlite.
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+CATALOG_NAME = "catalog.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    run             TEXT,
+    customer        TEXT NOT NULL,
+    file            TEXT NOT NULL,
+    path            TEXT NOT NULL,
+    video_index     INTEGER,
+    reference       TEXT,
+    quote           TEXT,
+    clip            TEXT,
+    track           TEXT,
+    font            TEXT,
+    tts_provider    TEXT,
+    voice           TEXT,
+    duration        REAL,
+    encoder_profile TEXT,
+    settings        TEXT,
+    size_bytes      INTEGER,
+    render_seconds  REAL,
+    finished_at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_videos_reference ON videos(reference);
+CREATE INDEX IF NOT EXISTS idx_videos_customer ON videos(customer, finished_at);
+CREATE TABLE IF NOT EXISTS assets (
+    video_id INTEGER NOT NULL REFERENCES videos(id),
+    kind     TEXT NOT NULL,
+    path     TEXT NOT NULL,
+    name     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_assets_path ON assets(path);
+CREATE INDEX IF NOT EXISTS idx_assets_name ON assets(name);
+"""
+
+ASSET_KINDS = ("clip", "track", "font")
+
+
+def _asset_name(path: str) -> str:
+    """'videos/13.mp4' -> '13' (what people call the asset)"""
+    return Path(path).stem
+
+
+class OutputCatalog:
+    """Append-only catalog of rendered videos; safe to share between threads"""
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, record: dict) -> int:
+        """Append one finished video (see video_record); returns its id"""
+        columns = [c for c in record if c != "settings"]
+        values = [record[c] for c in columns]
+        columns.append("settings")
+        values.append(json.dumps(record.get("settings") or {}, sort_keys=True))
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self.conn.execute(
+                    f"INSERT INTO videos ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", values)
+                video_id = cur.lastrowid
+                self.conn.executemany(
+                    "INSERT INTO assets (video_id, kind, path, name) VALUES (?, ?, ?, ?)",
+                    [(video_id, kind, record[kind], _asset_name(record[kind]))
+                     for kind in ASSET_KINDS if record.get(kind)])
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return video_id
+
+    def find(self, reference: Optional[str] = None, asset: Optional[str] = None,
+             customer: Optional[str] = None, run: Optional[str] = None) -> List[Dict]:
+        """
+        Videos matching every given filter, oldest first. asset matches a clip,
+        track or font by path or by name ('13' for videos/13.mp4).
+        """
+        where, params = [], []
+        if reference is not None:
+            where.append("v.reference = ?")
+            params.append(reference)
+        if customer is not None:
+            where.append("v.customer = ?")
+            params.append(customer)
+        if run is not None:
+            where.append("v.run = ?")
+            params.append(run)
+        if asset is not None:
+            where.append("v.id IN (SELECT video_id FROM assets WHERE path = ? OR name = ?)")
+            params.extend([asset, _asset_name(asset)])
+        sql = "SELECT v.* FROM videos v"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY v.finished_at, v.id"
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        result = []
+        for row in rows:
+            item = dict(row)
+            item["settings"] = json.loads(item["settings"] or "{}")
+            result.append(item)
+        return result
+
+    def write_csv(self, csv_path, **filters) -> int:
+        """Customer sheet (File Name, Reference, Verse) for the matching videos; returns the row count"""
+        rows = self.find(**filters)
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["File Name", "Reference", "Verse"])
+            for row in rows:
+                writer.writerow([row["file"], row["reference"], row["quote"]])
+        return len(rows)
+
+
+def video_record(task: dict, customer: str, output_path: str, info: Optional[dict] = None,
+                 seconds: Optional[float] = None, tts_provider: Optional[str] = None,
+                 voice: Optional[str] = None, encoder_profile: Optional[str] = None,
+                 settings: Optional[dict] = None, run: Optional[str] = None) -> dict:
+    """
+    Catalog row for a planned task (ffmpeg.plan_videos) that finished rendering.
+    info is what create_video returned (length of the video), if available.
+    """
+    file_name = task['file_name'].strip("/")
+    path = f"{output_path}/{file_name}"
+    return {
+        "run": run, "customer": customer, "file": file_name, "path": path,
+        "video_index": task.get('video_index'), "reference": task.get('text_source'),
+        "quote": task.get('text_verse'), "clip": task.get('video_file'), "track": task.get('audio_file'),
+        "font": task.get('font_file'), "tts_provider": tts_provider, "voice": voice,
+        "duration": (info or {}).get("duration"), "encoder_profile": encoder_profile,
+        "settings": settings,
+        "size_bytes": os.path.getsize(path) if os.path.exists(path) else None,
+        "render_seconds": seconds, "finished_at": time.time(),
+    }
+
+
+_catalogs: Dict[str, OutputCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def catalog_for(output_folder) -> OutputCatalog:
+    """The shared catalog of an output folder (e.g. 'customers')"""
+    path = os.path.abspath(os.path.join(str(output_folder), CATALOG_NAME))
+    with _catalogs_lock:
+        if path not in _catalogs:
+            _catalogs[path] = OutputCatalog(path)
+        return _catalogs[path]
+
+
+def add_video(output_folder, task: dict, customer: str, output_path: str, **kwargs) -> Optional[int]:
+    """
+    Catalog a finished video (kwargs as for video_record); returns its id.
+    The video itself is fine either way: a catalog problem (locked or broken
+    database) is reported and must not fail the render.
+    """
+    try:
+        return catalog_for(output_folder).add(video_record(task, customer, output_path, **kwargs))
+    except Exception as e:
+        print(f"⚠️ Could not add {task['file_name'].strip('/')} to the output catalog: {e}", file=sys.stderr)
+        return None
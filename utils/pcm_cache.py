@@ -0,0 +1,256 @@
+"""
+Decoded PCM cache for library music
+Each track is decoded by ffmpeg ONCE to raw samples on disk and then opened
+with numpy.memmap, so looping / trimming / fading is just array slicing.
+
+Layout: <cache_dir>/<key>.<dtype>  — raw interleaved samples, no header.
+The key covers the source file (its content hash when the asset store knows
+it, else path, size, mtime) and the output format, so an edited track or a
+different sample rate simply gets a new entry.
+"""
+
+import hashlib
+import os
+import subprocess
+import threading
+import uuid
+import wave
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from utils import metrics
+from utils.asset_store import content_key
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+DEFAULT_CACHE_DIR = Path(".cache") / "pcm"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2 GB ≈ 100 minutes of stereo float32
+
+_FFMPEG_FORMATS = {"float32": "f32le", "int16": "s16le"}
+
+
+def decode_to_pcm(audio_file: str, sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS,
+                  dtype: str = "float32", output_file: Optional[str] = None) -> Optional[np.ndarray]:
+    """
+    Decode any audio file to raw PCM with ffmpeg.
+
+    With output_file the samples are written there; otherwise they are piped
+    back and returned as an array of shape (frames, channels).
+    """
+    if dtype not in _FFMPEG_FORMATS:
+        raise ValueError(f"Unsupported PCM dtype: {dtype}")
+    cmd = [
+        "ffmpeg", "-v", "error", "-y",
+        "-i", audio_file,
+        "-vn", "-ac", str(channels), "-ar", str(sample_rate),
+        "-f", _FFMPEG_FORMATS[dtype],
+        output_file or "-",
+    ]
+    if output_file:
+        subprocess.check_call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return None
+    raw = subprocess.check_output(cmd, stderr=subprocess.DEVNULL)
+    return np.frombuffer(raw, dtype=dtype).reshape(-1, channels)
+
+
+def to_float(samples: np.ndarray) -> np.ndarray:
+    """int16 → float32 in [-1, 1]; float data is returned as float32"""
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32, copy=False)
+
+
+class PCMCache:
+    """
+    Size-capped disk cache of decoded tracks.
+
+    get() returns a read-only memmap; the OS page cache keeps hot tracks in RAM,
+    and least-recently-used files are deleted once max_bytes is exceeded.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, sample_rate: int = SAMPLE_RATE,
+                 channels: int = CHANNELS, dtype: str = "float32",
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        if dtype not in _FFMPEG_FORMATS:
+            raise ValueError(f"Unsupported PCM dtype: {dtype}")
+        self.cache_dir = Path(cache_dir)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.dtype = dtype
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._decoding = {}  # key -> Event, so two threads never decode the same track
+
+    def _key(self, audio_file: str) -> str:
+        # Library tracks are keyed by content, so every copy / category link shares one decode
+        source = content_key(audio_file)
+        if source is None:
+            st = os.stat(audio_file)
+            source = f"{os.path.abspath(audio_file)}|{st.st_size}|{st.st_mtime_ns}"
+        raw = f"{source}|{self.sample_rate}|{self.channels}|{self.dtype}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def path_for(self, audio_file: str) -> Path:
+        return self.cache_dir / f"{self._key(audio_file)}.{self.dtype}"
+
+    def get(self, audio_file: str) -> np.ndarray:
+        """Decoded track as a (frames, channels) memmap — decoded on first use"""
+        key = self._key(audio_file)
+        cached = self.cache_dir / f"{key}.{self.dtype}"
+
+        while True:
+            with self._lock:
+                if cached.exists():
+                    self.hits += 1
+                    metrics.cache_lookup("pcm", hit=True)
+                    # Opened under the lock: evict() can't delete it in between
+                    return self._open(cached)
+                pending = self._decoding.get(key)
+                if pending is None:
+                    pending = self._decoding[key] = threading.Event()
+                    owner = True
+                else:
+                    owner = False
+            if not owner:
+                pending.wait()
+                continue
+            track = None
+            try:
+                self._decode(audio_file, cached)
+                metrics.cache_lookup("pcm", hit=False)
+            finally:
+                with self._lock:
+                    if cached.exists():
+                        self.misses += 1
+                        track = self._open(cached)
+                    del self._decoding[key]
+                pending.set()
+            self.evict(keep=cached)
+            return track
+
+    def _open(self, cached: Path) -> np.ndarray:
+        try:
+            os.utime(cached)  # mtime doubles as "last used" for LRU eviction
+        except OSError:
+            pass
+        if cached.stat().st_size == 0:
+            return np.zeros((0, self.channels), dtype=self.dtype)
+        return np.memmap(cached, dtype=self.dtype, mode="r").reshape(-1, self.channels)
+
+    def _decode(self, audio_file: str, cached: Path):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_name(f"{cached.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            decode_to_pcm(audio_file, self.sample_rate, self.channels, self.dtype, output_file=str(tmp))
+            os.replace(tmp, cached)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def size_bytes(self) -> int:
+        if not self.cache_dir.exists():
+            return 0
+        return sum(p.stat().st_size for p in self.cache_dir.glob(f"*.{self.dtype}"))
+
+    def evict(self, keep: Optional[Path] = None):
+        """
+        Delete least-recently-used entries until the cache fits in max_bytes
+        (keep, e.g. the entry just returned, and tracks being decoded are spared)
+        """
+        if not self.cache_dir.exists():
+            return
+        with self._lock:
+            busy = {self.cache_dir / f"{key}.{self.dtype}" for key in self._decoding}
+            entries = []
+            for p in self.cache_dir.glob(f"*.{self.dtype}"):
+                try:
+                    st = p.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+            total = sum(size for _, size, _ in entries)
+            for _, size, p in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if p == keep or p in busy:
+                    continue
+                try:
+                    p.unlink()  # open memmaps keep working (POSIX) until they are closed
+                    total -= size
+                except OSError:
+                    pass
+
+    def clear(self):
+        if self.cache_dir.exists():
+            for p in self.cache_dir.glob(f"*.{self.dtype}"):
+                p.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "size_bytes": self.size_bytes(),
+        }
+
+
+def segment(track: np.ndarray, duration: float, sample_rate: int = SAMPLE_RATE,
+            offset: float = 0.0, loop: bool = True, fade_out: float = 0.0) -> np.ndarray:
+    """
+    Cut exactly `duration` seconds out of a decoded track as float32.
+
+    - loop=True wraps around the end of the track (like the old concat loop)
+    - loop=False pads with silence instead
+    - fade_out applies a linear fade over the last fade_out seconds (same curve as afade)
+    """
+    frames = int(round(duration * sample_rate))
+    channels = track.shape[1] if track.ndim == 2 else 1
+    if frames <= 0:
+        return np.zeros((0, channels), dtype=np.float32)
+    if len(track) == 0:
+        return np.zeros((frames, channels), dtype=np.float32)
+
+    start = int(round(offset * sample_rate)) % len(track)
+    if start + frames <= len(track):
+        out = to_float(track[start:start + frames])  # plain slice, no copy of the whole track
+    elif loop:
+        out = to_float(np.take(track, np.arange(start, start + frames) % len(track), axis=0))
+    else:
+        out = np.zeros((frames, channels), dtype=np.float32)
+        available = len(track) - start
+        out[:available] = to_float(track[start:])
+
+    fade_frames = min(int(round(fade_out * sample_rate)), frames)
+    if fade_frames > 0:
+        if not out.flags.writeable or np.shares_memory(out, track):
+            out = out.copy()
+        out[-fade_frames:] *= np.linspace(1.0, 0.0, fade_frames, dtype=np.float32)[:, None]
+    return out
+
+
+def write_wav(output_file: str, samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> str:
+    """Write float samples (frames, channels) as a 16-bit PCM WAV file (lossless for our mixes)"""
+    samples = np.atleast_2d(to_float(samples).T).T
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).round().astype("<i2")
+    with wave.open(output_file, "wb") as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return output_file
+
+
+_default_cache: Optional[PCMCache] = None
+
+
+def get_default_cache() -> PCMCache:
+    """Shared cache instance (one per process) at the default location"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = PCMCache()
+    return _default_cache
@@ -0,0 +1,178 @@
+"""
+Library preprocessing
+Bakes a recipe (darken, crop, scale, strip audio, fps) into a folder of clips,
+for libraries that should be processed once instead of at render time
+(utils/clip_filters.py). Replaces darkenVideos.py.
+
+  - clips are processed in parallel by a process pool
+  - a manifest in the output folder remembers what was made from which input
+    and recipe, so re-runs only touch new or changed clips (it is saved as
+    clips finish, so a killed run keeps what it already made)
+  - outputs appear atomically (temp file + rename): an interrupted run never
+    leaves half-written clips behind
+  - a broken clip is reported and skipped, the rest carries on
+
+    python -m shortsmaker preprocess library/raw library/dark --darken 0.8 --crop 9:16 --scale 1080x1920
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils import clip_filters
+from utils.media_index import file_signature
+
+MANIFEST_NAME = ".preprocess_manifest.json"
+FAILURES_NAME = "preprocess_failures.json"
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".m4v", ".mkv", ".webm")
+MANIFEST_SAVE_SECONDS = 5.0   # finished clips reach the manifest at least this often
+
+
+def normalize_recipe(recipe: dict) -> dict:
+    """clip_filters settings plus strip_audio / fps (raises ValueError)"""
+    normalized = {"filters": clip_filters.normalize(recipe)}
+    normalized["strip_audio"] = bool(recipe.get("strip_audio", False))
+    if recipe.get("fps"):
+        normalized["fps"] = float(recipe["fps"])
+    return normalized
+
+
+def recipe_hash(recipe: dict) -> str:
+    return hashlib.sha256(json.dumps(recipe, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _probe_size(video_file: str):
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=width,height',
+         '-of', 'csv=p=0:s=x', video_file],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    width, height = result.stdout.strip().splitlines()[0].split("x")[:2]
+    return int(width), int(height)
+
+
+def process_clip(input_file: str, output_file: str, recipe: dict) -> dict:
+    """Apply a normalized recipe to one clip (runs in a pool worker)"""
+    started = time.time()
+    width, height = _probe_size(input_file)
+    filters = [f for f in [clip_filters.filter_chain(width, height, recipe["filters"])] if f]
+    if "fps" in recipe:
+        filters.append(f"fps={recipe['fps']:g}")
+
+    out_dir = os.path.dirname(output_file)
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_file = os.path.join(out_dir, f".tmp-{uuid.uuid4().hex}{Path(output_file).suffix}")
+    cmd = ["ffmpeg", "-y", "-v", "error", "-i", input_file]
+    if filters:
+        cmd += ["-vf", ",".join(filters)]
+    cmd += ["-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart"]
+    cmd += ["-an"] if recipe["strip_audio"] else ["-c:a", "aac", "-b:a", "192k"]
+    cmd.append(tmp_file)
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip()
+                               else f"ffmpeg exited with {result.returncode}")
+        os.replace(tmp_file, output_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return {"seconds": round(time.time() - started, 2), "size": (width, height)}
+
+
+class Manifest:
+    """{input relpath: {signature, recipe, output}} for one output folder"""
+
+    def __init__(self, output_folder):
+        self.path = Path(output_folder) / MANIFEST_NAME
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def is_current(self, relpath: str, input_file: str, output_file: str, recipe_id: str) -> bool:
+        entry = self.entries.get(relpath)
+        return (entry is not None and entry.get("recipe") == recipe_id
+                and entry.get("signature") == file_signature(input_file)
+                and os.path.exists(output_file))
+
+    def record(self, relpath: str, input_file: str, output_file: str, recipe_id: str):
+        self.entries[relpath] = {"signature": file_signature(input_file), "recipe": recipe_id,
+                                 "output": os.path.basename(output_file)}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def find_clips(input_folder) -> List[Path]:
+    root = Path(input_folder)
+    return sorted(p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in VIDEO_EXTENSIONS
+                  and not p.name.startswith("."))
+
+
+def preprocess_folder(input_folder, output_folder, recipe: dict, workers: Optional[int] = None,
+                      force: bool = False) -> Dict[str, list]:
+    """
+    Process every clip under input_folder into output_folder (same relative paths, .mp4).
+
+    Returns:
+        {"done": [...], "skipped": [...], "failed": [{file, error}]}; failures are also
+        written to <output_folder>/preprocess_failures.json
+    """
+    recipe = normalize_recipe(recipe)
+    recipe_id = recipe_hash(recipe)
+    manifest = Manifest(output_folder)
+    report = {"done": [], "skipped": [], "failed": []}
+
+    todo = {}
+    for clip in find_clips(input_folder):
+        relpath = clip.relative_to(input_folder).as_posix()
+        output_file = str(Path(output_folder) / Path(relpath).with_suffix(".mp4"))
+        if not force and manifest.is_current(relpath, str(clip), output_file, recipe_id):
+            report["skipped"].append(relpath)
+            continue
+        todo[relpath] = (str(clip), output_file)
+
+    print(f"🎬 Preprocessing {len(todo)} clip(s) ({len(report['skipped'])} unchanged, skipped)")
+    if todo:
+        last_save = time.time()
+        try:
+            with ProcessPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 2)) as pool:
+                futures = {pool.submit(process_clip, src, dst, recipe): rel for rel, (src, dst) in todo.items()}
+                for future in as_completed(futures):
+                    relpath = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"   ❌ {relpath}: {e}")
+                        report["failed"].append({"file": relpath, "error": str(e)})
+                        continue
+                    manifest.record(relpath, *todo[relpath], recipe_id)
+                    report["done"].append(relpath)
+                    print(f"   ✅ {relpath} ({result['seconds']}s)")
+                    if time.time() - last_save >= MANIFEST_SAVE_SECONDS:
+                        manifest.save()
+                        last_save = time.time()
+        finally:
+            manifest.save()
+
+    failures_file = Path(output_folder) / FAILURES_NAME
+    if report["failed"]:
+        failures_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(failures_file, "w", encoding="utf-8") as f:
+            json.dump(report["failed"], f, indent=1)
+        print(f"⚠️ {len(report['failed'])} clip(s) failed, see {failures_file}")
+    elif failures_file.exists():
+        failures_file.unlink()
+    return report
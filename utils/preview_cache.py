@@ -0,0 +1,206 @@
+"""
+Preview cache for the organizer tools
+The player must not hold the original open (Windows would refuse to move it),
+so previews play a separate file. Making that file used to mean copying the
+whole original, multi-GB videos included. Now, cheapest first:
+
+  - hardlink (not on Windows, where a link shares the original's lock)
+  - reflink / copy-on-write clone (Linux filesystems that support FICLONE)
+  - low-res proxy transcode for big videos (needs ffmpeg on PATH)
+  - plain copy (small files)
+
+Previews are keyed by path + size + mtime, prefetched on a small thread pool,
+kept under a size cap (least recently used evicted first) and removed on exit.
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+PROXY_MIN_BYTES = 64 * 1024 ** 2     # videos above this get a proxy instead of a copy
+PROXY_HEIGHT = 480
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv", ".m4v", ".webm"}
+FICLONE = 0x40049409                 # linux/fs.h
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return True
+    except OSError:
+        if dst.exists():
+            dst.unlink()
+        return False
+
+
+def _touch(path: Path):
+    """LRU: mtime = last use (not for hardlinks, whose mtime is the original's)"""
+    if path.stat().st_nlink == 1:
+        os.utime(path)
+
+
+class PreviewCache:
+    """Playable stand-ins for media files, made in the background"""
+
+    def __init__(self, root, max_bytes: int = DEFAULT_MAX_BYTES, workers: int = 2):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preview")
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._pinned: Set[Path] = set()
+        self._procs: Set[subprocess.Popen] = set()  # running proxy transcodes (killed by close)
+        self._closed = False
+
+    @staticmethod
+    def _key(src: Path) -> str:
+        st = src.stat()
+        ident = f"{src.resolve()}|{st.st_size}|{st.st_mtime_ns}"
+        return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+    def _existing(self, key: str) -> Optional[Path]:
+        for path in self.root.glob(f"{key}.*"):
+            return path
+        return None
+
+    def _proxy(self, src: Path, dst: Path) -> bool:
+        if not shutil.which("ffmpeg"):
+            return False
+        cmd = ["ffmpeg", "-v", "error", "-y", "-i", str(src),
+               "-vf", f"scale=-2:'min({PROXY_HEIGHT},ih)'",
+               "-c:v", "libx264", "-preset", "ultrafast", "-crf", "30",
+               "-c:a", "aac", "-b:a", "96k", "-movflags", "+faststart", "-f", "mp4", str(dst)]
+        with self._lock:
+            if self._closed:
+                return False
+            proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self._procs.add(proc)
+        try:
+            returncode = proc.wait()
+        finally:
+            with self._lock:
+                self._procs.discard(proc)
+        if returncode != 0 and dst.exists():
+            dst.unlink()
+        return returncode == 0
+
+    def _make(self, src: Path, key: str) -> Path:
+        if self._closed:
+            raise RuntimeError("preview cache is closed")
+        found = self._existing(key)
+        if found is not None:
+            _touch(found)
+            return found
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        is_big_video = src.suffix.lower() in VIDEO_EXTENSIONS and src.stat().st_size > PROXY_MIN_BYTES
+        tmp = self.root / f".{uuid.uuid4().hex}.tmp"
+        suffix = src.suffix
+        try:
+            made = False
+            if os.name != "nt":
+                try:
+                    os.link(src, tmp)
+                    made = True
+                except OSError:
+                    pass
+            if not made:
+                made = _reflink(src, tmp)
+            if not made and is_big_video:
+                made = self._proxy(src, tmp)
+                suffix = ".mp4" if made else suffix
+            if not made:
+                shutil.copy2(src, tmp)
+            if self._closed:
+                raise RuntimeError("preview cache is closed")
+            target = self.root / f"{key}{suffix}"
+            os.replace(tmp, target)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        _touch(target)
+        self.evict()
+        return target
+
+    def _submit(self, src: Path) -> Future:
+        key = self._key(src)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._pool.submit(self._make, src, key)
+                self._inflight[key] = future
+                future.add_done_callback(lambda _f, k=key: self._forget(k))
+            return future
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def get(self, src) -> Path:
+        """Preview file for src (waits for it if it's still being made) and pins it"""
+        path = self._submit(Path(src)).result()
+        with self._lock:
+            self._pinned.add(path)
+        return path
+
+    def prefetch(self, sources: Iterable) -> None:
+        """Start making previews for upcoming files; errors surface when they are requested"""
+        for src in sources:
+            try:
+                self._submit(Path(src))
+            except OSError:
+                pass  # vanished / unreadable: get() will report it
+
+    def release(self, path) -> None:
+        """The player is done with path; it may be evicted now"""
+        with self._lock:
+            self._pinned.discard(Path(path))
+
+    def evict(self) -> None:
+        """Delete least recently used previews until the cache fits max_bytes"""
+        entries = []
+        for path in self.root.glob("*"):
+            if path.name.startswith("."):
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            # A hardlink still shared with its original takes no extra space
+            size = st.st_size if st.st_nlink == 1 else 0
+            entries.append((st.st_mtime, size, path))
+        total = sum(size for _, size, _ in entries)
+        with self._lock:
+            pinned = set(self._pinned)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path in pinned or size == 0:
+                continue
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass  # still open by the player (Windows); try again next time
+
+    def close(self) -> None:
+        """Stop prefetching (running transcodes are killed, not waited for) and remove the cache folder"""
+        with self._lock:
+            self._closed = True
+            procs = list(self._procs)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for proc in procs:
+            proc.kill()
+        shutil.rmtree(self.root, ignore_errors=True)
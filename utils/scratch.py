@@ -0,0 +1,71 @@
+"""
+Scratch workspaces for render jobs
+Every video gets its own private temp folder (on /dev/shm when the machine has it),
+so parallel renders never overwrite each other's intermediate files and nothing
+piles up in the customer folder.
+
+    with ScratchWorkspace("video_3") as ws:
+        mix = ws.file("mix.wav")
+        ...
+    # folder is gone here (unless keep-intermediates is on)
+
+Set SHORTSMAKER_KEEP_INTERMEDIATES=1 (or pass keep=True) to keep the files for debugging.
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Optional
+
+KEEP_ENV = "SHORTSMAKER_KEEP_INTERMEDIATES"
+SCRATCH_ENV = "SHORTSMAKER_SCRATCH_DIR"
+RAM_DISK = Path("/dev/shm")
+
+
+def keep_intermediates_default() -> bool:
+    return os.getenv(KEEP_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def scratch_root() -> Path:
+    """
+    Where workspaces are created:
+      1. $SHORTSMAKER_SCRATCH_DIR if set
+      2. /dev/shm (RAM disk) if it exists and is writable
+      3. the system temp folder
+    """
+    configured = os.getenv(SCRATCH_ENV)
+    if configured:
+        return Path(configured)
+    if RAM_DISK.is_dir() and os.access(RAM_DISK, os.W_OK):
+        return RAM_DISK / "shortsmaker"
+    return Path(tempfile.gettempdir()) / "shortsmaker"
+
+
+class ScratchWorkspace:
+    """A unique temp folder for one job, removed on exit unless keep=True"""
+
+    def __init__(self, job_name: str = "job", base_dir=None, keep: Optional[bool] = None):
+        self.keep = keep_intermediates_default() if keep is None else keep
+        base = Path(base_dir) if base_dir else scratch_root()
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in job_name)
+        self.path = base / f"{safe_name}_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        self.path.mkdir(parents=True, exist_ok=False)
+
+    def file(self, name: str) -> str:
+        """Path (as str, ffmpeg-friendly) for an intermediate file inside the workspace"""
+        return str(self.path / name).replace("\\", "/")
+
+    def cleanup(self):
+        if self.keep:
+            print(f"   🧪 Keeping intermediates in {self.path}")
+            return
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
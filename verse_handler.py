@@ -1,10 +1,20 @@
 import csv
+import hashlib
+import json
 import os
 import subprocess
 import sys
+import time
 from string import ascii_letters
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import textwrap
+import uuid
+
+from utils import metrics
+
+OVERLAY_CACHE_DIR = os.path.join(".cache", "overlays")
+OVERLAY_CACHE_MAX_BYTES = 512 * 1024 ** 2
+OVERLAY_MIN_AGE = 600  # seconds; a layer used this recently may still be read by a running render
 
 
 def create_image(text, font_path, font_size, max_char_count, image_size, save_path, text_source, text_color):
@@ -59,6 +69,89 @@ def create_image(text, font_path, font_size, max_char_count, image_size, save_pa
     return f"{path_to_check}", combined.getbbox()[3]-combined.getbbox()[1]
 
 
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compose_overlay(frame_size, verse_image, verse_y, reference, reference_font, reference_y,
+                    logo_image=None, logo_y=0, reference_size=42, text_color=(255, 255, 255, 255),
+                    cache_dir=OVERLAY_CACHE_DIR, max_bytes=OVERLAY_CACHE_MAX_BYTES):
+    """
+    Flatten everything static on screen (logo, reference text, verse image) into one
+    frame-sized RGBA layer, stored with premultiplied alpha for ffmpeg's
+    overlay=alpha=premultiplied. Layers are cached by a hash of their content;
+    least recently used layers are deleted once the cache exceeds max_bytes.
+    Returns the path of the layer PNG.
+    """
+    key_data = {
+        "frame": list(frame_size), "verse": _file_digest(verse_image), "verse_y": verse_y,
+        "reference": reference, "font": _file_digest(reference_font), "reference_y": reference_y,
+        "reference_size": reference_size, "color": list(text_color),
+        "logo": _file_digest(logo_image) if logo_image else None, "logo_y": logo_y,
+    }
+    key = hashlib.sha256(json.dumps(key_data, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+    layer_path = os.path.join(cache_dir, key[:2], f"{key}.png")
+    hit = os.path.exists(layer_path)
+    metrics.cache_lookup("overlay", hit=hit)
+    if hit:
+        try:
+            os.utime(layer_path)  # mtime = last use, for evict_overlays
+            return layer_path
+        except FileNotFoundError:
+            pass  # evicted meanwhile: build it again
+
+    width = frame_size[0]
+
+    def placed(image, y):
+        # Full-frame copy of image, centered horizontally (paste clips what sticks out)
+        canvas = Image.new('RGBA', frame_size, color=(0, 0, 0, 0))
+        canvas.paste(image, (int((width - image.width) / 2), int(y)))
+        return canvas
+
+    layer = Image.new('RGBA', frame_size, color=(0, 0, 0, 0))
+    if logo_image:
+        layer = Image.alpha_composite(layer, placed(Image.open(logo_image).convert('RGBA'), logo_y))
+    font = ImageFont.truetype(font=f'{reference_font}', size=reference_size)
+    reference_layer = Image.new('RGBA', frame_size, color=(0, 0, 0, 0))
+    ImageDraw.Draw(im=reference_layer).text(xy=(width / 2, reference_y), text=reference, font=font,
+                                            fill=text_color, anchor='ma')
+    layer = Image.alpha_composite(layer, reference_layer)
+    layer = Image.alpha_composite(layer, placed(Image.open(verse_image).convert('RGBA'), verse_y))
+
+    # PNG has no premultiplied mode: store the premultiplied bytes as plain RGBA
+    premultiplied = Image.frombytes('RGBA', layer.size, layer.convert('RGBa').tobytes())
+    os.makedirs(os.path.dirname(layer_path), exist_ok=True)
+    tmp_path = f"{layer_path}.{uuid.uuid4().hex}.tmp.png"
+    premultiplied.save(tmp_path)
+    os.replace(tmp_path, layer_path)
+    evict_overlays(cache_dir, max_bytes)
+    return layer_path
+
+
+def evict_overlays(cache_dir=OVERLAY_CACHE_DIR, max_bytes=OVERLAY_CACHE_MAX_BYTES):
+    """Delete least recently used overlay layers until the cache fits max_bytes"""
+    entries = []
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    recent = time.time() - OVERLAY_MIN_AGE
+    for mtime, size, path in sorted(entries):
+        if total <= max_bytes or mtime > recent:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass  # still open by ffmpeg (Windows); try again next time
+
+
 def create_post_images(video_path: str, output_folder):
     video_name = video_path.split("/")
     video_name = video_name[len(video_name)-1].strip(".mp4")